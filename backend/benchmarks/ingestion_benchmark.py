@@ -0,0 +1,101 @@
+"""
+Benchmark de la construcción del índice: ingesta serial vs. paralela.
+
+Genera un catálogo sintético en un directorio temporal, construye el índice
+con run_ingestion(full=True) y con run_parallel_ingestion(), verifica que
+ambos resultados sean idénticos byte a byte y reporta el speedup.
+
+Uso (desde backend/):
+    python benchmarks/ingestion_benchmark.py --records 200000 --workers 4
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.agents import ingestion_agent  # noqa: E402
+
+_WORDS = (
+    "movilidad salud agua drenaje alumbrado seguridad parque escuela vacunación "
+    "transporte consulta cabildo presupuesto participativo basura reciclaje "
+    "mercado deporte cultura biblioteca bache semáforo ciclovía peatonal "
+    "vivienda empleo feria jornada taller comunidad colonia barrio centro"
+).split()
+_MUNICIPALITIES = ["CDMX", "Guadalajara", "Monterrey", "Puebla", "Mérida", "Querétaro", "Oaxaca", "Toluca"]
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n))
+
+
+def generate_catalogue(data_dir: Path, records: int, seed: int) -> None:
+    """Escribe events/services/ballot_questions/notifications sintéticos."""
+    rng = random.Random(seed)
+    share = {"events": 0.55, "services": 0.25, "ballots": 0.1, "notifications": 0.1}
+    for collection, filename in ingestion_agent.SOURCES.items():
+        items = []
+        for i in range(int(records * share[collection])):
+            items.append({
+                "id": f"{collection[:3]}-{i:07d}",
+                "name": _sentence(rng, rng.randint(3, 7)).capitalize(),
+                "category": rng.choice(_WORDS),
+                "municipality": rng.choice(_MUNICIPALITIES),
+                "description": _sentence(rng, rng.randint(15, 60)),
+                "tags": rng.sample(_WORDS, 3),
+            })
+        (data_dir / filename).write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+
+
+def _use_data_dir(data_dir: Path, index_name: str) -> Path:
+    ingestion_agent.DATA_DIR = data_dir
+    ingestion_agent.INDEX_DIR = data_dir / index_name
+    ingestion_agent.STATE_PATH = ingestion_agent.INDEX_DIR / "ingest_state.json"
+    return ingestion_agent.INDEX_DIR
+
+
+def _snapshot(index_dir: Path) -> dict:
+    return {p.name: p.read_bytes() for p in sorted(index_dir.iterdir()) if p.is_file()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100_000, help="registros sintéticos en total")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="procesos del pool")
+    parser.add_argument("--shard-size", type=int, default=ingestion_agent.PARALLEL_SHARD_SIZE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        generate_catalogue(data_dir, args.records, args.seed)
+
+        serial_dir = _use_data_dir(data_dir, "index-serial")
+        start = time.perf_counter()
+        ingestion_agent.run_ingestion(full=True)
+        serial = time.perf_counter() - start
+
+        parallel_dir = _use_data_dir(data_dir, "index-parallel")
+        start = time.perf_counter()
+        result = ingestion_agent.run_parallel_ingestion(workers=args.workers, shard_size=args.shard_size)
+        parallel = time.perf_counter() - start
+
+        identical = _snapshot(serial_dir) == _snapshot(parallel_dir)
+
+    print(f"registros:        {result['documents']}")
+    print(f"bloques:          {result['shards']} (workers={args.workers}, shard_size={args.shard_size})")
+    print(f"serial:           {serial:.2f} s")
+    print(f"paralelo:         {parallel:.2f} s")
+    print(f"speedup:          {serial / parallel:.2f}x")
+    print(f"salida idéntica:  {'sí' if identical else 'NO'}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
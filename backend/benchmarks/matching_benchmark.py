@@ -0,0 +1,101 @@
+"""
+Benchmark del matching de notificaciones: recorrido completo en Python
+(la implementación original), candidatos por índice espacial
+(filter_relevant_users) y motor vectorizado por lotes (MatchingEngine).
+
+Verifica que los tres den exactamente el mismo resultado y reporta el
+speedup de cada uno contra el recorrido completo.
+
+Uso (desde backend/):
+    python benchmarks/matching_benchmark.py --users 100000 --events 50
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.agents.geo_index import event_distance  # noqa: E402
+from src.agents.matching_engine import MatchingEngine  # noqa: E402
+from src.agents.notifications_agent import NotificationAgent  # noqa: E402
+
+_TOPICS = ["movilidad", "salud", "seguridad", "agua", "educacion", "cultura", "medio_ambiente", "empleo"]
+# (lat, lon) de ciudades para concentrar usuarios y eventos como en la realidad
+_CITIES = [(19.4326, -99.1332), (20.6597, -103.3496), (25.6866, -100.3161), (19.0414, -98.2063),
+           (20.9674, -89.5926), (21.1619, -86.8515), (32.5149, -117.0382), (17.0732, -96.7266)]
+
+
+def generate(n_users: int, n_events: int, seed: int):
+    rng = random.Random(seed)
+    users = []
+    for i in range(n_users):
+        lat, lon = rng.choice(_CITIES)
+        users.append({
+            "user_id": f"u-{i}",
+            "lat": lat + rng.gauss(0, 0.3),
+            "lon": lon + rng.gauss(0, 0.3),
+            "radius_km": rng.choice([5, 10, 20, 50]),
+            "intereses": rng.sample(_TOPICS, rng.randint(0, 3)),
+        })
+    events = []
+    for j in range(n_events):
+        lat, lon = rng.choice(_CITIES)
+        events.append({
+            "event_id": f"ev-{j}",
+            "type": rng.choice(_TOPICS),
+            "lat": lat + rng.gauss(0, 0.3),
+            "lon": lon + rng.gauss(0, 0.3),
+        })
+    return users, events
+
+
+def full_scan(users, event):
+    out = []
+    for user in users:
+        dist = event_distance(user, event)
+        if dist is not None:
+            out.append({**user, "_distance_km": round(dist, 2)})
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    users, events = generate(args.users, args.events, args.seed)
+    agent = NotificationAgent()
+    agent.users = users
+
+    start = time.perf_counter()
+    reference = [full_scan(users, e) for e in events]
+    t_full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    spatial = [agent.filter_relevant_users(e) for e in events]
+    t_spatial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine = MatchingEngine(users)
+    t_build = time.perf_counter() - start
+    start = time.perf_counter()
+    vectorized = engine.match(events)
+    t_vector = time.perf_counter() - start
+
+    matches = sum(len(r) for r in reference)
+    print(f"usuarios x eventos: {args.users} x {args.events} ({matches} notificaciones)")
+    print(f"recorrido completo: {t_full:.3f} s")
+    print(f"índice espacial:    {t_spatial:.3f} s ({t_full / t_spatial:.1f}x, incluye construir el índice)")
+    print(f"vectorizado:        {t_vector:.3f} s ({t_full / t_vector:.1f}x; construcción {t_build:.3f} s)")
+    identical = spatial == reference and vectorized == reference
+    print(f"resultados idénticos: {'sí' if identical else 'NO'}")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Benchmark del fan-out de notificaciones por etapas, a varias escalas.
+
+Genera una población sintética reproducible (semilla) de perfiles con
+lat/lon, radio, intereses, canal y frecuencia, repartidos en municipios
+mexicanos según su población, y eventos sobre los mismos municipios. Para
+cada tamaño mide por separado las etapas de run_detection_and_notify:
+
+- matching: MatchingEngine (construcción + match de todos los eventos)
+- dedup:    DeliveryStateStore con historial previo (carga, filtro de ya
+            notificados, marcas y commit al journal)
+- dispatch: mensajes + DispatchPipeline con los canales del agente y
+            envíos simulados (latencia configurable)
+
+Reporta tiempo, throughput y memoria pico por etapa. La memoria se mide con
+tracemalloc en una segunda pasada de la etapa, para que el rastreo no
+altere los tiempos. Con --json se guarda el resultado y con --baseline se
+compara contra una corrida anterior: sale con código 1 si algún throughput
+cae más de --tolerance.
+
+Uso (desde backend/):
+    python benchmarks/notification_benchmark.py --sizes 1000,100000,1000000
+    python benchmarks/notification_benchmark.py --sizes 1000,100000 --json bench.json
+    python benchmarks/notification_benchmark.py --baseline bench.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.agents.delivery_state import DeliveryStateStore  # noqa: E402
+from src.agents.dispatch import Channel, Delivery, DispatchPipeline, single_sender  # noqa: E402
+from src.agents.matching_engine import MatchingEngine  # noqa: E402
+from src.agents.notifications_agent import (  # noqa: E402
+    ACS_BATCH_SIZE,
+    ACS_CONCURRENCY,
+    CONSOLE_BATCH_SIZE,
+    NotificationAgent,
+)
+
+# (municipio, estado, lat, lon, población en millones)
+MUNICIPIOS = [
+    ("Ciudad de México", "CDMX", 19.4326, -99.1332, 9.2),
+    ("Tijuana", "Baja California", 32.5149, -117.0382, 1.9),
+    ("León", "Guanajuato", 21.1250, -101.6860, 1.7),
+    ("Puebla", "Puebla", 19.0414, -98.2063, 1.7),
+    ("Juárez", "Chihuahua", 31.6904, -106.4245, 1.5),
+    ("Zapopan", "Jalisco", 20.7214, -103.3918, 1.5),
+    ("Guadalajara", "Jalisco", 20.6597, -103.3496, 1.4),
+    ("Monterrey", "Nuevo León", 25.6866, -100.3161, 1.1),
+    ("Mexicali", "Baja California", 32.6245, -115.4523, 1.05),
+    ("Querétaro", "Querétaro", 20.5888, -100.3899, 1.05),
+    ("Culiacán", "Sinaloa", 24.8091, -107.3940, 1.0),
+    ("Mérida", "Yucatán", 20.9674, -89.5926, 1.0),
+    ("Aguascalientes", "Aguascalientes", 21.8853, -102.2916, 0.95),
+    ("Hermosillo", "Sonora", 29.0729, -110.9559, 0.94),
+    ("Chihuahua", "Chihuahua", 28.6320, -106.0691, 0.94),
+    ("Toluca", "Estado de México", 19.2826, -99.6557, 0.91),
+    ("Benito Juárez", "Quintana Roo", 21.1619, -86.8515, 0.91),
+    ("San Luis Potosí", "San Luis Potosí", 22.1565, -100.9855, 0.9),
+    ("Saltillo", "Coahuila", 25.4232, -101.0053, 0.88),
+    ("Morelia", "Michoacán", 19.7060, -101.1950, 0.85),
+    ("Acapulco", "Guerrero", 16.8531, -99.8237, 0.78),
+    ("Centro", "Tabasco", 17.9892, -92.9475, 0.68),
+    ("Tuxtla Gutiérrez", "Chiapas", 16.7516, -93.1029, 0.6),
+    ("Veracruz", "Veracruz", 19.1738, -96.1342, 0.6),
+    ("Oaxaca de Juárez", "Oaxaca", 17.0732, -96.7266, 0.27),
+]
+TEMAS = ["movilidad", "salud", "seguridad", "agua", "educacion", "cultura", "medio_ambiente", "empleo"]
+EVENT_TYPES = ["sismo", "inundacion", "incendio", "movilidad", "salud", "seguridad", "agua", "cultura"]
+CANALES = ["console", "email", "sms"]
+RADIOS_KM = [5, 10, 20, 50]
+# Dispersión (grados) alrededor del centro de cada municipio
+_SPREAD_DEG = 0.15
+
+
+def generate_population(n_users: int, n_events: int, seed: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Perfiles y eventos sintéticos; la misma semilla da siempre los mismos datos."""
+    rng = random.Random(seed)
+    weights = [m[4] for m in MUNICIPIOS]
+    users = []
+    for i, (municipio, estado, lat, lon, _pop) in enumerate(rng.choices(MUNICIPIOS, weights, k=n_users)):
+        users.append({
+            "user_id": f"u-{i:07d}",
+            "correo": f"usuario{i}@ejemplo.mx",
+            "estado": estado,
+            "municipio": municipio,
+            "lat": round(lat + rng.gauss(0, _SPREAD_DEG), 6),
+            "lon": round(lon + rng.gauss(0, _SPREAD_DEG), 6),
+            "radius_km": rng.choice(RADIOS_KM),
+            "intereses": rng.sample(EVENT_TYPES, rng.randint(0, 3)),
+            "preferred_channel": rng.choice(CANALES),
+            "frecuencia_notificaciones": "inmediata",
+        })
+    events = []
+    for j, (municipio, _estado, lat, lon, _pop) in enumerate(rng.choices(MUNICIPIOS, weights, k=n_events)):
+        events.append({
+            "event_id": f"ev-{j:05d}",
+            "type": rng.choice(EVENT_TYPES),
+            "title": f"Evento {j} en {municipio}",
+            "severity": rng.choice(["bajo", "medio", "alto"]),
+            "lat": round(lat + rng.gauss(0, _SPREAD_DEG), 6),
+            "lon": round(lon + rng.gauss(0, _SPREAD_DEG), 6),
+            "timestamp": f"2025-11-{1 + j % 28:02d}T12:00:00Z",
+        })
+    return users, events
+
+
+def _measure(fn: Callable[[], Any], trace_memory: bool, repeat: int = 1) -> Tuple[float, Optional[int], Any]:
+    """(segundos, memoria pico en bytes o None, resultado) de una etapa; el tiempo es el mejor de `repeat`."""
+    elapsed = float("inf")
+    for _ in range(max(1, repeat)):
+        result = None
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    peak = None
+    if trace_memory:
+        del result
+        gc.collect()
+        tracemalloc.start()
+        result = fn()
+        _current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def _seed_history(state_path: Path, pairs: List[Tuple[str, str]], fraction: float, seed: int) -> None:
+    """Historial previo: una fracción de los pares ya notificados en corridas anteriores."""
+    rng = random.Random(seed)
+    store = DeliveryStateStore(state_path)
+    for event_id, user_id in pairs:
+        if rng.random() < fraction:
+            store.mark(event_id, user_id)
+    store.compact()
+
+
+def _dedup(state_path: Path, pairs: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    store = DeliveryStateStore(state_path)
+    fresh = [pair for pair in pairs if pair not in store]
+    for event_id, user_id in fresh:
+        store.mark(event_id, user_id)
+    store.commit()
+    return fresh
+
+
+def _dispatch(agent: NotificationAgent, work: List[Tuple[Dict[str, Any], Dict[str, Any]]], latency_s: float) -> int:
+    def sender(deliveries: List[Delivery]) -> List[bool]:
+        if latency_s:
+            time.sleep(latency_s)
+        return [True] * len(deliveries)
+
+    # misma configuración de canales que NotificationAgent.dispatch_channels
+    channels = [
+        Channel("console", single_sender(lambda message, user: True), batch_size=CONSOLE_BATCH_SIZE),
+        Channel("email", sender, concurrency=ACS_CONCURRENCY, batch_size=ACS_BATCH_SIZE),
+        Channel("sms", sender, concurrency=ACS_CONCURRENCY, batch_size=ACS_BATCH_SIZE),
+    ]
+
+    async def run() -> int:
+        async with DispatchPipeline(channels, backoff_s=0) as pipeline:
+            for event, user in work:
+                message = agent.build_message(event, user)
+                await pipeline.submit(Delivery(event.get("event_id"), user, message, user["preferred_channel"]))
+        return len(pipeline.result.delivered)
+
+    return asyncio.run(run())
+
+
+def bench_size(n_users: int, args: argparse.Namespace) -> Dict[str, Any]:
+    users, events = generate_population(n_users, args.events, args.seed)
+    # sin cargar los JSON del repo: sólo se usan build_message y la config de canales
+    agent = NotificationAgent.__new__(NotificationAgent)
+    stages: Dict[str, Dict[str, Any]] = {}
+
+    def record(name: str, seconds: float, peak: Optional[int], items: int, unit: str) -> None:
+        stages[name] = {
+            "seconds": round(seconds, 4),
+            "items": items,
+            "unit": unit,
+            "throughput": round(items / seconds, 1) if seconds > 0 else None,
+            "peak_bytes": peak,
+        }
+
+    seconds, peak, matches = _measure(lambda: MatchingEngine(users).match(events), args.memory, args.repeat)
+    record("matching", seconds, peak, n_users * len(events), "pares usuario-evento/s")
+
+    work = [(event, user) for event, matched in zip(events, matches) for user in matched]
+    pairs = [(event["event_id"], user["user_id"]) for event, user in work]
+    with tempfile.TemporaryDirectory() as tmp:
+        history_path = Path(tmp) / "history.json"
+        _seed_history(history_path, pairs, args.already_notified, args.seed)
+        state_path = Path(tmp) / "notifications_state.json"
+
+        def dedup_once():
+            # cada pasada parte del mismo historial: el commit puede compactar
+            shutil.copyfile(history_path, state_path)
+            state_path.with_suffix(".journal").unlink(missing_ok=True)
+            return _dedup(state_path, pairs)
+
+        seconds, peak, fresh = _measure(dedup_once, args.memory, args.repeat)
+    record("dedup", seconds, peak, len(pairs), "pares revisados/s")
+
+    fresh_set = set(fresh)
+    to_send = [(e, u) for e, u in work if (e["event_id"], u["user_id"]) in fresh_set]
+    seconds, peak, delivered = _measure(
+        lambda: _dispatch(agent, to_send, args.send_latency_ms / 1000.0), args.memory, args.repeat)
+    record("dispatch", seconds, peak, delivered, "entregas/s")
+
+    return {
+        "users": n_users,
+        "events": len(events),
+        "matches": len(pairs),
+        "new_deliveries": len(to_send),
+        "stages": stages,
+    }
+
+
+def _fmt_bytes(n: Optional[int]) -> str:
+    return "-" if n is None else f"{n / 2 ** 20:.1f} MiB"
+
+
+def _print_report(result: Dict[str, Any]) -> None:
+    print(f"\nusuarios: {result['users']:,}  eventos: {result['events']}  "
+          f"coincidencias: {result['matches']:,}  entregas nuevas: {result['new_deliveries']:,}")
+    for name, stage in result["stages"].items():
+        throughput = f"{stage['throughput']:,.0f} {stage['unit']}" if stage["throughput"] else "-"
+        print(f"  {name:<9} {stage['seconds']:>9.3f} s   {throughput:<40} pico {_fmt_bytes(stage['peak_bytes'])}")
+
+
+def _regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    previous = {r["users"]: r for r in baseline}
+    problems = []
+    for result in results:
+        base = previous.get(result["users"])
+        if base is None:
+            continue
+        for name, stage in result["stages"].items():
+            before = base["stages"].get(name, {}).get("throughput")
+            if before and stage["throughput"] is not None and stage["throughput"] < before * (1 - tolerance):
+                problems.append(
+                    f"{result['users']:,} usuarios, {name}: {stage['throughput']:,.0f} vs {before:,.0f} {stage['unit']}")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="usuarios por corrida, separados por coma")
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--already-notified", type=float, default=0.3,
+                        help="fracción de coincidencias ya notificadas en corridas anteriores")
+    parser.add_argument("--send-latency-ms", type=float, default=0.0,
+                        help="latencia simulada por llamada a un canal ACS")
+    parser.add_argument("--repeat", type=int, default=3, help="pasadas por etapa; se reporta la mejor")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="no medir memoria pico (omite la pasada con tracemalloc)")
+    parser.add_argument("--json", type=Path, help="guardar los resultados en este archivo")
+    parser.add_argument("--baseline", type=Path, help="resultados anteriores (--json) para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="caída de throughput tolerada contra --baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = []
+    for n_users in sizes:
+        result = bench_size(n_users, args)
+        _print_report(result)
+        results.append(result)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.baseline:
+        problems = _regressions(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        if problems:
+            print("\nregresiones de throughput:")
+            for problem in problems:
+                print(f"  {problem}")
+            sys.exit(1)
+        print("\nsin regresiones contra la línea base")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark de la recuperación local: BM25, vectorial exacta, vectorial IVF e
+híbrida, sin red.
+
+Construye un índice sintético (mismo generador que ingestion_benchmark.py),
+mide la latencia media por consulta de cada modo y el recall@k de IVF contra
+la búsqueda vectorial exacta.
+
+Uso (desde backend/):
+    python benchmarks/retrieval_benchmark.py --records 50000 --queries 200
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.ingestion_benchmark import _WORDS, _use_data_dir, generate_catalogue  # noqa: E402
+from src.agents import ingestion_agent  # noqa: E402
+from src.agents.segments import open_segments  # noqa: E402
+from src.agents.vector_search import VectorSearchEngine  # noqa: E402
+
+
+def _time_per_query(fn, queries) -> float:
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--n-probe", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed + 1)
+    queries = [" ".join(rng.sample(_WORDS, rng.randint(1, 4))) for _ in range(args.queries)]
+    k = args.top_k
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        generate_catalogue(data_dir, args.records, args.seed)
+        index_dir = _use_data_dir(data_dir, "index")
+        ingestion_agent.run_ingestion(full=True)
+
+        index = open_segments(index_dir)
+        start = time.perf_counter()
+        engine = VectorSearchEngine(index, n_probe=args.n_probe, ivf_min_docs=0)
+        build = time.perf_counter() - start
+
+        timings = {
+            "bm25": _time_per_query(lambda q: engine.bm25_search(q, k), queries),
+            "vector (exacta)": _time_per_query(lambda q: engine.vector_search(q, k, exact=True), queries),
+            "vector (IVF)": _time_per_query(lambda q: engine.vector_search(q, k), queries),
+            "híbrida": _time_per_query(lambda q: engine.hybrid_search(q, k), queries),
+        }
+        hits = total = 0
+        for q in queries:
+            exact = {d for d, _ in engine.vector_search(q, k, exact=True)}
+            approx = {d for d, _ in engine.vector_search(q, k)}
+            hits += len(exact & approx)
+            total += len(exact)
+        index.close()
+
+    print(f"documentos:       {len(engine.doc_ids)}")
+    print(f"listas IVF:       {engine.ivf.n_lists} (n_probe={args.n_probe})")
+    print(f"construcción:     {build:.2f} s (embeddings + k-means)")
+    for mode, ms in timings.items():
+        print(f"{mode + ':':<18}{ms:.2f} ms/consulta")
+    print(f"recall@{k} IVF:    {hits / total if total else 1.0:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Estado de entregas de notificaciones (quién ya recibió qué evento).
+
+- en memoria: conjunto de pares (event_id, user_id), consulta O(1)
+- en disco: el snapshot notifications_state.json ({"notified": [...]}, mismo
+  formato de siempre) más un journal append-only con un registro JSON por
+  línea
+- las marcas se acumulan y se escriben juntas con commit() (group commit: un
+  write + un fsync por lote, no uno por envío)
+- cuando el journal crece, se compacta: se reescribe el snapshot de forma
+  atómica con todos los registros y se vacía el journal
+"""
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Registros en el journal a partir de los cuales commit() compacta
+COMPACT_MIN_RECORDS = 10_000
+
+Key = Tuple[Any, Any]
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class DeliveryStateStore:
+    """Deduplicación de entregas con journal y compactación."""
+
+    def __init__(self, path: Path, compact_min_records: int = COMPACT_MIN_RECORDS):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix(".journal")
+        self.compact_min_records = compact_min_records
+        self._records: List[Dict[str, Any]] = []
+        self._keys: Set[Key] = set()
+        self._pending: List[Dict[str, Any]] = []
+        self._journal_records = 0
+        self._signature: Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]] = (None, None)
+        self._load()
+
+    # ------------------------------------------------------------------ carga
+    def _add(self, record: Dict[str, Any]) -> None:
+        key = (record.get("event_id"), record.get("user_id"))
+        if key not in self._keys:
+            self._keys.add(key)
+            self._records.append(record)
+
+    def _load(self) -> None:
+        self._records, self._keys, self._pending = [], set(), []
+        self._journal_records = 0
+        if self.path.exists():
+            snapshot = json.loads(self.path.read_text(encoding="utf-8")) or {}
+            for record in snapshot.get("notified", []):
+                self._add(record)
+        if self.journal_path.exists():
+            with self.journal_path.open("r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # última línea truncada por una caída: el envío no quedó confirmado
+                        continue
+                    self._journal_records += 1
+                    self._add(record)
+        self._signature = self._current_signature()
+
+    def _current_signature(self):
+        return _file_signature(self.path), _file_signature(self.journal_path)
+
+    def refresh(self) -> None:
+        """Recarga si otro proceso escribió el snapshot o el journal."""
+        if not self._pending and self._current_signature() != self._signature:
+            self._load()
+
+    # -------------------------------------------------------------- consulta
+    def __contains__(self, key: Key) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        return self._records
+
+    # ------------------------------------------------------------- escritura
+    def mark(self, event_id: Any, user_id: Any) -> bool:
+        """Marca la entrega en memoria; se persiste en el próximo commit(). False si ya estaba."""
+        key = (event_id, user_id)
+        if key in self._keys:
+            return False
+        record = {
+            "event_id": event_id,
+            "user_id": user_id,
+            "notified_at": datetime.utcnow().isoformat() + "Z",
+        }
+        self._keys.add(key)
+        self._records.append(record)
+        self._pending.append(record)
+        return True
+
+    def commit(self) -> None:
+        """Escribe las marcas pendientes al journal con un solo fsync."""
+        if self._pending:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in self._pending)
+            with self.journal_path.open("a", encoding="utf-8") as fh:
+                fh.write(payload)
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._journal_records += len(self._pending)
+            self._pending = []
+        if self._journal_records >= self.compact_min_records:
+            self.compact()
+        self._signature = self._current_signature()
+
+    def compact(self) -> None:
+        """Reescribe el snapshot con todos los registros (incluidos los pendientes) y vacía el journal."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as fh:
+            fh.write(json.dumps({"notified": self._records}, ensure_ascii=False, indent=2))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.path)
+        # el snapshot ya contiene todo: si hay una caída antes de vaciar el
+        # journal, al cargar sus registros se descartan como duplicados
+        with self.journal_path.open("w", encoding="utf-8") as fh:
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._pending = []
+        self._journal_records = 0
+        self._signature = self._current_signature()
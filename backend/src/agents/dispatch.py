@@ -0,0 +1,210 @@
+"""
+Pipeline asíncrono de envío de notificaciones.
+
+Cada canal (consola, correo y SMS vía ACS) tiene su propia cola acotada y
+un número fijo de workers, así que un canal lento sólo frena sus propios
+envíos:
+
+- concurrencia acotada por canal: `concurrency` workers por cola
+- lotes: los canales con envío masivo (ACS) toman hasta `batch_size`
+  entregas de la cola y las mandan en una sola llamada
+- reintentos con backoff exponencial y jitter para las entregas que fallan
+  (excepción o False); tras `max_attempts` se reportan como fallidas
+- backpressure: submit() espera cuando la cola del canal está llena, de
+  modo que el productor avanza al ritmo de los envíos
+
+Los envíos de los canales son funciones síncronas (print, SDK de ACS) y se
+ejecutan en hilos con asyncio.to_thread para no bloquear el loop.
+"""
+import asyncio
+import random
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Entregas en cola por canal antes de que submit() espere
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF_S = 0.5
+MAX_BACKOFF_S = 30.0
+
+# Envío de un lote: recibe las entregas y devuelve un bool por entrega
+BatchSender = Callable[[List["Delivery"]], Sequence[bool]]
+
+
+@dataclass
+class Delivery:
+    """Una notificación a un usuario por un canal concreto."""
+
+    event_id: Any
+    user: Dict[str, Any]
+    message: str
+    channel: str
+    # eventos que cubre la entrega cuando es un resumen (digest)
+    event_ids: Tuple[Any, ...] = ()
+    seq: int = 0
+    attempts: int = 0
+    error: Optional[str] = None
+
+    @property
+    def user_id(self) -> Any:
+        return self.user.get("user_id")
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Datos de la entrega como dict JSON (para publicarla como evento)."""
+        return {
+            "event_id": self.event_id,
+            "user": self.user,
+            "message": self.message,
+            "channel": self.channel,
+            "event_ids": list(self.event_ids),
+        }
+
+    @classmethod
+    def from_payload(cls, data: Dict[str, Any]) -> "Delivery":
+        return cls(data.get("event_id"), data["user"], data["message"], data["channel"],
+                   event_ids=tuple(data.get("event_ids") or ()))
+
+
+@dataclass
+class Channel:
+    """Configuración de un canal de envío."""
+
+    name: str
+    send_batch: BatchSender
+    concurrency: int = 1
+    # 1 = sin lotes; > 1 sólo para canales con envío masivo
+    batch_size: int = 1
+
+
+def single_sender(send: Callable[[str, Dict[str, Any]], bool]) -> BatchSender:
+    """Adapta un envío individual (message, user) -> bool a la firma por lotes."""
+
+    def send_batch(deliveries: List[Delivery]) -> List[bool]:
+        return [bool(send(d.message, d.user)) for d in deliveries]
+
+    return send_batch
+
+
+@dataclass
+class DispatchResult:
+    delivered: List[Delivery] = field(default_factory=list)
+    failed: List[Delivery] = field(default_factory=list)
+
+
+class DispatchPipeline:
+    """
+    Uso:
+        async with DispatchPipeline(channels) as pipeline:
+            await pipeline.submit(delivery)
+        pipeline.result.delivered
+
+    Al salir del bloque se espera a que todas las colas se vacíen.
+    """
+
+    def __init__(
+        self,
+        channels: Sequence[Channel],
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        backoff_s: float = DEFAULT_BACKOFF_S,
+        on_delivered: Optional[Callable[[Delivery], None]] = None,
+    ):
+        if not channels:
+            raise ValueError("Se necesita al menos un canal")
+        self.channels = {c.name: c for c in channels}
+        self.queue_size = queue_size
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_s = backoff_s
+        self.on_delivered = on_delivered
+        self.result = DispatchResult()
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: List[asyncio.Task] = []
+        self._seq = 0
+
+    # ------------------------------------------------------------- ciclo
+    async def start(self) -> None:
+        for channel in self.channels.values():
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+            self._queues[channel.name] = queue
+            for i in range(max(1, channel.concurrency)):
+                self._workers.append(asyncio.create_task(
+                    self._worker(channel, queue), name=f"dispatch-{channel.name}-{i}"))
+
+    async def close(self) -> None:
+        """Espera a que se procese todo lo encolado y detiene los workers."""
+        try:
+            for queue in self._queues.values():
+                await queue.join()
+        finally:
+            for task in self._workers:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+
+    async def __aenter__(self) -> "DispatchPipeline":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    # ----------------------------------------------------------- entrada
+    async def submit(self, delivery: Delivery) -> None:
+        """Encola la entrega; espera si la cola del canal está llena."""
+        if delivery.channel not in self._queues:
+            raise ValueError(f"Canal desconocido: {delivery.channel}")
+        delivery.seq = self._seq
+        self._seq += 1
+        await self._queues[delivery.channel].put(delivery)
+
+    # ------------------------------------------------------------ envío
+    async def _worker(self, channel: Channel, queue: asyncio.Queue) -> None:
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < channel.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await self._send_with_retries(channel, batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _backoff(self, attempt: int) -> float:
+        # exponencial con jitter completo para no sincronizar reintentos
+        return random.uniform(0, min(MAX_BACKOFF_S, self.backoff_s * 2 ** (attempt - 1)))
+
+    async def _send_with_retries(self, channel: Channel, batch: List[Delivery]) -> None:
+        pending = batch
+        while pending:
+            for d in pending:
+                d.attempts += 1
+            try:
+                outcomes = list(await asyncio.to_thread(channel.send_batch, pending))
+                if len(outcomes) != len(pending):
+                    raise RuntimeError(
+                        f"El canal {channel.name} devolvió {len(outcomes)} resultados para {len(pending)} envíos")
+                errors = [None if ok else "envío rechazado" for ok in outcomes]
+            except Exception as exc:  # el canal falló completo: se reintenta el lote
+                errors = [repr(exc)] * len(pending)
+
+            retry = []
+            for d, error in zip(pending, errors):
+                if error is None:
+                    d.error = None
+                    self.result.delivered.append(d)
+                    if self.on_delivered is not None:
+                        # un fallo del registro (p. ej. E/S del estado) no debe
+                        # matar al worker: la cola quedaría sin task_done()
+                        try:
+                            self.on_delivered(d)
+                        except Exception as exc:
+                            d.error = f"on_delivered: {exc!r}"
+                elif d.attempts >= self.max_attempts:
+                    d.error = error
+                    self.result.failed.append(d)
+                else:
+                    d.error = error
+                    retry.append(d)
+            if retry:
+                await asyncio.sleep(self._backoff(retry[0].attempts))
+            pending = retry
@@ -0,0 +1,164 @@
+"""
+Almacén de documentos en disco con acceso aleatorio por doc id.
+
+Sustituye al archivo .docs.jsonl que SegmentedIndex cargaba completo en
+memoria: cada registro se guarda con prefijos de longitud y una tabla de
+offsets permite leer sólo los documentos pedidos (el top-k de una consulta)
+desde un mmap. El título y el snippet que muestra el RAG se calculan una vez
+en la ingesta y se guardan como campos propios, así que formatear una
+respuesta no necesita decodificar el registro completo.
+
+Formato (little-endian):
+- cabecera: magic, versión, n_docs, offset de la tabla de offsets
+- registros: longitudes de colección, clave, título, snippet e item (JSON),
+  seguidas de esos cinco campos utf-8
+- tabla de offsets: n_docs + 1 enteros de 8 bytes (inicio de cada registro
+  y fin del último), alineada a 8 bytes
+"""
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+from src.agents.compact_index import _SpilledColumn, _pad
+
+MAGIC = b"CPDS"
+VERSION = 1
+# Caracteres del snippet precalculado
+SNIPPET_CHARS = 300
+
+# magic, versión, reservado, n_docs, offset de la tabla de offsets
+_HEADER = struct.Struct("<4sHHQQ")
+# longitudes de colección, clave, título, snippet e item
+_RECORD = struct.Struct("<HHIII")
+_OFFSET = struct.Struct("<Q")
+
+
+def document_title(collection: str, item: Dict[str, Any]) -> str:
+    return item.get("titulo") or item.get("name") or item.get("titulo_evento") or f"{collection} registro"
+
+
+def document_snippet(item: Dict[str, Any]) -> str:
+    return " ".join(str(v) for v in list(item.values())[:4])[:SNIPPET_CHARS]
+
+
+def encode_document(collection: str, key: str, item: Dict[str, Any]) -> bytes:
+    """Registro binario de un documento normalizado, con título y snippet."""
+    fields = [
+        collection.encode("utf-8"),
+        key.encode("utf-8"),
+        str(document_title(collection, item)).encode("utf-8"),
+        document_snippet(item).encode("utf-8"),
+        json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+    ]
+    return _RECORD.pack(*(len(f) for f in fields)) + b"".join(fields)
+
+
+class DocStoreWriter:
+    """
+    Escribe los registros en orden de doc id conforme llegan; la tabla de
+    offsets se acumula en una columna volcada a disco, así que la memoria no
+    crece con el corpus.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._fh = self._tmp_path.open("wb")
+        self._fh.write(b"\0" * _HEADER.size)
+        self._offsets = _SpilledColumn("Q", self.path.parent)
+        self._n_docs = 0
+
+    def add(self, record: bytes) -> int:
+        """Agrega un registro ya codificado (encode_document) y devuelve su doc id."""
+        self._offsets.append(self._fh.tell())
+        self._fh.write(record)
+        self._n_docs += 1
+        return self._n_docs - 1
+
+    def add_document(self, collection: str, key: str, item: Dict[str, Any]) -> int:
+        return self.add(encode_document(collection, key, item))
+
+    def __len__(self) -> int:
+        return self._n_docs
+
+    def close(self) -> None:
+        try:
+            self._offsets.append(self._fh.tell())
+            table_off = _pad(self._fh)
+            self._offsets.copy_to(self._fh)
+            self._fh.seek(0)
+            self._fh.write(_HEADER.pack(MAGIC, VERSION, 0, self._n_docs, table_off))
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+        finally:
+            self._fh.close()
+            self._offsets.close()
+        os.replace(self._tmp_path, self.path)
+
+
+class DocStore:
+    """Lector del almacén: mapea el archivo y decodifica sólo lo que se pide."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fh = self.path.open("rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _reserved, self.n_docs, self._table_off = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Almacén de documentos incompatible: {self.path}")
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def _fields(self, doc_id: int) -> Tuple[int, Tuple[int, int, int, int, int]]:
+        if not 0 <= doc_id < self.n_docs:
+            raise IndexError(doc_id)
+        (start,) = _OFFSET.unpack_from(self._mm, self._table_off + doc_id * _OFFSET.size)
+        return start + _RECORD.size, _RECORD.unpack_from(self._mm, start)
+
+    def record(self, doc_id: int) -> bytes:
+        """Bytes del registro tal como se escribió (para copiarlo al fusionar)."""
+        (start,) = _OFFSET.unpack_from(self._mm, self._table_off + doc_id * _OFFSET.size)
+        (end,) = _OFFSET.unpack_from(self._mm, self._table_off + (doc_id + 1) * _OFFSET.size)
+        return self._mm[start:end]
+
+    def ref(self, doc_id: int) -> Tuple[str, str]:
+        """(colección, clave) del documento."""
+        pos, (coll_len, key_len, *_rest) = self._fields(doc_id)
+        collection = self._mm[pos:pos + coll_len].decode("utf-8")
+        pos += coll_len
+        return collection, self._mm[pos:pos + key_len].decode("utf-8")
+
+    def summary(self, doc_id: int) -> Tuple[str, str, str]:
+        """(colección, título, snippet) sin decodificar el item."""
+        pos, (coll_len, key_len, title_len, snippet_len, _item_len) = self._fields(doc_id)
+        collection = self._mm[pos:pos + coll_len].decode("utf-8")
+        pos += coll_len + key_len
+        title = self._mm[pos:pos + title_len].decode("utf-8")
+        pos += title_len
+        return collection, title, self._mm[pos:pos + snippet_len].decode("utf-8")
+
+    def document(self, doc_id: int) -> Dict[str, Any]:
+        """Registro {collection, key, item} completo."""
+        pos, (coll_len, key_len, title_len, snippet_len, item_len) = self._fields(doc_id)
+        collection = self._mm[pos:pos + coll_len].decode("utf-8")
+        pos += coll_len
+        key = self._mm[pos:pos + key_len].decode("utf-8")
+        pos += key_len + title_len + snippet_len
+        item = json.loads(self._mm[pos:pos + item_len])
+        return {"collection": collection, "key": key, "item": item}
+
+    def close(self) -> None:
+        if not self._mm.closed:
+            self._mm.close()
+        self._fh.close()
+
+    def __enter__(self) -> "DocStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,208 @@
+"""
+Índice espacial de usuarios para el fan-out de notificaciones.
+
+Los usuarios se agrupan por nivel de radio (potencias de 2 en km) y, dentro
+de cada nivel, en una rejilla lat/lon cuyo tamaño de celda es el radio
+máximo del nivel. Para un evento sólo se revisan las celdas que caen en la
+caja envolvente del círculo de ese radio máximo, así que el costo depende de
+los usuarios cercanos y no del total.
+
+El índice sólo descarta candidatos: quien llama sigue aplicando
+haversine_km(...) <= radius_km a cada candidato, así que la semántica es
+exactamente la de recorrer todos los usuarios. Los registros con
+coordenadas o radios fuera de lo normal (NaN, infinitos, latitudes fuera de
+rango, radios mayores a media circunferencia) van a una lista que siempre
+se revisa.
+"""
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+DEFAULT_RADIUS_KM = 20
+# Radio a partir del cual el círculo cubre todo el planeta
+_MAX_RADIUS_KM = math.pi * EARTH_RADIUS_KM
+# Celda mínima (grados) para no crear rejillas enormes con radios diminutos
+_MIN_CELL_DEG = 0.01
+# Holgura para errores de redondeo en la caja envolvente
+_MARGIN = 1e-9
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    # radius earth km
+    R = EARTH_RADIUS_KM
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+    return R * c
+
+
+def user_location(user: Dict[str, Any]) -> Tuple[float, float, float]:
+    """(lat, lon, radio) con las mismas conversiones que filter_relevant_users."""
+    return (
+        float(user.get("lat") or 0),
+        float(user.get("lon") or 0),
+        float(user.get("radius_km", DEFAULT_RADIUS_KM)),
+    )
+
+
+def record_coordinates(record: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """
+    (lat, lon) de un evento o perfil, con las claves lat/lon o
+    latitude/longitude (la que traiga datos válidos); None si no tiene.
+    """
+    for lat_key, lon_key in (("lat", "lon"), ("latitude", "longitude")):
+        if record.get(lat_key) is None or record.get(lon_key) is None:
+            continue
+        try:
+            lat, lon = float(record[lat_key]), float(record[lon_key])
+        except (TypeError, ValueError):
+            continue
+        if math.isfinite(lat) and math.isfinite(lon) and -90.0 <= lat <= 90.0:
+            return lat, lon
+    return None
+
+
+def event_distance(user: Dict[str, Any], event: Dict[str, Any]) -> Optional[float]:
+    """
+    Distancia del usuario al evento si debe recibir la notificación (interés
+    compatible y dentro de su radio), o None. Es la regla de referencia que
+    aplican tanto el recorrido por candidatos como el motor vectorizado.
+    """
+    interests = set(user.get("intereses", []))
+    if event.get("type") and event["type"] not in interests:
+        # permite si intereses vacíos o match explícito
+        if interests:
+            return None
+    lat_u, lon_u, radius = user_location(user)
+    dist = haversine_km(lat_u, lon_u, float(event.get("lat")), float(event.get("lon")))
+    return dist if dist <= radius else None
+
+
+def _radius_tier(radius_km: float) -> int:
+    if radius_km <= 1:
+        return 0
+    tier = math.ceil(math.log2(radius_km))
+    return tier + 1 if 2 ** tier < radius_km else tier
+
+
+class _Grid:
+    """Usuarios de un nivel de radio, por celda (fila de latitud, columna de longitud)."""
+
+    __slots__ = ("max_radius_km", "cell_deg", "n_lon_cells", "cells")
+
+    def __init__(self, max_radius_km: float):
+        self.max_radius_km = max_radius_km
+        self.cell_deg = max(_MIN_CELL_DEG, math.degrees(max_radius_km / EARTH_RADIUS_KM))
+        self.n_lon_cells = math.ceil(360.0 / self.cell_deg)
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+
+    def _lon_col(self, lon: float) -> int:
+        return int(((lon + 180.0) % 360.0) // self.cell_deg) % self.n_lon_cells
+
+    def add(self, idx: int, lat: float, lon: float) -> None:
+        key = (int(math.floor(lat / self.cell_deg)), self._lon_col(lon))
+        self.cells.setdefault(key, []).append(idx)
+
+    def query(self, lat: float, lon: float, out: List[int], radius_km: Optional[float] = None) -> None:
+        ang = (self.max_radius_km if radius_km is None else radius_km) / EARTH_RADIUS_KM
+        dlat = math.degrees(ang) * (1 + _MARGIN) + _MARGIN
+        lat_lo, lat_hi = lat - dlat, lat + dlat
+        cos_lat = math.cos(math.radians(lat))
+        if lat_hi >= 90.0 or lat_lo <= -90.0 or cos_lat <= math.sin(ang):
+            cols = None  # el círculo toca un polo: cualquier longitud
+        else:
+            dlon = math.degrees(math.asin(math.sin(ang) / cos_lat)) * (1 + _MARGIN) + _MARGIN
+            if dlon >= 180.0:
+                cols = None
+            else:
+                first, last = self._lon_col(lon - dlon), self._lon_col(lon + dlon)
+                span = (last - first) % self.n_lon_cells + 1
+                cols = [(first + i) % self.n_lon_cells for i in range(span)]
+        row_lo = int(math.floor(lat_lo / self.cell_deg))
+        row_hi = int(math.floor(lat_hi / self.cell_deg))
+
+        n_wanted = (row_hi - row_lo + 1) * (len(cols) if cols is not None else self.n_lon_cells)
+        if n_wanted > len(self.cells):
+            # caja más grande que las celdas ocupadas: se filtran las ocupadas
+            col_set = set(cols) if cols is not None else None
+            for (row, col), members in self.cells.items():
+                if row_lo <= row <= row_hi and (col_set is None or col in col_set):
+                    out.extend(members)
+            return
+        for row in range(row_lo, row_hi + 1):
+            for col in (cols if cols is not None else range(self.n_lon_cells)):
+                members = self.cells.get((row, col))
+                if members:
+                    out.extend(members)
+
+
+class UserSpatialIndex:
+    """Candidatos por evento: posiciones (en la lista original) de usuarios cercanos."""
+
+    def __init__(self, users: Iterable[Dict[str, Any]]):
+        self._grids: Dict[int, _Grid] = {}
+        # registros que el índice no puede acotar: siempre son candidatos
+        self._always: List[int] = []
+        self.size = 0
+        for idx, user in enumerate(users):
+            self.size += 1
+            lat, lon, radius = user_location(user)
+            if not (math.isfinite(lat) and math.isfinite(lon) and -90.0 <= lat <= 90.0
+                    and math.isfinite(radius) and 0 <= radius < _MAX_RADIUS_KM):
+                self._always.append(idx)
+                continue
+            tier = _radius_tier(radius)
+            grid = self._grids.get(tier)
+            if grid is None:
+                grid = self._grids[tier] = _Grid(float(2 ** tier))
+            grid.add(idx, lat, lon)
+
+    def candidates(self, lat: float, lon: float) -> List[int]:
+        """Posiciones, en orden ascendente, de los usuarios que podrían estar en radio."""
+        out = list(self._always)
+        if math.isfinite(lat) and math.isfinite(lon) and -90.0 <= lat <= 90.0:
+            for grid in self._grids.values():
+                grid.query(lat, lon, out)
+        else:
+            out.extend(i for grid in self._grids.values() for members in grid.cells.values() for i in members)
+        out.sort()
+        return out
+
+
+class EventSpatialIndex:
+    """
+    Eventos en una rejilla lat/lon para la consulta inversa: dado un usuario,
+    los eventos dentro de su radio, ordenados por distancia. Los eventos sin
+    coordenadas válidas quedan en `unlocated`, en el orden de la lista.
+    """
+
+    def __init__(self, events: List[Dict[str, Any]], cell_km: float = DEFAULT_RADIUS_KM):
+        self.events = events
+        self._grid = _Grid(float(cell_km))
+        self._coords: Dict[int, Tuple[float, float]] = {}
+        self.unlocated: List[int] = []
+        for idx, event in enumerate(events):
+            coords = record_coordinates(event)
+            if coords is None:
+                self.unlocated.append(idx)  # sin coordenadas no hay distancia que medir
+                continue
+            self._coords[idx] = coords
+            self._grid.add(idx, *coords)
+
+    def nearby(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, int]]:
+        """(distancia, posición) de los eventos a radius_km o menos, del más cercano al más lejano."""
+        if not (math.isfinite(lat) and math.isfinite(lon) and -90.0 <= lat <= 90.0 and radius_km >= 0):
+            return []
+        candidates: List[int] = []
+        if radius_km >= _MAX_RADIUS_KM:
+            candidates.extend(self._coords)
+        else:
+            self._grid.query(lat, lon, candidates, radius_km)
+        out = []
+        for idx in candidates:
+            dist = haversine_km(lat, lon, *self._coords[idx])
+            if dist <= radius_km:
+                out.append((dist, idx))
+        out.sort()
+        return out
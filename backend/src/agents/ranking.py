@@ -0,0 +1,148 @@
+"""
+Ranking BM25 sobre el índice compacto.
+
+El top-k se obtiene con un recorrido documento a documento estilo MaxScore:
+los términos se ordenan por su contribución máxima posible y, una vez que el
+heap de resultados tiene un umbral, los términos cuya suma de cotas no
+alcanza ese umbral dejan de generar candidatos y sólo se consultan (con
+saltos de bloque) para los documentos que todavía pueden entrar al top-k.
+
+Además, cada bloque de postings guarda su tf máximo y la razón mínima
+longitud/tf de sus documentos (block-max). Como tf / (tf + a + c·dl) =
+1 / (1 + a/tf + c·dl/tf), ambos acotan el score de cualquier documento del
+bloque. Si la suma de esas cotas en el tramo que llega hasta el fin del bloque
+más corto entre los cursores esenciales no supera el umbral, el tramo completo
+se salta sin evaluar sus documentos.
+"""
+import heapq
+import math
+from collections import Counter
+from typing import List, Sequence, Tuple
+
+# Parámetros estándar de BM25
+K1 = 1.2
+B = 0.75
+
+
+def idf(n_docs: int, df: int) -> float:
+    """IDF de BM25 en su variante no negativa."""
+    return math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+
+class _TermScorer:
+    __slots__ = ("cursor", "weight", "upper_bound")
+
+    def __init__(self, cursor, weight: float, upper_bound: float):
+        self.cursor = cursor
+        self.weight = weight
+        self.upper_bound = upper_bound
+
+
+def bm25_top_k(index, query_tokens: Sequence[str], top_k: int,
+               k1: float = K1, b: float = B) -> List[Tuple[int, float]]:
+    """
+    Devuelve [(doc_id, score)] de los top_k documentos por BM25, ordenados por
+    score descendente (empates por doc id ascendente). `index` puede ser un
+    CompactIndex o un SegmentedIndex.
+    """
+    if top_k <= 0 or not index.n_docs:
+        return []
+    avgdl = index.avg_doc_len or 1.0
+    doc_lens = index.doc_lens
+    # normalización de longitud precomputada en las constantes de cada término
+    norm_a = k1 * (1.0 - b)
+    norm_b = k1 * b / avgdl
+
+    scorers: List[_TermScorer] = []
+    for term, qtf in Counter(query_tokens).items():
+        df, max_tf, min_dl = index.term_stats(term)
+        if not df:
+            continue
+        weight = qtf * idf(index.n_docs, df) * (k1 + 1.0)
+        upper_bound = weight * max_tf / (max_tf + norm_a + norm_b * min_dl)
+        scorers.append(_TermScorer(index.cursor(term), weight, upper_bound))
+    if not scorers:
+        return []
+
+    # Orden ascendente por cota: los primeros son los candidatos a "no esenciales"
+    scorers.sort(key=lambda s: s.upper_bound)
+    prefix_bounds = []
+    acc = 0.0
+    for s in scorers:
+        acc += s.upper_bound
+        prefix_bounds.append(acc)
+
+    # Documentos borrados en segmentos (ingesta incremental) que aún no se fusionan
+    deleted = getattr(index, "deleted", None)
+    heap: List[Tuple[float, int]] = []  # (score, -doc_id): el peor resultado arriba
+    threshold = 0.0
+    first_essential = 0
+    # último doc del tramo cuya cota block-max ya se comprobó sin poder saltarlo
+    window_end = -1
+
+    while True:
+        essential = scorers[first_essential:]
+        doc = min((s.cursor.doc for s in essential if s.cursor.doc is not None), default=None)
+        if doc is None:
+            break
+
+        if deleted and doc in deleted:
+            for s in essential:
+                if s.cursor.doc == doc:
+                    s.cursor.next()
+            continue
+
+        if len(heap) == top_k and doc > window_end:
+            # Tramo [doc, upto] hasta el fin del bloque más corto; los cursores
+            # que ya están más allá de upto no aportan nada en él.
+            active = [s for s in essential if s.cursor.doc is not None]
+            upto = min(s.cursor.block_last for s in active)
+            in_window = []
+            bound = prefix_bounds[first_essential - 1] if first_essential else 0.0
+            for s in active:
+                cursor = s.cursor
+                if cursor.doc <= upto:
+                    in_window.append(cursor)
+                    bound += s.weight / (1.0 + norm_a / cursor.block_max_tf + norm_b * cursor.block_min_ratio)
+            if bound <= threshold:
+                # ningún documento del tramo puede entrar al top-k
+                for cursor in in_window:
+                    cursor.next_geq(upto + 1)
+                continue
+            window_end = upto
+
+        dl = doc_lens[doc]
+        score = 0.0
+        for s in essential:
+            cursor = s.cursor
+            if cursor.doc == doc:
+                tf = cursor.tf
+                score += s.weight * tf / (tf + norm_a + norm_b * dl)
+                cursor.next()
+
+        # Términos no esenciales: sólo mientras el documento aún pueda entrar
+        for i in range(first_essential - 1, -1, -1):
+            if len(heap) == top_k and score + prefix_bounds[i] <= threshold:
+                break
+            s = scorers[i]
+            cursor = s.cursor
+            if cursor.next_geq(doc) == doc:
+                tf = cursor.tf
+                score += s.weight * tf / (tf + norm_a + norm_b * dl)
+
+        entry = (score, -doc)
+        if len(heap) < top_k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+        else:
+            continue
+
+        if len(heap) == top_k:
+            threshold = heap[0][0]
+            while first_essential < len(scorers) and prefix_bounds[first_essential] <= threshold:
+                first_essential += 1
+            if first_essential == len(scorers):
+                break
+
+    return [(-neg_doc, score) for score, neg_doc in sorted(heap, reverse=True)]
@@ -0,0 +1,448 @@
+"""
+Índice segmentado para la ingesta incremental.
+
+El índice vive en un directorio con:
+- manifest.json: generación, lista de segmentos activos y, por segmento, los
+  doc ids locales borrados (registros que cambiaron o desaparecieron).
+- seg-XXXXXX.bin: índice compacto (ver compact_index.py) del segmento.
+- seg-XXXXXX.docs: registros normalizados del segmento en un almacén de
+  acceso aleatorio (ver doc_store.py), indexado por doc id local.
+
+Los segmentos son inmutables: una ingesta incremental sólo agrega un segmento
+con los registros nuevos/modificados y marca como borradas sus versiones
+anteriores. El manifest se reemplaza de forma atómica y es el punto de
+commit; cuando hay demasiados segmentos o borrados se fusionan en uno solo
+sin volver a tokenizar.
+"""
+import heapq
+import json
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from src.agents.compact_index import CompactIndex, IndexWriter, PostingCursor
+from src.agents.doc_store import DocStore, DocStoreWriter
+
+MANIFEST_NAME = "manifest.json"
+# Versión del formato de los archivos de segmento; un manifest con otra
+# versión obliga a reconstruir el índice
+SEGMENT_FORMAT = 3
+# Política de fusión
+MAX_SEGMENTS = 8
+MAX_DELETED_RATIO = 0.3
+
+# Estimación de memoria de los postings en construcción (bytes): cada posting
+# ocupa dos enteros de 4 bytes; cada término nuevo, su clave y dos arreglos.
+_POSTING_SIZE = 8
+_TERM_OVERHEAD = 250
+# Entrada de un run en disco: longitud del término, número de postings
+_RUN_ENTRY = struct.Struct("<HI")
+
+
+def segment_name(number: int) -> str:
+    return f"seg-{number:06d}"
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as fh:
+        fh.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_manifest(index_dir: Path) -> Dict[str, Any]:
+    path = index_dir / MANIFEST_NAME
+    if not path.exists():
+        return {"generation": 0, "next_segment": 1, "segments": [], "format": SEGMENT_FORMAT}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_manifest(index_dir: Path, manifest: Dict[str, Any]) -> None:
+    write_json_atomic(index_dir / MANIFEST_NAME, {**manifest, "format": SEGMENT_FORMAT})
+
+
+def manifest_signature(index_dir: Path) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, tamaño) del manifest; cambia en cada commit de la ingesta."""
+    try:
+        st = (Path(index_dir) / MANIFEST_NAME).stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def remove_orphan_segments(index_dir: Path, manifest: Dict[str, Any]) -> None:
+    """Borra archivos de segmentos que ya no referencia el manifest."""
+    live = {seg["name"] for seg in manifest["segments"]}
+    for path in index_dir.glob("seg-*"):
+        if path.name.split(".")[0] not in live:
+            try:
+                path.unlink()
+            except OSError:
+                # Un lector aún lo tiene abierto (Windows); se reintenta en la próxima ingesta
+                pass
+
+
+class SegmentWriter:
+    """
+    Construye un segmento nuevo: guarda los registros en el archivo de
+    documentos conforme llegan y acumula los postings en memoria.
+
+    Con `memory_budget` (bytes), cuando los postings acumulados superan el
+    presupuesto se vuelcan a disco como un "run" ordenado por término; en
+    close() los runs se fusionan (k-way merge) directamente en el índice
+    final. La memoria pico es el presupuesto más la lista de postings del
+    término más frecuente, que se arma completa durante la fusión; no crece
+    con el vocabulario porque el diccionario de IndexWriter va a disco.
+    """
+
+    def __init__(self, index_dir: Path, name: str, collections: Sequence[str],
+                 memory_budget: Optional[int] = None):
+        self.index_dir = Path(index_dir)
+        self.name = name
+        self.collections = list(collections)
+        self.memory_budget = memory_budget
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._docs = DocStoreWriter(self.index_dir / f"{name}.docs")
+        self._writer = IndexWriter(self.index_dir / f"{name}.bin", self.collections)
+        self._n_docs = 0
+        # término -> (doc ids, tfs)
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._memory = 0
+        self._runs: List[BinaryIO] = []
+
+    def add(self, collection: str, key: str, item: Dict[str, Any], tokens: List[str]) -> int:
+        """Agrega un registro ya tokenizado y devuelve su doc id local."""
+        doc_id = self._writer.add_document(collection, self._n_docs, len(tokens))
+        self._n_docs += 1
+        self._docs.add_document(collection, key, item)
+        for t, tf in Counter(tokens).items():
+            entry = self._postings.get(t)
+            if entry is None:
+                entry = self._postings[t] = (array("I"), array("I"))
+                self._memory += _TERM_OVERHEAD + len(t)
+            entry[0].append(doc_id)
+            entry[1].append(tf)
+            self._memory += _POSTING_SIZE
+        if self.memory_budget is not None and self._memory > self.memory_budget:
+            self._spill()
+        return doc_id
+
+    def __len__(self) -> int:
+        return self._n_docs
+
+    def _sorted_postings(self) -> Iterator[Tuple[bytes, array, array]]:
+        for raw, term in sorted((t.encode("utf-8"), t) for t in self._postings):
+            doc_ids, tfs = self._postings[term]
+            yield raw, doc_ids, tfs
+
+    def _spill(self) -> None:
+        """Vuelca los postings en memoria a un run temporal ordenado por término."""
+        run = tempfile.TemporaryFile(dir=self.index_dir)
+        for raw, doc_ids, tfs in self._sorted_postings():
+            run.write(_RUN_ENTRY.pack(len(raw), len(doc_ids)))
+            run.write(raw)
+            run.write(doc_ids.tobytes())
+            run.write(tfs.tobytes())
+        run.seek(0)
+        self._runs.append(run)
+        self._postings = {}
+        self._memory = 0
+
+    def close(self) -> Dict[str, Any]:
+        """Escribe el índice del segmento y devuelve su entrada para el manifest."""
+        self._docs.close()
+        if not self._runs:
+            for raw, doc_ids, tfs in self._sorted_postings():
+                self._writer.add_term(raw.decode("utf-8"), doc_ids, tfs)
+        else:
+            if self._postings:
+                self._spill()
+            # Los runs se generaron en orden de doc id, así que concatenar los
+            # postings de un término en orden de run los mantiene ordenados.
+            streams = [_read_run(run, n) for n, run in enumerate(self._runs)]
+            current: Optional[bytes] = None
+            doc_ids, tfs = array("I"), array("I")
+            for raw, _n, run_docs, run_tfs in heapq.merge(*streams, key=lambda e: (e[0], e[1])):
+                if raw != current:
+                    if current is not None:
+                        self._writer.add_term(current.decode("utf-8"), doc_ids, tfs)
+                    current, doc_ids, tfs = raw, array("I"), array("I")
+                doc_ids.extend(run_docs)
+                tfs.extend(run_tfs)
+            if current is not None:
+                self._writer.add_term(current.decode("utf-8"), doc_ids, tfs)
+            for run in self._runs:
+                run.close()
+        self._postings = {}
+        self._writer.close()
+        return {"name": self.name, "n_docs": self._n_docs, "deleted": []}
+
+
+def _read_run(run: BinaryIO, n: int) -> Iterator[Tuple[bytes, int, array, array]]:
+    while True:
+        header = run.read(_RUN_ENTRY.size)
+        if not header:
+            return
+        term_len, count = _RUN_ENTRY.unpack(header)
+        raw = run.read(term_len)
+        doc_ids, tfs = array("I"), array("I")
+        doc_ids.frombytes(run.read(count * doc_ids.itemsize))
+        tfs.frombytes(run.read(count * tfs.itemsize))
+        yield raw, n, doc_ids, tfs
+
+
+def iter_document_refs(index_dir: Path, name: str) -> Iterator[Tuple[str, str]]:
+    """(colección, clave) de cada documento del segmento, en orden de doc id."""
+    with DocStore(index_dir / f"{name}.docs") as store:
+        for doc_id in range(store.n_docs):
+            yield store.ref(doc_id)
+
+
+def _tagged_terms(reader: CompactIndex, n: int) -> Iterator[Tuple[bytes, int, int]]:
+    for raw, i in reader.iter_terms():
+        yield raw, n, i
+
+
+def merge_segments(index_dir: Path, manifest: Dict[str, Any], collections: Sequence[str]) -> Dict[str, Any]:
+    """
+    Fusiona todos los segmentos del manifest en uno nuevo, descartando los
+    documentos borrados. Reutiliza los postings existentes (sin re-tokenizar)
+    remapeando doc ids. Devuelve el manifest nuevo (sin guardarlo).
+    """
+    name = segment_name(manifest["next_segment"])
+    readers = [CompactIndex(index_dir / f"{seg['name']}.bin") for seg in manifest["segments"]]
+    stores = [DocStore(index_dir / f"{seg['name']}.docs") for seg in manifest["segments"]]
+    try:
+        # doc id viejo (por segmento) -> doc id nuevo; un segmento sin borrados
+        # sólo se desplaza, así que basta su base y no hace falta el mapa
+        remaps: List[Optional[Dict[int, int]]] = []
+        bases: List[int] = []
+        writer = IndexWriter(index_dir / f"{name}.bin", collections)
+        out = DocStoreWriter(index_dir / f"{name}.docs")
+        for seg, reader, store in zip(manifest["segments"], readers, stores):
+            deleted = set(seg["deleted"])
+            remap: Optional[Dict[int, int]] = {} if deleted else None
+            bases.append(len(out))
+            for local_id in range(store.n_docs):
+                if local_id in deleted:
+                    continue
+                collection, _key = store.ref(local_id)
+                new_id = writer.add_document(collection, len(out), reader.doc_lens[local_id])
+                if remap is not None:
+                    remap[local_id] = new_id
+                # el registro se copia tal cual, sin decodificarlo
+                out.add(store.record(local_id))
+            remaps.append(remap)
+        n_docs = len(out)
+        out.close()
+
+        # k-way merge de los diccionarios (ya ordenados) de cada segmento
+        streams = [_tagged_terms(reader, n) for n, reader in enumerate(readers)]
+        current: Optional[bytes] = None
+        doc_ids: List[int] = []
+        tfs: List[int] = []
+        for raw, n, i in heapq.merge(*streams):
+            if raw != current:
+                if doc_ids:
+                    writer.add_term(current.decode("utf-8"), doc_ids, tfs)
+                current, doc_ids, tfs = raw, [], []
+            remap = remaps[n]
+            if remap is None:
+                base = bases[n]
+                for local_id, tf in readers[n].postings_at(i):
+                    doc_ids.append(base + local_id)
+                    tfs.append(tf)
+                continue
+            for local_id, tf in readers[n].postings_at(i):
+                new_id = remap.get(local_id)
+                if new_id is not None:
+                    doc_ids.append(new_id)
+                    tfs.append(tf)
+        if doc_ids:
+            writer.add_term(current.decode("utf-8"), doc_ids, tfs)
+        writer.close()
+    finally:
+        for reader in readers:
+            reader.close()
+        for store in stores:
+            store.close()
+
+    return {
+        "generation": manifest["generation"],
+        "next_segment": manifest["next_segment"] + 1,
+        "segments": [{"name": name, "n_docs": n_docs, "deleted": []}],
+    }
+
+
+def needs_merge(manifest: Dict[str, Any]) -> bool:
+    segments = manifest["segments"]
+    total = sum(seg["n_docs"] for seg in segments)
+    deleted = sum(len(seg["deleted"]) for seg in segments)
+    return len(segments) > MAX_SEGMENTS or (total and deleted / total > MAX_DELETED_RATIO)
+
+
+class _MultiCursor:
+    """Concatena los cursores de varios segmentos en el espacio de doc ids global."""
+
+    __slots__ = ("_parts", "_k", "doc")
+
+    def __init__(self, parts: List[Tuple[int, PostingCursor]]):
+        self._parts = parts
+        self._k = 0
+        self.doc: Optional[int] = None
+        self._settle()
+
+    def _settle(self) -> None:
+        while self._k < len(self._parts):
+            base, cursor = self._parts[self._k]
+            if cursor.doc is not None:
+                self.doc = base + cursor.doc
+                return
+            self._k += 1
+        self.doc = None
+
+    @property
+    def tf(self) -> int:
+        return self._parts[self._k][1].tf
+
+    @property
+    def block_last(self) -> int:
+        base, cursor = self._parts[self._k]
+        return base + cursor.block_last
+
+    @property
+    def block_max_tf(self) -> int:
+        return self._parts[self._k][1].block_max_tf
+
+    @property
+    def block_min_ratio(self) -> float:
+        return self._parts[self._k][1].block_min_ratio
+
+    def next(self) -> Optional[int]:
+        self._parts[self._k][1].next()
+        self._settle()
+        return self.doc
+
+    def next_geq(self, target: int) -> Optional[int]:
+        if self.doc is None or self.doc >= target:
+            return self.doc
+        while self._k < len(self._parts):
+            base, cursor = self._parts[self._k]
+            nxt = self._parts[self._k + 1][0] if self._k + 1 < len(self._parts) else None
+            if nxt is None or target < nxt:
+                cursor.next_geq(target - base)
+                break
+            self._k += 1
+        self._settle()
+        return self.doc
+
+
+class _DocLens:
+    __slots__ = ("_bases", "_segments")
+
+    def __init__(self, bases: List[int], segments: List[CompactIndex]):
+        self._bases = bases
+        self._segments = segments
+
+    def __getitem__(self, doc_id: int) -> int:
+        k = bisect_right(self._bases, doc_id) - 1
+        return self._segments[k].doc_lens[doc_id - self._bases[k]]
+
+
+class SegmentedIndex:
+    """
+    Vista de lectura sobre todos los segmentos del manifest, con la misma
+    interfaz que CompactIndex (n_docs, doc_lens, term_stats, cursor...) para
+    que el ranking BM25 no distinga entre uno y varios segmentos. Los doc ids
+    globales son base del segmento + doc id local.
+    """
+
+    def __init__(self, index_dir: Path):
+        self.index_dir = Path(index_dir)
+        manifest = load_manifest(self.index_dir)
+        self.generation: int = manifest["generation"]
+        self._segments: List[CompactIndex] = []
+        self._docs: List[DocStore] = []
+        self._bases: List[int] = []
+        self.deleted: Set[int] = set()
+        base = 0
+        for seg in manifest["segments"]:
+            reader = CompactIndex(self.index_dir / f"{seg['name']}.bin")
+            self._segments.append(reader)
+            self._docs.append(DocStore(self.index_dir / f"{seg['name']}.docs"))
+            self._bases.append(base)
+            self.deleted.update(base + d for d in seg["deleted"])
+            base += reader.n_docs
+        self.n_docs = base
+        self.total_len = sum(s.total_len for s in self._segments)
+        if len(self._segments) == 1:
+            self.doc_lens = self._segments[0].doc_lens
+        else:
+            self.doc_lens = _DocLens(self._bases, self._segments)
+
+    @property
+    def avg_doc_len(self) -> float:
+        return self.total_len / self.n_docs if self.n_docs else 0.0
+
+    def term_stats(self, term: str) -> Tuple[int, int, int]:
+        df, max_tf, min_dl = 0, 0, 0
+        for seg in self._segments:
+            s_df, s_max_tf, s_min_dl = seg.term_stats(term)
+            if s_df:
+                min_dl = s_min_dl if not df else min(min_dl, s_min_dl)
+                df += s_df
+                max_tf = max(max_tf, s_max_tf)
+        return df, max_tf, min_dl
+
+    def cursor(self, term: str):
+        parts = []
+        for base, seg in zip(self._bases, self._segments):
+            cursor = seg.cursor(term)
+            if cursor is not None:
+                parts.append((base, cursor))
+        if not parts:
+            return None
+        if len(parts) == 1 and parts[0][0] == 0:
+            return parts[0][1]
+        return _MultiCursor(parts)
+
+    def postings(self, term: str) -> List[Tuple[int, int]]:
+        out: List[Tuple[int, int]] = []
+        for base, seg in zip(self._bases, self._segments):
+            out.extend((base + d, tf) for d, tf in seg.postings(term) if base + d not in self.deleted)
+        return out
+
+    def document(self, doc_id: int) -> Dict[str, Any]:
+        """Registro {collection, key, item} del doc id global."""
+        k = bisect_right(self._bases, doc_id) - 1
+        return self._docs[k].document(doc_id - self._bases[k])
+
+    def summary(self, doc_id: int) -> Tuple[str, str, str]:
+        """(colección, título, snippet) precalculados del doc id global."""
+        k = bisect_right(self._bases, doc_id) - 1
+        return self._docs[k].summary(doc_id - self._bases[k])
+
+    def close(self) -> None:
+        for seg in self._segments:
+            seg.close()
+        for store in self._docs:
+            store.close()
+
+
+def open_segments(index_dir: Path) -> Optional[SegmentedIndex]:
+    """
+    Abre el índice segmentado; None si aún no se ha ejecutado la ingesta o
+    si el índice es de un formato anterior (la próxima ingesta lo reconstruye).
+    """
+    if not (Path(index_dir) / MANIFEST_NAME).exists():
+        return None
+    if load_manifest(Path(index_dir)).get("format") != SEGMENT_FORMAT:
+        return None
+    return SegmentedIndex(index_dir)
@@ -0,0 +1,104 @@
+"""Offline retrieval client with the same interface as AzureSearchClient."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from src.agents.segments import manifest_signature, open_segments
+from src.agents.vector_search import SEARCH_MODES, VectorSearchEngine
+
+from ..core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LocalSearchClient:
+    """Searches the local ingestion index (BM25, vector ANN or hybrid fusion).
+
+    The engine is built lazily from ``<data_root>/index``. When the ingestion
+    manifest changes, a replacement is built on a background thread while
+    queries keep using the previous engine, which is swapped out once ready.
+    """
+
+    settings: Settings
+    top: int = 3
+    _engine: Optional[VectorSearchEngine] = None
+    _signature: Optional[tuple[int, int]] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _rebuilding: bool = False
+
+    def __post_init__(self) -> None:
+        if self.settings.local_search_mode not in SEARCH_MODES:
+            raise ValueError(
+                f"LOCAL_SEARCH_MODE must be one of {', '.join(SEARCH_MODES)}"
+            )
+
+    @property
+    def index_dir(self):
+        return self.settings.datasets_dir / "index"
+
+    def _build(self) -> None:
+        """Builds the engine for the current manifest and swaps it in."""
+
+        signature = manifest_signature(self.index_dir)
+        index = open_segments(self.index_dir)
+        engine = VectorSearchEngine(index) if index is not None else None
+        self._engine, self._signature = engine, signature
+
+    def _rebuild_in_background(self) -> None:
+        try:
+            # keep going until the engine matches the manifest: ingestion may
+            # have run again while the previous rebuild was in progress
+            while manifest_signature(self.index_dir) != self._signature:
+                self._build()
+        except Exception:
+            logger.exception("Failed to rebuild the local search index")
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def _current_engine(self) -> Optional[VectorSearchEngine]:
+        if manifest_signature(self.index_dir) == self._signature:
+            return self._engine
+        with self._lock:
+            if self._signature is None:
+                # nothing to serve yet: the first build happens inline
+                self._build()
+            elif not self._rebuilding and manifest_signature(self.index_dir) != self._signature:
+                self._rebuilding = True
+                threading.Thread(
+                    target=self._rebuild_in_background, name="local-search-rebuild", daemon=True
+                ).start()
+            return self._engine
+
+    @staticmethod
+    def _to_payload(doc: dict[str, Any]) -> dict[str, str]:
+        item = doc["item"] or {}
+        title = item.get("titulo") or item.get("name") or item.get("nombre") or "Documento oficial"
+        snippet = (
+            item.get("description")
+            or item.get("descripcion")
+            or item.get("resumen")
+            or " ".join(str(v) for v in list(item.values())[:4])
+        )
+        url = item.get("url") or item.get("enlace") or f"civicpulse://{doc['collection']}/{doc['key']}"
+        return {"title": str(title), "snippet": str(snippet)[:300], "url": str(url)}
+
+    def search_sync(self, query: str) -> list[dict[str, str]]:
+        try:
+            engine = self._current_engine()
+            if engine is None or not query:
+                return []
+            hits = engine.search(query, self.top, mode=self.settings.local_search_mode)
+            return [self._to_payload(engine.document(doc_id)) for doc_id, _score in hits]
+        except Exception:  # same contract as AzureSearchClient: chat goes on without context
+            logger.exception("Local search failed")
+            return []
+
+    async def search(self, query: str) -> list[dict[str, str]]:
+        return await asyncio.to_thread(self.search_sync, query)
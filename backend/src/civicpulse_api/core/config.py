@@ -27,6 +27,8 @@ class Settings(BaseSettings):
     azure_search_endpoint: str | None = Field(default=None, alias="AZURE_AI_SEARCH_ENDPOINT")
     azure_search_index: str | None = Field(default=None, alias="AZURE_AI_SEARCH_INDEX")
     azure_search_api_key: str | None = Field(default=None, alias="AZURE_AI_SEARCH_API_KEY")
+    # Offline retrieval used when Azure AI Search is not configured: bm25 | vector | hybrid
+    local_search_mode: str = Field(default="hybrid", alias="LOCAL_SEARCH_MODE")
     azure_maps_client_id: str | None = Field(default=None, alias="AZURE_MAPS_CLIENT_ID")
     azure_content_safety_endpoint: str | None = Field(default=None, alias="AZURE_CONTENT_SAFETY_ENDPOINT")
 
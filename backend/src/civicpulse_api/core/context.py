@@ -20,6 +20,7 @@ class AppContext:
     accessibility_service: "AccessibilityService"
     moderation_service: "ModerationService"
     orchestrator: "Orchestrator"
+    notification_publisher: "NotificationPublisher"
 
 
 def build_context(settings: Settings) -> AppContext:
@@ -28,6 +29,10 @@ def build_context(settings: Settings) -> AppContext:
     from ..repositories.profile_repository import ProfileRepository
     from ..repositories.forum_repository import ForumRepository
     from ..repositories.events_repository import CivicEventRepository
+    from ..repositories.notifications_repository import (
+        NotificationPreferenceRepository,
+        NotificationTemplateRepository,
+    )
     from ..services.profile_service import ProfileService
     from ..services.forum_service import ForumService
     from ..services.chat_service import ChatService
@@ -35,6 +40,7 @@ def build_context(settings: Settings) -> AppContext:
     from ..services.map_service import MapService
     from ..services.accessibility_service import AccessibilityService
     from ..services.moderation_service import ModerationService
+    from ..events.publisher import NotificationPublisher
     from src.agents.orchestrator import Orchestrator
 
     profile_repo = ProfileRepository(settings)
@@ -44,11 +50,17 @@ def build_context(settings: Settings) -> AppContext:
     profile_service = ProfileService(profile_repo)
     forum_service = ForumService(forum_repo)
     chat_service = ChatService(profile_service)
-    notifications_service = NotificationsService(profile_service)
+    notifications_service = NotificationsService(
+        profile_service,
+        NotificationPreferenceRepository(settings),
+        NotificationTemplateRepository(settings),
+        events_repo,
+    )
     map_service = MapService(events_repo)
     accessibility_service = AccessibilityService()
     moderation_service = ModerationService()
     orchestrator = Orchestrator()
+    notification_publisher = NotificationPublisher()
 
     return AppContext(
         settings=settings,
@@ -60,4 +72,5 @@ def build_context(settings: Settings) -> AppContext:
         accessibility_service=accessibility_service,
         moderation_service=moderation_service,
         orchestrator=orchestrator,
+        notification_publisher=notification_publisher,
     )
@@ -6,6 +6,7 @@ from functools import lru_cache
 
 from .clients.azure_openai import AzureOpenAIClient
 from .clients.azure_search import AzureSearchClient
+from .clients.local_search import LocalSearchClient
 from .clients.content_safety import ContentSafetyClient
 from .core.config import Settings, get_settings
 from .core.context import AppContext, build_context
@@ -23,9 +24,15 @@ def get_app_context() -> AppContext:
     """Return a bootstrapped service container."""
 
     context = build_context(get_app_settings())
+    settings = context.settings
+    search_client: AzureSearchClient | LocalSearchClient
+    if settings.azure_search_endpoint and settings.azure_search_index:
+        search_client = AzureSearchClient(settings)
+    else:
+        search_client = LocalSearchClient(settings)
     context.chat_service.register_clients(
-        llm_client=AzureOpenAIClient(context.settings),
-        search_client=AzureSearchClient(context.settings),
+        llm_client=AzureOpenAIClient(settings),
+        search_client=search_client,
     )
     context.moderation_service.register_client(
         ContentSafetyClient(context.settings)
@@ -1,9 +1,193 @@
-"""Event publisher placeholder for Azure Event Grid / ACS."""
+"""Queue-backed notification publisher with an in-process Event Grid stand-in."""
 
 from __future__ import annotations
 
+import asyncio
+import logging
+import random
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
 
+from src.agents.dispatch import Delivery, DispatchPipeline
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[dict[str, Any]], Awaitable[None]]
+
+DEFAULT_EVENT_TYPE = "CivicPulse.Notification.Created"
+DISPATCH_SUBJECT_PREFIX = "notifications/dispatch/"
+
+
+def make_event(
+    payload: dict[str, Any],
+    event_type: str = DEFAULT_EVENT_TYPE,
+    subject: str = "notifications",
+) -> dict[str, Any]:
+    """Wrap a payload in the Event Grid event schema."""
+
+    return {
+        "id": str(uuid.uuid4()),
+        "eventType": event_type,
+        "subject": subject,
+        "eventTime": datetime.now(timezone.utc).isoformat(),
+        "data": payload,
+        "dataVersion": "1.0",
+    }
+
+
+@dataclass
+class LocalEventGrid:
+    """In-process stand-in for an Event Grid topic.
+
+    Subscribers register an async handler, optionally filtered by event type
+    and subject. Each event is delivered to every matching subscriber with
+    exponential backoff between attempts; events that exhaust their retries,
+    or that no subscription matches, are kept in ``dead_letters`` instead of
+    being dropped.
+    """
+
+    max_attempts: int = 3
+    backoff_s: float = 0.5
+    max_backoff_s: float = 30.0
+    _subscriptions: list[tuple[Optional[str], Optional[str], EventHandler]] = field(default_factory=list)
+    dead_letters: list[dict[str, Any]] = field(default_factory=list)
+
+    def subscribe(
+        self,
+        handler: EventHandler,
+        event_type: Optional[str] = None,
+        subject: Optional[str] = None,
+    ) -> None:
+        self._subscriptions.append((event_type, subject, handler))
+
+    def unsubscribe(self, handler: EventHandler) -> None:
+        self._subscriptions = [s for s in self._subscriptions if s[2] is not handler]
+
+    async def send(self, event: dict[str, Any]) -> None:
+        targets = [
+            handler
+            for event_type, subject, handler in self._subscriptions
+            if (event_type is None or event_type == event["eventType"])
+            and (subject is None or subject == event["subject"])
+        ]
+        if not targets:
+            logger.warning("No subscriber for event %s (%s)", event["id"], event["subject"])
+            self.dead_letters.append({**event, "deadLetterReason": "no subscriber"})
+            return
+        await asyncio.gather(*(self._deliver(handler, event) for handler in targets))
+
+    async def _deliver(self, handler: EventHandler, event: dict[str, Any]) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await handler(event)
+                return
+            except Exception as exc:  # retried, then dead-lettered
+                if attempt == self.max_attempts:
+                    logger.warning("Dead-lettering event %s: %r", event["id"], exc)
+                    self.dead_letters.append({**event, "deadLetterReason": repr(exc)})
+                    return
+                delay = min(self.max_backoff_s, self.backoff_s * 2 ** (attempt - 1))
+                await asyncio.sleep(random.uniform(0, delay))
+
+
+@dataclass
 class NotificationPublisher:
-    async def publish(self, payload: dict) -> None:  # pragma: no cover - stub
-        # TODO: Wire Azure Event Grid or Communication Services
-        return None
+    """Bounded queue in front of the event topic.
+
+    ``publish`` returns as soon as the event is queued and waits only when the
+    queue is full, which applies backpressure to producers. A pool of
+    consumer tasks drains the queue into ``topic`` (the in-process
+    ``LocalEventGrid`` unless another transport with a ``send`` coroutine is
+    given).
+    """
+
+    topic: LocalEventGrid = field(default_factory=LocalEventGrid)
+    max_queue_size: int = 1000
+    concurrency: int = 4
+    _queue: Optional[asyncio.Queue] = None
+    _workers: list[asyncio.Task] = field(default_factory=list)
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self.started:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [
+            asyncio.create_task(self._consume(), name=f"notification-publisher-{i}")
+            for i in range(max(1, self.concurrency))
+        ]
+
+    async def stop(self) -> None:
+        """Drain queued events, then stop the consumers."""
+
+        if not self.started:
+            return
+        try:
+            await self._queue.join()
+        finally:
+            for task in self._workers:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+
+    async def publish(
+        self,
+        payload: dict,
+        event_type: str = DEFAULT_EVENT_TYPE,
+        subject: str = "notifications",
+    ) -> None:
+        if not self.started:
+            await self.start()
+        await self._queue.put(make_event(payload, event_type, subject))
+
+    async def join(self) -> None:
+        """Wait until every queued event has been handed to the topic."""
+
+        if self.started:
+            await self._queue.join()
+
+    @asynccontextmanager
+    async def dispatch_into(
+        self, pipeline: DispatchPipeline
+    ) -> AsyncIterator[Callable[[Delivery], Awaitable[None]]]:
+        """Route deliveries through the topic into ``pipeline``.
+
+        Yields a ``submit`` coroutine that publishes each delivery as a
+        notification event. A subscription scoped to this call (its own
+        subject) turns the events back into deliveries and feeds
+        ``pipeline``; other subscribers of the event type see them too. On
+        exit, queued events are drained before the subscription is removed.
+        """
+
+        subject = f"{DISPATCH_SUBJECT_PREFIX}{uuid.uuid4().hex}"
+
+        async def handler(event: dict[str, Any]) -> None:
+            await pipeline.submit(Delivery.from_payload(event["data"]))
+
+        async def submit(delivery: Delivery) -> None:
+            await self.publish(delivery.to_payload(), subject=subject)
+
+        self.topic.subscribe(handler, DEFAULT_EVENT_TYPE, subject)
+        try:
+            yield submit
+        finally:
+            try:
+                await self.join()
+            finally:
+                self.topic.unsubscribe(handler)
+
+    async def _consume(self) -> None:
+        while True:
+            event = await self._queue.get()
+            try:
+                await self.topic.send(event)
+            except Exception:  # keep the consumer alive
+                logger.exception("Failed to deliver event %s", event["id"])
+            finally:
+                self._queue.task_done()
@@ -33,7 +33,11 @@ def create_app() -> FastAPI:
     # Prime context on startup to fail fast if datasets are missing
     @app.on_event("startup")
     async def _startup() -> None:  # pragma: no cover - FastAPI hook
-        get_app_context()
+        await get_app_context().notification_publisher.start()
+
+    @app.on_event("shutdown")
+    async def _shutdown() -> None:  # pragma: no cover - FastAPI hook
+        await get_app_context().notification_publisher.stop()
 
     return app
 
@@ -2,7 +2,7 @@
 
 from .user import CivicProfile, AccessibilityPreferences
 from .chat import ChatRequest, ChatMessage, ChatResponse
-from .forum import ForumThread, ForumPost
+from .forum import ForumPost, ForumPostPage, ForumThread, ForumThreadPage, ForumThreadSummary
 from .map import CivicEvent
 from .notifications import NotificationPreference, NotificationItem
 
@@ -14,7 +14,10 @@ __all__ = [
     "ChatRequest",
     "ChatResponse",
     "ForumPost",
+    "ForumPostPage",
     "ForumThread",
+    "ForumThreadPage",
+    "ForumThreadSummary",
     "NotificationItem",
     "NotificationPreference",
 ]
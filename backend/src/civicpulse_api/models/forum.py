@@ -4,10 +4,12 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ForumPost(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: str
     author: str
     content: str
@@ -16,8 +18,31 @@ class ForumPost(BaseModel):
 
 
 class ForumThread(BaseModel):
+    # frozen: repositories share cached instances across requests
+    model_config = ConfigDict(frozen=True)
+
+    id: str
+    title: str
+    municipality: str
+    tags: tuple[str, ...] = ()
+    posts: tuple[ForumPost, ...] = ()
+
+
+class ForumThreadSummary(BaseModel):
+    """Thread listing entry; posts are fetched separately, page by page."""
+
     id: str
     title: str
     municipality: str
     tags: list[str] = Field(default_factory=list)
-    posts: list[ForumPost] = Field(default_factory=list)
+    post_count: int = 0
+
+
+class ForumThreadPage(BaseModel):
+    items: list[ForumThreadSummary]
+    next_cursor: str | None = None
+
+
+class ForumPostPage(BaseModel):
+    items: list[ForumPost]
+    next_cursor: str | None = None
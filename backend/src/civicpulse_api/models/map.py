@@ -4,10 +4,13 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict
 
 
 class CivicEvent(BaseModel):
+    # frozen: repositories share cached instances across requests
+    model_config = ConfigDict(frozen=True)
+
     id: str
     name: str
     category: str
@@ -18,4 +21,4 @@ class CivicEvent(BaseModel):
     description: str | None = None
     starts_at: datetime | None = None
     ends_at: datetime | None = None
-    tags: list[str] = Field(default_factory=list)
+    tags: tuple[str, ...] = ()
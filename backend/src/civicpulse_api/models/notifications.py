@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class NotificationPreference(BaseModel):
@@ -14,9 +14,12 @@ class NotificationPreference(BaseModel):
 
 
 class NotificationItem(BaseModel):
+    # frozen: the notifications service shares cached previews across requests
+    model_config = ConfigDict(frozen=True)
+
     id: str
     title: str
     body: str
     municipality: str
     published_at: datetime
-    tags: list[str] = Field(default_factory=list)
+    tags: tuple[str, ...] = ()
@@ -4,10 +4,12 @@ from __future__ import annotations
 
 from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class AccessibilityPreferences(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     language: str = "es"
     font_scale: float = Field(default=1.0, ge=0.8, le=2.0)
     high_contrast: bool = False
@@ -15,11 +17,14 @@ class AccessibilityPreferences(BaseModel):
 
 
 class CivicProfile(BaseModel):
+    # frozen: repositories share cached instances across requests
+    model_config = ConfigDict(frozen=True)
+
     id: str
     display_name: str
     municipality: str
-    interests: list[str] = Field(default_factory=list)
-    tags: list[str] = Field(default_factory=list)
+    interests: tuple[str, ...] = ()
+    tags: tuple[str, ...] = ()
     email: str | None = None
     phone: str | None = None
     accessibility: AccessibilityPreferences = Field(default_factory=AccessibilityPreferences)
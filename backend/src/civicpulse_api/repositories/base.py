@@ -3,23 +3,85 @@
 from __future__ import annotations
 
 import json
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, ClassVar
+
+from pydantic import BaseModel
 
 from ..core.config import Settings
 
 
+@dataclass(frozen=True, slots=True)
+class RepositorySnapshot:
+    """Parsed records and the structures built from them for one file version."""
+
+    signature: tuple[int, int, int]
+    records: tuple[dict[str, Any], ...]
+    items: Any
+
+
 class JSONRepository:
-    """Simple helper to read immutable JSON datasets bundled with the repo."""
+    """Simple helper to read immutable JSON datasets bundled with the repo.
+
+    The file is parsed and validated once per version: ``snapshot()`` keeps the
+    result until the file's mtime, size or inode changes, and concurrent first
+    loads are single-flighted behind a lock. Subclasses set ``model`` to get a
+    tuple of validated models, or override ``build`` to add indexes. The
+    cached models are shared by every caller, so ``model`` must be frozen.
+    """
+
+    model: ClassVar[type[BaseModel] | None] = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if cls.model is not None and not cls.model.model_config.get("frozen"):
+            raise TypeError(f"{cls.__name__}.model must be a frozen model: snapshot instances are shared")
 
     def __init__(self, settings: Settings, filename: str) -> None:
         self._settings = settings
         self._filename = filename
+        self._snapshot: RepositorySnapshot | None = None
+        self._snapshot_lock = threading.Lock()
 
     @property
     def data_path(self) -> Path:
         return self._settings.datasets_dir / self._filename
 
+    def signature(self) -> tuple[int, int, int] | None:
+        """(mtime_ns, size, inode) of the dataset, or None if it does not exist."""
+
+        try:
+            stat = self.data_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def build(self, records: tuple[dict[str, Any], ...]) -> Any:
+        """Structure served from the snapshot; validated models by default."""
+
+        if self.model is None:
+            return records
+        return tuple(self.model.model_validate(item) for item in records)
+
+    def snapshot(self) -> RepositorySnapshot:
+        signature = self.signature()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+        with self._snapshot_lock:
+            # another thread may have loaded it while we waited
+            signature = self.signature()
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.signature != signature:
+                # stat before reading: a write racing with the read leaves an
+                # older signature behind, so the next call reloads
+                with self.data_path.open("r", encoding="utf-8") as handle:
+                    records = tuple(json.load(handle))
+                snapshot = RepositorySnapshot(signature, records, self.build(records))
+                self._snapshot = snapshot
+            return snapshot
+
     def load(self) -> list[dict[str, Any]]:
-        with self.data_path.open("r", encoding="utf-8") as handle:
-            return json.load(handle)
+        return list(self.snapshot().records)
@@ -8,8 +8,10 @@ from ..models.map import CivicEvent
 
 
 class CivicEventRepository(JSONRepository):
+    model = CivicEvent
+
     def __init__(self, settings: Settings) -> None:
         super().__init__(settings, "events.json")
 
     def list(self) -> list[CivicEvent]:
-        return [CivicEvent.model_validate(item) for item in self.load()]
+        return list(self.snapshot().items)
@@ -2,14 +2,82 @@
 
 from __future__ import annotations
 
+from dataclasses import dataclass
+from typing import Any
+
 from .base import JSONRepository
 from ..core.config import Settings
-from ..models.forum import ForumThread
+from ..models.forum import ForumPost, ForumThread, ForumThreadSummary
+
+
+class ThreadNotFoundError(LookupError):
+    """Raised when a forum thread id is not in the current dataset."""
+
+
+@dataclass(frozen=True, slots=True)
+class ForumCatalog:
+    """Threads of one dataset version with their summaries precomputed."""
+
+    threads: tuple[ForumThread, ...]
+    summaries: tuple[ForumThreadSummary, ...]
+    positions: dict[str, int]
+
+    @classmethod
+    def build(cls, threads: tuple[ForumThread, ...]) -> ForumCatalog:
+        summaries = tuple(
+            ForumThreadSummary(
+                id=thread.id,
+                title=thread.title,
+                municipality=thread.municipality,
+                tags=thread.tags,
+                post_count=len(thread.posts),
+            )
+            for thread in threads
+        )
+        positions: dict[str, int] = {}
+        for position, thread in enumerate(threads):
+            positions.setdefault(thread.id, position)
+        return cls(threads=threads, summaries=summaries, positions=positions)
 
 
 class ForumRepository(JSONRepository):
+    """Forum threads with cursor pagination.
+
+    A cursor is the key of the first item of the next page (here, its
+    position in the snapshot), or None after the last page. The SQLite forum
+    store (src/forum_store.py) uses the same convention with row keys.
+    """
+
+    model = ForumThread
+
     def __init__(self, settings: Settings) -> None:
         super().__init__(settings, "user_forums.json")
 
+    def build(self, records: tuple[dict[str, Any], ...]) -> ForumCatalog:
+        return ForumCatalog.build(super().build(records))
+
+    def _catalog(self) -> ForumCatalog:
+        return self.snapshot().items
+
     def list(self) -> list[ForumThread]:
-        return [ForumThread.model_validate(item) for item in self.load()]
+        return list(self._catalog().threads)
+
+    def page_summaries(self, cursor: str | None, limit: int) -> tuple[list[ForumThreadSummary], str | None]:
+        """Summaries from offset ``cursor``, plus the next offset or None."""
+
+        summaries = self._catalog().summaries
+        start = int(cursor) if cursor else 0
+        end = start + limit
+        return list(summaries[start:end]), str(end) if end < len(summaries) else None
+
+    def page_posts(self, thread_id: str, cursor: str | None, limit: int) -> tuple[list[ForumPost], str | None]:
+        """Posts of one thread from offset ``cursor``, plus the next offset or None."""
+
+        catalog = self._catalog()
+        position = catalog.positions.get(thread_id)
+        if position is None:
+            raise ThreadNotFoundError(f"Thread {thread_id} not found")
+        posts = catalog.threads[position].posts
+        start = int(cursor) if cursor else 0
+        end = start + limit
+        return list(posts[start:end]), str(end) if end < len(posts) else None
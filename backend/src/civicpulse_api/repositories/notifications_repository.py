@@ -0,0 +1,76 @@
+"""Notification templates and per-profile notification preferences."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any
+
+from .base import JSONRepository
+from ..core.config import Settings
+from ..models.notifications import NotificationPreference
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class NotificationTemplateRepository(JSONRepository):
+    """Templates as read-only mappings: the snapshot is shared by every caller."""
+
+    def __init__(self, settings: Settings) -> None:
+        super().__init__(settings, "notifications.json")
+
+    def build(self, records: tuple[dict[str, Any], ...]) -> tuple[Mapping[str, Any], ...]:
+        return tuple(_freeze(record) for record in records)
+
+    def list(self) -> list[Mapping[str, Any]]:
+        if not self.data_path.exists():
+            return []
+        return list(self.snapshot().items)
+
+
+class NotificationPreferenceRepository(JSONRepository):
+    """Preferences keyed by profile id, kept in memory and written through to disk."""
+
+    def __init__(self, settings: Settings) -> None:
+        super().__init__(settings, "notification_preferences.json")
+        self._lock = threading.Lock()
+        self._preferences: dict[str, NotificationPreference] | None = None
+
+    def _all(self) -> dict[str, NotificationPreference]:
+        if self._preferences is None:
+            raw: dict[str, Any] = {}
+            if self.data_path.exists():
+                with self.data_path.open("r", encoding="utf-8") as handle:
+                    raw = json.load(handle) or {}
+            self._preferences = {
+                profile_id: NotificationPreference.model_validate(item)
+                for profile_id, item in raw.items()
+            }
+        return self._preferences
+
+    def get(self, profile_id: str) -> NotificationPreference | None:
+        with self._lock:
+            return self._all().get(profile_id)
+
+    def save(self, profile_id: str, preference: NotificationPreference) -> NotificationPreference:
+        with self._lock:
+            preferences = self._all()
+            preferences[profile_id] = preference
+            payload = {key: value.model_dump() for key, value in preferences.items()}
+            self.data_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.data_path.with_name(self.data_path.name + ".tmp")
+            with tmp_path.open("w", encoding="utf-8") as handle:
+                json.dump(payload, handle, ensure_ascii=False, indent=2)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_path, self.data_path)
+        return preference
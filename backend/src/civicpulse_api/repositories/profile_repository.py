@@ -2,23 +2,80 @@
 
 from __future__ import annotations
 
-from typing import Iterable
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Iterable
 
 from .base import JSONRepository
 from ..core.config import Settings
 from ..models.user import CivicProfile
 
 
+@dataclass(frozen=True, slots=True)
+class ProfileIndex:
+    """Profiles of one dataset version with hash and inverted indexes over them.
+
+    Tag, municipality and email keys are case-folded; inverted indexes hold
+    positions in ``profiles`` so results keep the dataset order.
+    """
+
+    profiles: tuple[CivicProfile, ...]
+    by_id: dict[str, CivicProfile]
+    by_email: dict[str, CivicProfile]
+    by_tag: dict[str, tuple[int, ...]]
+    by_municipality: dict[str, tuple[int, ...]]
+
+    @classmethod
+    def build(cls, profiles: tuple[CivicProfile, ...]) -> ProfileIndex:
+        by_id: dict[str, CivicProfile] = {}
+        by_email: dict[str, CivicProfile] = {}
+        by_tag: dict[str, list[int]] = defaultdict(list)
+        by_municipality: dict[str, list[int]] = defaultdict(list)
+        for position, profile in enumerate(profiles):
+            # first occurrence wins, matching the previous linear scans
+            by_id.setdefault(profile.id, profile)
+            if profile.email:
+                by_email.setdefault(profile.email.casefold(), profile)
+            for tag in {tag.casefold() for tag in profile.tags}:
+                by_tag[tag].append(position)
+            by_municipality[profile.municipality.casefold()].append(position)
+        return cls(
+            profiles=profiles,
+            by_id=by_id,
+            by_email=by_email,
+            by_tag={key: tuple(value) for key, value in by_tag.items()},
+            by_municipality={key: tuple(value) for key, value in by_municipality.items()},
+        )
+
+
 class ProfileRepository(JSONRepository):
+    model = CivicProfile
+
     def __init__(self, settings: Settings) -> None:
         super().__init__(settings, "profiles.json")
 
+    def build(self, records: tuple[dict[str, Any], ...]) -> ProfileIndex:
+        return ProfileIndex.build(super().build(records))
+
+    def _index(self) -> ProfileIndex:
+        return self.snapshot().items
+
     def list(self) -> list[CivicProfile]:
-        return [CivicProfile.model_validate(item) for item in self.load()]
+        return list(self._index().profiles)
 
     def get_by_id(self, profile_id: str) -> CivicProfile | None:
-        return next((profile for profile in self.list() if profile.id == profile_id), None)
+        return self._index().by_id.get(profile_id)
+
+    def get_by_email(self, email: str) -> CivicProfile | None:
+        return self._index().by_email.get(email.casefold())
 
     def search_by_tags(self, tags: Iterable[str]) -> list[CivicProfile]:
-        tag_set = {tag.lower() for tag in tags}
-        return [profile for profile in self.list() if tag_set.intersection({t.lower() for t in profile.tags})]
+        index = self._index()
+        positions: set[int] = set()
+        for tag in {tag.casefold() for tag in tags}:
+            positions.update(index.by_tag.get(tag, ()))
+        return [index.profiles[position] for position in sorted(positions)]
+
+    def list_by_municipality(self, municipality: str) -> list[CivicProfile]:
+        index = self._index()
+        return [index.profiles[position] for position in index.by_municipality.get(municipality.casefold(), ())]
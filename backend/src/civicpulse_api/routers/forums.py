@@ -2,14 +2,32 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 from ..dependencies import get_app_context
-from ..models import ForumThread
+from ..models import ForumPostPage, ForumThreadPage
+from ..repositories.forum_repository import ThreadNotFoundError
 
 router = APIRouter(prefix="/forums", tags=["forums"])
 
 
-@router.get("/", response_model=list[ForumThread])
-def list_threads(context=Depends(get_app_context)) -> list[ForumThread]:
-    return context.forum_service.list_threads()
+@router.get("/", response_model=ForumThreadPage)
+def list_threads(
+    cursor: str | None = Query(default=None, pattern=r"^\d+$", description="next_cursor from the previous page"),
+    limit: int = Query(default=20, ge=1, le=100),
+    context=Depends(get_app_context),
+) -> ForumThreadPage:
+    return context.forum_service.list_threads(cursor, limit)
+
+
+@router.get("/{thread_id}/posts", response_model=ForumPostPage)
+def list_posts(
+    thread_id: str,
+    cursor: str | None = Query(default=None, pattern=r"^\d+$", description="next_cursor from the previous page"),
+    limit: int = Query(default=20, ge=1, le=100),
+    context=Depends(get_app_context),
+) -> ForumPostPage:
+    try:
+        return context.forum_service.list_posts(thread_id, cursor, limit)
+    except ThreadNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from typing import Any
+
 from fastapi import APIRouter, Depends, Query
 
 from ..dependencies import get_app_context
@@ -13,3 +15,9 @@ router = APIRouter(prefix="/notifications", tags=["notifications"])
 @router.get("/preview", response_model=list[NotificationItem])
 def preview(profile_id: str = Query(...), context=Depends(get_app_context)) -> list[NotificationItem]:
     return context.notifications_service.preview_notifications(profile_id)
+
+
+@router.post("/dispatch")
+async def dispatch(context=Depends(get_app_context)) -> dict[str, Any]:
+    agent = context.orchestrator.notifications
+    return await agent.run_detection_and_notify_async(publisher=context.notification_publisher)
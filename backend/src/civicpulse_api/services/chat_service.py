@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from ..clients.azure_openai import AzureOpenAIClient
 from ..clients.azure_search import AzureSearchClient
+from ..clients.local_search import LocalSearchClient
 from ..models import ChatRequest, ChatResponse
 from ..services.profile_service import ProfileService
 
@@ -12,12 +13,12 @@ class ChatService:
     def __init__(self, profile_service: ProfileService) -> None:
         self._profile_service = profile_service
         self._llm_client: AzureOpenAIClient | None = None
-        self._search_client: AzureSearchClient | None = None
+        self._search_client: AzureSearchClient | LocalSearchClient | None = None
 
     def register_clients(
         self,
         llm_client: AzureOpenAIClient | None,
-        search_client: AzureSearchClient | None,
+        search_client: AzureSearchClient | LocalSearchClient | None,
     ) -> None:
         self._llm_client = llm_client
         self._search_client = search_client
@@ -2,13 +2,22 @@
 
 from __future__ import annotations
 
-from ..models import ForumThread
+from ..models import ForumPostPage, ForumThreadPage
 from ..repositories.forum_repository import ForumRepository
 
+DEFAULT_PAGE_SIZE = 20
+
 
 class ForumService:
     def __init__(self, repository: ForumRepository) -> None:
         self._repository = repository
 
-    def list_threads(self) -> list[ForumThread]:
-        return self._repository.list()
+    def list_threads(self, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE) -> ForumThreadPage:
+        items, next_cursor = self._repository.page_summaries(cursor, limit)
+        return ForumThreadPage(items=items, next_cursor=next_cursor)
+
+    def list_posts(
+        self, thread_id: str, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> ForumPostPage:
+        items, next_cursor = self._repository.page_posts(thread_id, cursor, limit)
+        return ForumPostPage(items=items, next_cursor=next_cursor)
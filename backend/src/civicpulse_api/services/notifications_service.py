@@ -2,29 +2,186 @@
 
 from __future__ import annotations
 
-from datetime import datetime, timedelta
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
 
-from ..models import NotificationItem, NotificationPreference
+from src.agents.notification_index import ANY_FREQUENCY, TemplateIndex
+
+from ..models import CivicEvent, NotificationItem, NotificationPreference
+from ..repositories.events_repository import CivicEventRepository
+from ..repositories.notifications_repository import (
+    NotificationPreferenceRepository,
+    NotificationTemplateRepository,
+)
 from ..services.profile_service import ProfileService
 
+# API preference values -> template ``frecuencia`` values
+FREQUENCY_ALIASES = {
+    "immediate": "inmediata",
+    "daily": "diaria",
+    "weekly": "semanal",
+    "inmediata": "inmediata",
+    "diaria": "diaria",
+    "semanal": "semanal",
+}
+
+# Profiles whose previews are kept; the least recently used are evicted
+PREVIEW_CACHE_SIZE = 4096
+
+
+@dataclass(slots=True)
+class _MatchingSnapshot:
+    """Indexes over the current templates and events, tagged with the file versions."""
+
+    version: tuple
+    templates: TemplateIndex
+    events: TemplateIndex
+    templates_published_at: datetime
+
+
+def _mtime(signature: tuple[int, ...] | None) -> datetime:
+    if signature is None:
+        return datetime.now(timezone.utc)
+    return datetime.fromtimestamp(signature[0] / 1e9, tz=timezone.utc)
+
+
+def _event_record(event: CivicEvent) -> dict[str, Any]:
+    # events share the template shape so one index type serves both
+    return {
+        "id": f"event:{event.id}",
+        "municipios": [event.municipality],
+        "temas": [event.category, *event.tags],
+        "frecuencia": None,
+        "event": event,
+    }
+
 
 class NotificationsService:
-    def __init__(self, profile_service: ProfileService) -> None:
+    """Serves notification previews from preloaded indexes with a per-profile cache.
+
+    Template and event indexes are rebuilt only when their datasets change on
+    disk; cached previews are dropped when the datasets change or when the
+    profile's preferences are saved. The cache is an LRU bounded to
+    ``cache_size`` profiles and holds tuples of frozen items, so callers get
+    their own list and cannot alter what other requests see.
+    """
+
+    def __init__(
+        self,
+        profile_service: ProfileService,
+        preferences: NotificationPreferenceRepository,
+        templates: NotificationTemplateRepository,
+        events: CivicEventRepository,
+        cache_size: int = PREVIEW_CACHE_SIZE,
+    ) -> None:
         self._profile_service = profile_service
+        self._preferences = preferences
+        self._templates = templates
+        self._events = events
+        self._lock = threading.Lock()
+        self._snapshot: _MatchingSnapshot | None = None
+        self._cache_size = cache_size
+        self._cache: OrderedDict[str, tuple[tuple, tuple[NotificationItem, ...]]] = OrderedDict()
+        # bumped on every preference save so in-flight previews are not cached as current
+        self._revisions: dict[str, int] = {}
+
+    def _version(self) -> tuple:
+        return (
+            self._templates.signature(),
+            self._events.signature(),
+            self._profile_service.signature(),
+        )
+
+    def _current_snapshot(self, version: tuple) -> _MatchingSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == version:
+                return snapshot
+            # fresh indexes are swapped in whole so concurrent readers never
+            # see a half-updated one; unchanged datasets reuse their index
+            reuse = snapshot is not None
+            snapshot = _MatchingSnapshot(
+                version=version,
+                templates=(
+                    snapshot.templates
+                    if reuse and snapshot.version[0] == version[0]
+                    else TemplateIndex(self._templates.list())
+                ),
+                events=(
+                    snapshot.events
+                    if reuse and snapshot.version[1] == version[1]
+                    else TemplateIndex(_event_record(e) for e in self._events.list())
+                ),
+                templates_published_at=_mtime(version[0]),
+            )
+            self._snapshot = snapshot
+            self._cache.clear()
+            return snapshot
+
+    def get_preferences(self, profile_id: str) -> NotificationPreference:
+        return self._preferences.get(profile_id) or NotificationPreference()
 
     def preview_notifications(self, profile_id: str) -> list[NotificationItem]:
+        version = self._version()
+        key = (version, self._revisions.get(profile_id, 0))
+        with self._lock:
+            cached = self._cache.get(profile_id)
+            if cached is not None and cached[0] == key:
+                self._cache.move_to_end(profile_id)
+                return list(cached[1])
+
+        snapshot = self._current_snapshot(version)
         profile = self._profile_service.get_profile(profile_id)
-        horizon = datetime.utcnow() - timedelta(days=7)
-        base = NotificationItem(
-            id="demo",
-            title="Actualización de servicios",
-            body="Nueva clínica municipal disponible en tu área",
-            municipality=profile.municipality,
-            published_at=datetime.utcnow(),
-            tags=profile.interests,
+        stored = self._preferences.get(profile_id)
+        prefs = stored or NotificationPreference()
+        interests = prefs.interests or profile.interests
+        # only a stored preference narrows by frequency; the model default does not
+        frequency = (
+            FREQUENCY_ALIASES.get(stored.frequency.lower(), ANY_FREQUENCY)
+            if stored is not None
+            else ANY_FREQUENCY
         )
-        return [base]
+
+        items = [
+            NotificationItem(
+                id=str(template.get("id")),
+                title=template.get("titulo", ""),
+                body=template.get("descripcion", ""),
+                municipality=profile.municipality,
+                published_at=snapshot.templates_published_at,
+                tags=template.get("temas", ()),
+            )
+            for template in snapshot.templates.lookup(profile.municipality, interests, frequency)
+        ]
+        for record in snapshot.events.lookup(profile.municipality, interests, ANY_FREQUENCY):
+            event: CivicEvent = record["event"]
+            items.append(
+                NotificationItem(
+                    id=event.id,
+                    title=event.name,
+                    body=event.description or "",
+                    municipality=event.municipality,
+                    published_at=event.starts_at or _mtime(version[1]),
+                    tags=[event.category, *event.tags],
+                )
+            )
+        if self._cache_size > 0:
+            with self._lock:
+                self._cache[profile_id] = (key, tuple(items))
+                self._cache.move_to_end(profile_id)
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return items
 
     def save_preferences(self, profile_id: str, prefs: NotificationPreference) -> NotificationPreference:
-        # TODO: Persist in a real data store
-        return prefs
+        saved = self._preferences.save(profile_id, prefs)
+        with self._lock:
+            self._revisions[profile_id] = self._revisions.get(profile_id, 0) + 1
+            self._cache.pop(profile_id, None)
+        return saved
@@ -13,6 +13,11 @@ class ProfileService:
     def list_profiles(self) -> list[CivicProfile]:
         return self._repository.list()
 
+    def signature(self) -> tuple[int, int, int] | None:
+        """Version of the profile dataset, for caches derived from profiles."""
+
+        return self._repository.signature()
+
     def get_profile(self, profile_id: str) -> CivicProfile:
         profile = self._repository.get_by_id(profile_id)
         if not profile:
@@ -0,0 +1,93 @@
+"""
+Fixtures compartidas de las pruebas del backend.
+
+Las pruebas se ejecutan desde backend/ (`python -m pytest`), con el paquete
+`src` en el path gracias a la configuración de pytest en pyproject.toml.
+"""
+import importlib
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+import src
+from src.agents import ingestion_agent, notifications_agent
+
+# almacenes SQLite compartidos (local_store y sus usuarios) en src/ de la raíz
+ROOT_SRC = Path(__file__).resolve().parents[2] / "src"
+
+
+@pytest.fixture
+def ingestion_env(tmp_path, monkeypatch):
+    """
+    Redirige los datos, el índice y el estado de la ingesta a un directorio
+    temporal. Devuelve el directorio de datos; cada prueba escribe ahí sus
+    archivos fuente.
+    """
+    data_dir = tmp_path / "data"
+    index_dir = data_dir / "index"
+    data_dir.mkdir()
+    monkeypatch.setattr(ingestion_agent, "DATA_DIR", data_dir)
+    monkeypatch.setattr(ingestion_agent, "INDEX_DIR", index_dir)
+    monkeypatch.setattr(ingestion_agent, "STATE_PATH", index_dir / "ingest_state.json")
+    return data_dir
+
+
+@pytest.fixture
+def write_source(ingestion_env):
+    """
+    Escribe un archivo fuente (lista de registros) en el directorio de datos.
+    Cada escritura avanza el mtime, para que la detección por tamaño/mtime
+    vea el cambio aunque el archivo conserve su tamaño.
+    """
+    clock = [1_700_000_000]
+
+    def write(filename: str, items) -> None:
+        path = ingestion_env / filename
+        path.write_text(json.dumps(items, ensure_ascii=False), encoding="utf-8")
+        clock[0] += 1
+        os.utime(path, (clock[0], clock[0]))
+    return write
+
+
+@pytest.fixture
+def notifications_env(tmp_path, monkeypatch):
+    """
+    Redirige los archivos del agente de notificaciones (perfiles, eventos,
+    plantillas y estados) a un directorio temporal y lo devuelve.
+    """
+    for name, filename in [
+        ("USERS_PATH", "profiles.json"),
+        ("EVENTS_PATH", "events.json"),
+        ("TEMPLATES_PATH", "notifications.json"),
+        ("STATE_PATH", "notifications_state.json"),
+        ("CURSOR_PATH", "notifications_cursor.json"),
+        ("DIGESTS_PATH", "notifications_digests.json"),
+    ]:
+        monkeypatch.setattr(notifications_agent, name, tmp_path / filename)
+    return tmp_path
+
+
+@pytest.fixture
+def local_store(tmp_path, monkeypatch):
+    """
+    Hace importables los almacenes de src/ en la raíz del repositorio
+    (src.local_store, src.profile_store, src.forum_store, src.tag_service)
+    junto al paquete src del backend, con la base SQLite y los JSON
+    heredados en un directorio temporal. Devuelve el módulo local_store.
+    """
+    monkeypatch.setattr(src, "__path__", [*src.__path__, str(ROOT_SRC)])
+    store = importlib.import_module("src.local_store")
+    monkeypatch.setattr(store, "DB_PATH", tmp_path / "civicpulse.db")
+    monkeypatch.setattr(store, "_migrated", set())
+    for module, attr, filename in [
+        ("src.profile_store", "DATA_PATH", "profiles.json"),
+        ("src.forum_store", "FORUM_PATH", "user_forums.json"),
+        ("src.tag_service", "TAG_PATH", "tags.json"),
+    ]:
+        monkeypatch.setattr(importlib.import_module(module), attr, tmp_path / filename)
+    yield store
+    for conn in (getattr(store._local, "conns", None) or {}).values():
+        conn.close()
+    store._local.conns = {}
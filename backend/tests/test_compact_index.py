@@ -0,0 +1,132 @@
+"""Pruebas del formato del índice compacto (compact_index)."""
+import random
+
+import pytest
+
+from src.agents.compact_index import (
+    BLOCK_SIZE,
+    CompactIndex,
+    IndexWriter,
+    decode_postings,
+    encode_postings,
+)
+
+
+def _random_postings(rng, n, max_gap=70000):
+    doc_ids, doc = [], rng.randrange(5)
+    for _ in range(n):
+        doc_ids.append(doc)
+        doc += rng.randint(1, max_gap)
+    return doc_ids, [rng.randint(1, 300) for _ in range(n)]
+
+
+@pytest.mark.parametrize("n", [1, 2, BLOCK_SIZE - 1, BLOCK_SIZE, BLOCK_SIZE + 1, 5 * BLOCK_SIZE + 17])
+def test_encode_decode_round_trip(n):
+    rng = random.Random(n)
+    doc_ids, tfs = _random_postings(rng, n)
+    buf = encode_postings(doc_ids, tfs)
+    assert decode_postings(buf, 0, len(buf)) == list(zip(doc_ids, tfs))
+
+
+def _build(path, docs):
+    """docs: lista de (colección, posición, {término: tf})."""
+    writer = IndexWriter(path, ["events", "services"])
+    lengths = []
+    for collection, pos, terms in docs:
+        length = sum(terms.values())
+        lengths.append(length)
+        writer.add_document(collection, pos, length)
+    vocabulary = sorted({t for _, _, terms in docs for t in terms}, key=lambda t: t.encode("utf-8"))
+    for term in vocabulary:
+        doc_ids = [d for d, (_, _, terms) in enumerate(docs) if term in terms]
+        writer.add_term(term, doc_ids, [docs[d][2][term] for d in doc_ids])
+    writer.close()
+    return lengths
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    rng = random.Random(7)
+    vocabulary = ["agua", "año", "bache", "cabildo", "ciclovía", "salud", "zona"]
+    docs = []
+    for pos in range(3 * BLOCK_SIZE + 5):
+        terms = {t: rng.randint(1, 4) for t in rng.sample(vocabulary, rng.randint(1, 4))}
+        docs.append(("events" if pos % 3 else "services", pos, terms))
+    path = tmp_path / "index.cpix"
+    lengths = _build(path, docs)
+    return path, docs, lengths
+
+
+def test_writer_reader_round_trip(corpus):
+    path, docs, lengths = corpus
+    with CompactIndex(path) as index:
+        assert index.n_docs == len(docs)
+        assert index.total_len == sum(lengths)
+        assert list(index.doc_lens) == lengths
+        for doc_id, (collection, pos, _terms) in enumerate(docs):
+            assert index.doc_ref(doc_id) == (collection, pos)
+
+        terms = sorted({t for _, _, ts in docs for t in ts}, key=lambda t: t.encode("utf-8"))
+        assert [raw.decode("utf-8") for raw, _ in index.iter_terms()] == terms
+        for term in terms:
+            expected = [(d, ts[term]) for d, (_, _, ts) in enumerate(docs) if term in ts]
+            assert index.postings(term) == expected
+            df, max_tf, min_dl = index.term_stats(term)
+            assert df == len(expected)
+            assert max_tf == max(tf for _, tf in expected)
+            assert min_dl == min(lengths[d] for d, _ in expected)
+        assert "inexistente" not in index
+        assert index.term_stats("inexistente") == (0, 0, 0)
+        assert index.cursor("inexistente") is None
+
+
+def test_cursor_next_geq_matches_postings(corpus):
+    path, docs, _lengths = corpus
+    rng = random.Random(3)
+    with CompactIndex(path) as index:
+        for raw, _ in index.iter_terms():
+            term = raw.decode("utf-8")
+            postings = index.postings(term)
+            doc_ids = [d for d, _ in postings]
+            cursor = index.cursor(term)
+            target = 0
+            while True:
+                target += rng.randint(0, 40)
+                expected = next((d for d in doc_ids if d >= target), None)
+                assert cursor.next_geq(target) == expected
+                if expected is None:
+                    break
+                assert cursor.tf == dict(postings)[expected]
+
+
+def test_terms_must_arrive_in_order(tmp_path):
+    writer = IndexWriter(tmp_path / "index.cpix", ["events"])
+    writer.add_document("events", 0, 2)
+    writer.add_term("b", [0], [1])
+    with pytest.raises(ValueError):
+        writer.add_term("a", [0], [1])
+    with pytest.raises(ValueError):
+        writer.add_document("events", 1, 1)
+
+
+def test_rejects_other_format(tmp_path):
+    path = tmp_path / "index.cpix"
+    path.write_bytes(b"\0" * 256)
+    with pytest.raises(ValueError):
+        CompactIndex(path)
+
+
+def test_block_bounds_cover_their_postings(corpus):
+    path, _docs, lengths = corpus
+    with CompactIndex(path) as index:
+        for raw, _ in index.iter_terms():
+            term = raw.decode("utf-8")
+            tfs = dict(index.postings(term))
+            cursor = index.cursor(term)
+            while cursor.doc is not None:
+                last = cursor.block_last
+                while cursor.doc is not None and cursor.doc <= last:
+                    tf = tfs[cursor.doc]
+                    assert tf <= cursor.block_max_tf
+                    assert cursor.block_min_ratio <= lengths[cursor.doc] / tf
+                    cursor.next()
@@ -0,0 +1,74 @@
+"""Pruebas del estado de entregas con journal y compactación (delivery_state)."""
+import json
+
+from src.agents.delivery_state import DeliveryStateStore
+
+
+def _keys(store):
+    return [(r["event_id"], r["user_id"]) for r in store.records]
+
+
+def test_dedup_survives_commit_and_reopen(tmp_path):
+    path = tmp_path / "notifications_state.json"
+    store = DeliveryStateStore(path, compact_min_records=1000)
+    assert store.mark("e1", "u1")
+    assert store.mark("e1", "u2")
+    assert not store.mark("e1", "u1")
+    store.commit()
+    assert not path.exists() and store.journal_path.exists()
+
+    reopened = DeliveryStateStore(path, compact_min_records=1000)
+    assert ("e1", "u1") in reopened and ("e1", "u2") in reopened
+    assert not reopened.mark("e1", "u2")
+    assert reopened.mark("e2", "u1")
+    assert len(reopened) == 3
+
+
+def test_dedup_after_compaction_and_reopen(tmp_path):
+    path = tmp_path / "notifications_state.json"
+    store = DeliveryStateStore(path, compact_min_records=3)
+    for user in ("u1", "u2", "u3"):
+        store.mark("e1", user)
+    store.commit()
+    # se alcanzó el umbral: todo pasó al snapshot y el journal quedó vacío
+    assert store.journal_path.read_text(encoding="utf-8") == ""
+    snapshot = json.loads(path.read_text(encoding="utf-8"))
+    assert [(r["event_id"], r["user_id"]) for r in snapshot["notified"]] == _keys(store)
+
+    store.mark("e2", "u1")
+    store.commit()
+
+    reopened = DeliveryStateStore(path, compact_min_records=3)
+    assert _keys(reopened) == [("e1", "u1"), ("e1", "u2"), ("e1", "u3"), ("e2", "u1")]
+    for user in ("u1", "u2", "u3"):
+        assert not reopened.mark("e1", user)
+    assert not reopened.mark("e2", "u1")
+    assert reopened.mark("e2", "u2")
+
+
+def test_crash_between_snapshot_and_journal_truncate(tmp_path):
+    """Registros repetidos en snapshot y journal no duplican entregas."""
+    path = tmp_path / "notifications_state.json"
+    store = DeliveryStateStore(path, compact_min_records=1000)
+    store.mark("e1", "u1")
+    store.mark("e1", "u2")
+    store.commit()
+    journal = store.journal_path.read_text(encoding="utf-8")
+    store.compact()
+    # simula la caída: el journal conserva lo ya compactado, más una línea truncada
+    store.journal_path.write_text(journal + '{"event_id": "e9", "us', encoding="utf-8")
+
+    reopened = DeliveryStateStore(path)
+    assert _keys(reopened) == [("e1", "u1"), ("e1", "u2")]
+    assert ("e9", None) not in reopened
+
+
+def test_refresh_sees_other_writer(tmp_path):
+    path = tmp_path / "notifications_state.json"
+    reader = DeliveryStateStore(path)
+    writer = DeliveryStateStore(path)
+    writer.mark("e1", "u1")
+    writer.commit()
+    assert ("e1", "u1") not in reader
+    reader.refresh()
+    assert ("e1", "u1") in reader
@@ -0,0 +1,96 @@
+"""Pruebas de las cubetas de resumen diario/semanal (digest_scheduler)."""
+from datetime import datetime, timedelta, timezone
+
+from src.agents.digest_scheduler import DIGEST_HOUR_UTC, DigestStore, next_flush
+
+
+def _user(user_id, frequency):
+    return {"user_id": user_id, "frecuencia_notificaciones": frequency, "_distance_km": 1.5}
+
+
+def _event(event_id):
+    return {"event_id": event_id, "title": f"Evento {event_id}", "timestamp": "2026-10-14T10:00:00Z"}
+
+
+def _due_ids(store, now):
+    return {user_id: [item[0] for item in items] for user_id, _, items in store.due(now)}
+
+
+# miércoles, antes de la hora de envío
+OPENED = datetime(2026, 10, 14, DIGEST_HOUR_UTC - 2, 30, tzinfo=timezone.utc)
+
+
+def test_next_flush_daily_and_weekly():
+    daily = next_flush("diaria", OPENED, "u1")
+    assert daily.date() == OPENED.date() and daily.hour == DIGEST_HOUR_UTC
+    after_hour = next_flush("diaria", OPENED.replace(hour=DIGEST_HOUR_UTC, minute=59), "u1")
+    assert after_hour.date() == OPENED.date() + timedelta(days=1)
+    weekly = next_flush("semanal", OPENED, "u1")
+    assert weekly.weekday() == 0 and weekly > OPENED
+    assert weekly - OPENED < timedelta(days=7)
+
+
+def test_bucket_rolls_over_after_ack(tmp_path):
+    store = DigestStore(tmp_path / "digests.json")
+    user = _user("u1", "diaria")
+    assert store.add(user, _event("e1"), OPENED)
+    assert store.add(user, _event("e2"), OPENED + timedelta(minutes=10))
+    assert not store.add(user, _event("e1"), OPENED + timedelta(minutes=20))
+
+    first_due = next_flush("diaria", OPENED, "u1")
+    assert _due_ids(store, first_due - timedelta(seconds=1)) == {}
+    assert _due_ids(store, first_due) == {"u1": ["e1", "e2"]}
+
+    store.ack("u1", ["e1", "e2"])
+    assert len(store) == 0
+    # la siguiente notificación abre una cubeta nueva que vence en el día siguiente
+    later = first_due + timedelta(hours=1)
+    assert store.add(user, _event("e3"), later)
+    assert store.add(user, _event("e1"), later)
+    assert _due_ids(store, first_due + timedelta(hours=2)) == {}
+    second_due = next_flush("diaria", later, "u1")
+    assert second_due - first_due == timedelta(days=1)
+    assert _due_ids(store, second_due) == {"u1": ["e3", "e1"]}
+
+
+def test_items_added_while_sending_stay_for_the_next_flush(tmp_path):
+    store = DigestStore(tmp_path / "digests.json")
+    user = _user("u1", "semanal")
+    store.add(user, _event("e1"), OPENED)
+    due_at = next_flush("semanal", OPENED, "u1")
+    [(_, frequency, items)] = store.due(due_at)
+    assert frequency == "semanal"
+    # llega otro evento entre el corte y la confirmación del envío
+    store.add(user, _event("e2"), due_at)
+    store.ack("u1", [item[0] for item in items])
+    assert _due_ids(store, due_at) == {"u1": ["e2"]}
+    assert not store.add(user, _event("e2"), due_at)
+
+
+def test_rollover_survives_save_and_reopen(tmp_path):
+    path = tmp_path / "digests.json"
+    store = DigestStore(path)
+    store.add(_user("u1", "diaria"), _event("e1"), OPENED)
+    store.add(_user("u2", "semanal"), _event("e1"), OPENED)
+    store.save()
+
+    reopened = DigestStore(path)
+    daily_due = next_flush("diaria", OPENED, "u1")
+    assert _due_ids(reopened, daily_due) == {"u1": ["e1"]}
+    assert not reopened.add(_user("u1", "diaria"), _event("e1"), daily_due)
+    reopened.ack("u1", ["e1"])
+    reopened.save()
+
+    reopened = DigestStore(path)
+    assert len(reopened) == 1
+    assert _due_ids(reopened, next_flush("semanal", OPENED, "u2")) == {"u2": ["e1"]}
+    assert reopened.add(_user("u1", "diaria"), _event("e1"), daily_due)
+
+
+def test_failed_flush_is_retried(tmp_path):
+    store = DigestStore(tmp_path / "digests.json")
+    store.add(_user("u1", "diaria"), _event("e1"), OPENED)
+    due_at = next_flush("diaria", OPENED, "u1")
+    assert _due_ids(store, due_at) == {"u1": ["e1"]}
+    # sin ack (envío fallido) la cubeta sigue vencida en la corrida siguiente
+    assert _due_ids(store, due_at + timedelta(hours=1)) == {"u1": ["e1"]}
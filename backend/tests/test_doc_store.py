@@ -0,0 +1,76 @@
+"""Pruebas del almacén de documentos con acceso aleatorio (doc_store)."""
+import random
+
+import pytest
+
+from src.agents.doc_store import (
+    SNIPPET_CHARS,
+    DocStore,
+    DocStoreWriter,
+    document_snippet,
+    document_title,
+    encode_document,
+)
+
+
+@pytest.fixture
+def documents():
+    rng = random.Random(1)
+    docs = []
+    for i in range(300):
+        collection = ("events", "services", "ballots")[i % 3]
+        item = {"id": f"r-{i}", "descripcion": "participación ciudadana " * rng.randint(0, 40),
+                "lugar": "Mérida" if i % 2 else ""}
+        if i % 5:
+            item = {"titulo": f"Registro número {i} 🗳", **item}
+        docs.append((collection, f"r-{i}", item))
+    return docs
+
+
+def _write(path, docs):
+    writer = DocStoreWriter(path)
+    for collection, key, item in docs:
+        writer.add_document(collection, key, item)
+    assert len(writer) == len(docs)
+    writer.close()
+
+
+def test_random_access(tmp_path, documents):
+    path = tmp_path / "seg.docs"
+    _write(path, documents)
+    assert not path.with_name(path.name + ".tmp").exists()
+    with DocStore(path) as store:
+        assert len(store) == len(documents)
+        for doc_id in random.Random(2).sample(range(len(documents)), 100) + [0, len(documents) - 1]:
+            collection, key, item = documents[doc_id]
+            assert store.ref(doc_id) == (collection, key)
+            assert store.document(doc_id) == {"collection": collection, "key": key, "item": item}
+            title, snippet = document_title(collection, item), document_snippet(item)
+            assert store.summary(doc_id) == (collection, title, snippet)
+            assert len(snippet) <= SNIPPET_CHARS
+            assert store.record(doc_id) == encode_document(collection, key, item)
+        with pytest.raises(IndexError):
+            store.document(len(documents))
+
+
+def test_records_copy_verbatim(tmp_path, documents):
+    source = tmp_path / "a.docs"
+    _write(source, documents)
+    copy = tmp_path / "b.docs"
+    with DocStore(source) as store:
+        writer = DocStoreWriter(copy)
+        for doc_id in range(len(store)):
+            writer.add(store.record(doc_id))
+        writer.close()
+    assert copy.read_bytes() == source.read_bytes()
+
+
+def test_empty_store_and_bad_file(tmp_path):
+    path = tmp_path / "empty.docs"
+    DocStoreWriter(path).close()
+    with DocStore(path) as store:
+        assert len(store) == 0
+    bad = tmp_path / "bad.docs"
+    bad.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        DocStore(bad)
@@ -0,0 +1,171 @@
+"""Pruebas del cursor de detección de eventos (event_cursor)."""
+import json
+import os
+
+import pytest
+
+from src.agents import event_cursor
+from src.agents.event_cursor import EventCursor
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Escribe events.json y devuelve (eventos, firma) como los lee el agente."""
+    path = tmp_path / "events.json"
+    clock = [1_700_000_000]
+
+    def write(events):
+        path.write_text(json.dumps(events, ensure_ascii=False, indent=2), encoding="utf-8")
+        clock[0] += 1
+        os.utime(path, (clock[0], clock[0]))
+        st = path.stat()
+        return json.loads(path.read_text(encoding="utf-8")), (st.st_mtime_ns, st.st_size)
+    write.path = path
+    return write
+
+
+@pytest.fixture
+def digests(monkeypatch):
+    """Cuenta las huellas calculadas por pending()."""
+    calls = []
+    original = event_cursor.event_digest
+
+    def counting(event):
+        calls.append(event.get("event_id"))
+        return original(event)
+    monkeypatch.setattr(event_cursor, "event_digest", counting)
+    return calls
+
+
+def _events(ids):
+    return [{"event_id": i, "type": "sismo", "lat": 19.4, "lon": -99.1} for i in ids]
+
+
+def _ids(events):
+    return [e.get("event_id") for e in events]
+
+
+def test_resume_without_changes_digests_nothing(tmp_path, source, digests):
+    cursor_path = tmp_path / "cursor.json"
+    events, sig = source(_events(["e1", "e2", "e3"]))
+    cursor = EventCursor(cursor_path)
+    assert _ids(cursor.pending(events, source.path, sig)) == ["e1", "e2", "e3"]
+    cursor.advance()
+
+    digests.clear()
+    resumed = EventCursor(cursor_path)
+    assert resumed.pending(events, source.path, sig) == []
+    assert digests == []
+    assert len(resumed) == 3
+
+
+def test_resume_after_append_digests_only_new_records(tmp_path, source, digests):
+    cursor_path = tmp_path / "cursor.json"
+    events, sig = source(_events(["e1", "e2"]))
+    cursor = EventCursor(cursor_path)
+    cursor.pending(events, source.path, sig)
+    cursor.advance()
+
+    events, sig = source(_events(["e1", "e2", "e3", "e4"]))
+    digests.clear()
+    resumed = EventCursor(cursor_path)
+    assert _ids(resumed.pending(events, source.path, sig)) == ["e3", "e4"]
+    assert digests == ["e3", "e4"]
+    resumed.advance()
+
+    events, sig = source(_events(["e1", "e2", "e3", "e4", "e5"]))
+    digests.clear()
+    assert _ids(EventCursor(cursor_path).pending(events, source.path, sig)) == ["e5"]
+    assert digests == ["e5"]
+
+
+def test_changed_history_falls_back_to_full_comparison(tmp_path, source):
+    cursor_path = tmp_path / "cursor.json"
+    events, sig = source(_events(["e1", "e2", "e3"]))
+    cursor = EventCursor(cursor_path)
+    cursor.pending(events, source.path, sig)
+    cursor.advance()
+
+    changed = _events(["e1", "e2", "e3", "e4"])
+    changed[1]["type"] = "incendio"
+    events, sig = source(changed)
+    cursor = EventCursor(cursor_path)
+    assert _ids(cursor.pending(events, source.path, sig)) == ["e2", "e4"]
+    cursor.advance()
+
+    # un evento borrado del historial también lo detecta la comparación completa
+    events, sig = source(changed[1:] + _events(["e1"]))
+    assert _ids(EventCursor(cursor_path).pending(events, source.path, sig)) == []
+    # el mismo id agregado de nuevo cambia la huella combinada
+    events, sig = source(changed + _events(["e2"]))
+    assert _ids(EventCursor(cursor_path).pending(events, source.path, sig)) == ["e2", "e2"]
+
+
+def test_retried_events_come_back_after_resume(tmp_path, source):
+    cursor_path = tmp_path / "cursor.json"
+    events, sig = source(_events(["e1", "e2"]))
+    cursor = EventCursor(cursor_path)
+    pending = cursor.pending(events, source.path, sig)
+    cursor.advance(retry=[pending[1]])
+
+    resumed = EventCursor(cursor_path)
+    assert _ids(resumed.pending(events, source.path, sig)) == ["e2"]
+    resumed.advance()
+    assert EventCursor(cursor_path).pending(events, source.path, sig) == []
+
+
+def test_stale_signature_uses_full_comparison(tmp_path, source, digests):
+    """Si el archivo cambió después de leer `events`, no se confía en la marca."""
+    cursor_path = tmp_path / "cursor.json"
+    events, sig = source(_events(["e1"]))
+    cursor = EventCursor(cursor_path)
+    cursor.pending(events, source.path, sig)
+    cursor.advance()
+
+    old_events, old_sig = events, sig
+    source(_events(["e1", "e2"]))
+    digests.clear()
+    cursor = EventCursor(cursor_path)
+    assert cursor.pending(old_events, source.path, old_sig) == []
+    assert digests == ["e1"]
+
+
+def test_journal_compaction_and_reopen(tmp_path, source):
+    cursor_path = tmp_path / "cursor.json"
+    cursor = EventCursor(cursor_path, compact_min_records=4)
+    ids = []
+    for i in range(6):
+        ids.append(f"e{i}")
+        events, sig = source(_events(ids))
+        assert _ids(cursor.pending(events, source.path, sig)) == [f"e{i}"]
+        cursor.advance()
+    assert cursor_path.exists()
+    # cada advance agrega al journal, que se compacta al llegar al umbral
+    # (el mayor entre compact_min_records y el número de huellas)
+    assert len(cursor.journal_path.read_text(encoding="utf-8").splitlines()) < max(4, len(cursor))
+
+    reopened = EventCursor(cursor_path, compact_min_records=4)
+    assert len(reopened) == 6
+    assert reopened.pending(events, source.path, sig) == []
+    assert reopened.pending(events) == []
+
+
+def test_truncated_journal_line_is_ignored(tmp_path, source):
+    cursor_path = tmp_path / "cursor.json"
+    events, sig = source(_events(["e1", "e2"]))
+    cursor = EventCursor(cursor_path)
+    cursor.pending(events)
+    cursor.advance()
+    with cursor.journal_path.open("a", encoding="utf-8") as fh:
+        fh.write('{"k": "id:e9", "d"')
+    reopened = EventCursor(cursor_path)
+    assert len(reopened) == 2
+    assert _ids(reopened.pending(events + _events(["e9"]))) == ["e9"]
+
+
+def test_version_1_snapshot_is_still_read(tmp_path):
+    events = _events(["e1", "e2"])
+    checksums = {f"id:{e['event_id']}": event_cursor.event_digest(e) for e in events}
+    cursor_path = tmp_path / "cursor.json"
+    cursor_path.write_text(json.dumps({"version": 1, "checksums": checksums}), encoding="utf-8")
+    assert EventCursor(cursor_path).pending(events + _events(["e3"])) == _events(["e3"])
@@ -0,0 +1,77 @@
+"""ForumRepository pages walked end to end against the full listings."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+pytest.importorskip("azure.ai.openai")
+
+from src.civicpulse_api.core.config import Settings  # noqa: E402
+from src.civicpulse_api.repositories.forum_repository import (  # noqa: E402
+    ForumRepository,
+    ThreadNotFoundError,
+)
+
+
+def _threads(n: int = 7) -> list[dict]:
+    return [
+        {
+            "id": f"t{i}",
+            "title": f"Foro {i}",
+            "municipality": "Mérida",
+            "tags": ["agua"],
+            "posts": [
+                {"id": f"t{i}-p{j}", "author": "ana", "content": f"c{j}", "created_at": "2024-01-01T00:00:00Z"}
+                for j in range(i)
+            ],
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def repository(tmp_path):
+    (tmp_path / "user_forums.json").write_text(json.dumps(_threads()), encoding="utf-8")
+    return ForumRepository(Settings(data_root=tmp_path))
+
+
+def _walk(page, limit):
+    items, cursors, cursor = [], [], None
+    while True:
+        chunk, cursor = page(cursor, limit)
+        assert chunk
+        items.extend(chunk)
+        if cursor is None:
+            return items, cursors
+        assert len(chunk) == limit
+        cursors.append(cursor)
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 50])
+def test_pages_cover_each_listing_once(repository, limit):
+    threads = repository.list()
+    summaries, _ = _walk(repository.page_summaries, limit)
+    assert [s.id for s in summaries] == [t.id for t in threads]
+    assert [s.post_count for s in summaries] == [len(t.posts) for t in threads]
+
+    for thread in threads:
+        if not thread.posts:
+            assert repository.page_posts(thread.id, None, limit) == ([], None)
+            continue
+        posts, _ = _walk(lambda cursor, n: repository.page_posts(thread.id, cursor, n), limit)
+        assert posts == list(thread.posts)
+
+
+def test_cursor_is_the_first_item_of_the_next_page(repository):
+    first, cursor = repository.page_summaries(None, 2)
+    second, _ = repository.page_summaries(cursor, 2)
+    assert repository.page_summaries(cursor, 2)[0] == second
+    assert second[0].id == repository.list()[int(cursor)].id
+    assert repository.page_summaries(cursor, 1)[0] == second[:1]
+
+
+def test_unknown_thread(repository):
+    with pytest.raises(ThreadNotFoundError):
+        repository.page_posts("missing", None, 5)
@@ -0,0 +1,107 @@
+"""Pruebas del almacén de foros (src/forum_store.py): formas de respuesta y paginación."""
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def forum_store(local_store):
+    return importlib.import_module("src.forum_store")
+
+
+def _block(local_store, forum_id):
+    with local_store.transaction() as conn:
+        conn.execute("UPDATE forums SET estado = 'bloqueado' WHERE id = ?", (forum_id,))
+
+
+def _walk(page, limit):
+    """Recorre todas las páginas; devuelve las páginas y los cursores usados."""
+    pages, cursors, cursor = [], [], None
+    while True:
+        result = page(cursor, limit)
+        pages.append(result)
+        cursor = result["siguiente"]
+        if cursor is None:
+            return pages, cursors
+        cursors.append(cursor)
+
+
+def test_return_shapes_match_the_json_store(forum_store):
+    foro = forum_store.create_forum("Agua", "Cortes", "servicios", "ana")
+    assert foro["comentarios"] == [] and foro["estado"] == "pendiente"
+
+    forum_store.add_comment(foro["id"], "ana", "primero")
+    actualizado = forum_store.add_comment(foro["id"], "beto", "segundo")
+    assert actualizado["id"] == foro["id"] and actualizado["titulo"] == "Agua"
+    assert [(c["autor"], c["texto"]) for c in actualizado["comentarios"]] == [("ana", "primero"), ("beto", "segundo")]
+    assert "posicion" not in actualizado["comentarios"][0]
+
+    comentario = forum_store.append_comment(foro["id"], "carla", "tercero")
+    assert comentario["posicion"] == 2 and comentario["texto"] == "tercero"
+
+    [activo] = forum_store.list_active_forums()
+    assert [c["texto"] for c in activo["comentarios"]] == ["primero", "segundo", "tercero"]
+    assert forum_store.load_forums() == [activo]
+    assert forum_store.get_forum(foro["id"])["num_comentarios"] == 3
+
+
+def test_comment_on_missing_forum_changes_nothing(forum_store):
+    foro = forum_store.create_forum("Agua", "Cortes", "servicios", "ana")
+    with pytest.raises(ValueError, match="Foro no encontrado"):
+        forum_store.add_comment("no-existe", "ana", "hola")
+    assert forum_store.list_active_forums()[0]["comentarios"] == []
+    assert forum_store.get_forum(foro["id"])["num_comentarios"] == 0
+
+
+def test_list_active_forums_skips_blocked(forum_store, local_store):
+    ids = [forum_store.create_forum(f"Foro {i}", "", "general", "ana")["id"] for i in range(4)]
+    forum_store.add_comment(ids[2], "beto", "hola")
+    _block(local_store, ids[1])
+    activos = forum_store.list_active_forums()
+    assert [f["id"] for f in activos] == [ids[0], ids[2], ids[3]]
+    assert [len(f["comentarios"]) for f in activos] == [0, 1, 0]
+
+
+def test_forum_pages_cover_active_forums_once(forum_store, local_store):
+    ids = [forum_store.create_forum(f"Foro {i}", "", "general", "ana")["id"] for i in range(9)]
+    for blocked in (ids[2], ids[5]):
+        _block(local_store, blocked)
+    active = [i for i in ids if i not in (ids[2], ids[5])]
+
+    for limit in (1, 2, 3, 7, 50):
+        pages, _ = _walk(forum_store.list_forums_page, limit)
+        walked = [f["id"] for page in pages for f in page["foros"]]
+        assert walked == active
+        assert all(len(page["foros"]) == limit for page in pages[:-1])
+        assert "comentarios" not in pages[0]["foros"][0]
+
+
+def test_forum_cursor_is_the_first_item_of_the_next_page(forum_store):
+    ids = [forum_store.create_forum(f"Foro {i}", "", "general", "ana")["id"] for i in range(5)]
+    first = forum_store.list_forums_page(None, 2)
+    # el cursor repetido devuelve la misma página: la clave es inclusiva
+    second = forum_store.list_forums_page(first["siguiente"], 2)
+    assert forum_store.list_forums_page(first["siguiente"], 2) == second
+    assert [f["id"] for f in second["foros"]] == ids[2:4]
+    assert forum_store.list_forums_page(first["siguiente"], 1)["foros"] == second["foros"][:1]
+
+    # foros creados a mitad del recorrido aparecen al final, sin repetir ni saltar
+    nuevo = forum_store.create_forum("Nuevo", "", "general", "beto")["id"]
+    third = forum_store.list_forums_page(second["siguiente"], 2)
+    assert [f["id"] for f in third["foros"]] == [ids[4], nuevo]
+    assert third["siguiente"] is None
+
+
+def test_comment_pages_follow_positions(forum_store):
+    foro = forum_store.create_forum("Agua", "Cortes", "servicios", "ana")
+    for i in range(5):
+        forum_store.append_comment(foro["id"], "ana", f"c{i}")
+    pages, cursors = _walk(lambda cursor, limit: forum_store.list_comments(foro["id"], cursor, limit), 2)
+    assert [[c["posicion"] for c in page["comentarios"]] for page in pages] == [[0, 1], [2, 3], [4]]
+    assert cursors == ["2", "4"]
+
+    # un comentario nuevo continúa desde el último cursor
+    forum_store.append_comment(foro["id"], "beto", "c5")
+    page = forum_store.list_comments(foro["id"], "4", 2)
+    assert [c["texto"] for c in page["comentarios"]] == ["c4", "c5"]
+    assert page["siguiente"] is None
@@ -0,0 +1,182 @@
+"""Pruebas de la ingesta incremental contra la reconstrucción completa."""
+import json
+import random
+
+import pytest
+
+from src.agents import ingestion_agent
+from src.agents.analyzer import analyze
+from src.agents.ranking import bm25_top_k
+from src.agents.segments import MAX_SEGMENTS, load_manifest, open_segments
+
+_WORDS = ("movilidad salud agua drenaje alumbrado seguridad parque escuela vacunación "
+          "transporte consulta cabildo presupuesto basura reciclaje mercado biblioteca").split()
+
+
+def _record(rng, record_id):
+    return {"id": record_id,
+            "titulo": " ".join(rng.choices(_WORDS, k=3)),
+            "descripcion": " ".join(rng.choices(_WORDS, k=rng.randint(4, 12))),
+            "lat": round(rng.uniform(19, 20), 4)}
+
+
+def _index_view(index_dir):
+    """
+    Contenido lógico del índice: registros vivos por (colección, clave) y,
+    por término, los tf de esos registros. No depende de cómo se reparten
+    los documentos entre segmentos.
+    """
+    index = open_segments(index_dir)
+    try:
+        keys, records, terms = {}, {}, set()
+        for doc_id in range(index.n_docs):
+            if doc_id in index.deleted:
+                continue
+            doc = index.document(doc_id)
+            ref = (doc["collection"], doc["key"])
+            assert ref not in records, f"registro vivo duplicado: {ref}"
+            keys[doc_id] = ref
+            records[ref] = doc["item"]
+            terms.update(analyze(ingestion_agent._document_text(doc["item"])))
+        postings = {t: {keys[d]: tf for d, tf in index.postings(t)} for t in terms}
+        return records, postings
+    finally:
+        index.close()
+
+
+def test_incremental_matches_full_rebuild(write_source, ingestion_env):
+    rng = random.Random(5)
+    events = {f"ev-{i}": _record(rng, f"ev-{i}") for i in range(60)}
+    services = {f"sv-{i}": _record(rng, f"sv-{i}") for i in range(30)}
+    write_source("events.json", list(events.values()))
+    write_source("services.json", list(services.values()))
+    ingestion_agent.run_ingestion()
+
+    index_dir = ingestion_agent.INDEX_DIR
+    merged = False
+    next_id = 1000
+    for round_no in range(3 * MAX_SEGMENTS):
+        for key in rng.sample(sorted(events), 3):  # modificados
+            events[key] = {**events[key], "descripcion": " ".join(rng.choices(_WORDS, k=5))}
+        for key in rng.sample(sorted(events), 2):  # eliminados
+            del events[key]
+        for _ in range(3):  # nuevos
+            next_id += 1
+            events[f"ev-{next_id}"] = _record(rng, f"ev-{next_id}")
+        write_source("events.json", list(events.values()))
+        if round_no % 4 == 0:
+            services.pop(next(iter(services)))
+            write_source("services.json", list(services.values()))
+
+        result = ingestion_agent.run_ingestion()
+        assert result["deleted"] >= 2 and result["added"] == 3
+        manifest = load_manifest(index_dir)
+        assert len(manifest["segments"]) <= MAX_SEGMENTS
+        merged = merged or len(manifest["segments"]) == 1
+
+        records, _postings = _index_view(index_dir)
+        assert {k for c, k in records if c == "events"} == set(events)
+        assert {k for c, k in records if c == "services"} == set(services)
+
+    assert merged, "la política de fusión nunca se aplicó"
+    incremental = _index_view(index_dir)
+
+    ingestion_agent.run_ingestion(full=True)
+    assert len(load_manifest(index_dir)["segments"]) == 1
+    assert _index_view(index_dir) == incremental
+
+
+def test_deleted_records_never_rank(write_source):
+    others = [{"id": f"o-{i}", "titulo": "feria del libro"} for i in range(10)]
+    write_source("events.json", [{"id": "a", "titulo": "cabildo abierto"},
+                                 {"id": "b", "titulo": "cabildo juvenil"}] + others)
+    ingestion_agent.run_ingestion()
+    # un solo borrado de doce registros queda como marca, sin fusionar
+    write_source("events.json", [{"id": "b", "titulo": "cabildo juvenil"}] + others)
+    result = ingestion_agent.run_ingestion()
+    assert result["deleted"] == 1
+
+    index = open_segments(ingestion_agent.INDEX_DIR)
+    try:
+        assert index.deleted
+        hits = [index.document(doc)["key"] for doc, _ in bm25_top_k(index, analyze("cabildo"), 10)]
+        assert hits == ["b"]
+    finally:
+        index.close()
+
+
+def test_unchanged_sources_are_not_reindexed(write_source):
+    write_source("events.json", [{"id": "a", "titulo": "feria"}])
+    first = ingestion_agent.run_ingestion()
+    second = ingestion_agent.run_ingestion()
+    assert second["generation"] == first["generation"]
+    assert (second["added"], second["changed"], second["deleted"]) == (0, 0, 0)
+
+
+def _segment_files(index_dir):
+    """Bytes del índice y del almacén de documentos del único segmento."""
+    (segment,) = load_manifest(index_dir)["segments"]
+    name = segment["name"]
+    return name, {ext: (index_dir / f"{name}{ext}").read_bytes() for ext in (".bin", ".docs")}
+
+
+def _comparable_state(name):
+    state = json.loads(ingestion_agent.STATE_PATH.read_text(encoding="utf-8"))
+    for records in state["records"].values():
+        for record in records.values():
+            assert record[1] == name
+            record[1] = None
+    state.pop("generation")
+    return state
+
+
+def _write_catalog(write_source, seed=9):
+    rng = random.Random(seed)
+    events = [_record(rng, f"ev-{i}") for i in range(150)]
+    events.append(_record(rng, "ev-3"))  # id repetido: clave con sufijo
+    events.append({"titulo": "sin id", "lugar": None, "temas": ["agua", "salud"]})
+    write_source("events.json", events)
+    write_source("services.json", [_record(rng, f"sv-{i}") for i in range(40)])
+
+
+@pytest.mark.parametrize("budget_mb", [0, 64])
+def test_streaming_build_is_byte_identical(write_source, budget_mb):
+    _write_catalog(write_source)
+    ingestion_agent.run_ingestion(full=True)
+    serial_name, serial = _segment_files(ingestion_agent.INDEX_DIR)
+    serial_state = _comparable_state(serial_name)
+
+    # presupuesto 0: un run por registro, la fusión k-way arma todo el índice
+    result = ingestion_agent.run_streaming_ingestion(memory_budget_mb=budget_mb)
+    streaming_name, streaming = _segment_files(ingestion_agent.INDEX_DIR)
+    assert streaming_name != serial_name
+    assert result["documents"] == 192
+    assert streaming == serial
+    assert _comparable_state(streaming_name) == serial_state
+
+    # el estado escrito en streaming deja la siguiente ingesta en incremental
+    assert ingestion_agent.run_ingestion()["added"] == 0
+
+
+@pytest.mark.parametrize("shard_size", [1, 7, 2000])
+def test_parallel_build_is_byte_identical(write_source, shard_size):
+    _write_catalog(write_source)
+    # JSON Lines con un registro partido en varias líneas y saltos CRLF
+    rng = random.Random(4)
+    ballots = [_record(rng, f"bq-{i}") for i in range(25)] + [_record(rng, "bq-2")]
+    lines = [json.dumps(b, ensure_ascii=False) for b in ballots]
+    lines[3] = json.dumps(ballots[3], ensure_ascii=False, indent=2)
+    (ingestion_agent.DATA_DIR / "ballot_questions.jsonl").write_text("\r\n".join(lines) + "\r\n",
+                                                                     encoding="utf-8")
+    ingestion_agent.run_ingestion(full=True)
+    serial_name, serial = _segment_files(ingestion_agent.INDEX_DIR)
+    serial_state = _comparable_state(serial_name)
+
+    result = ingestion_agent.run_parallel_ingestion(workers=2, shard_size=shard_size)
+    parallel_name, parallel = _segment_files(ingestion_agent.INDEX_DIR)
+    assert result["documents"] == 192 + 26
+    assert parallel == serial
+    assert _comparable_state(parallel_name) == serial_state
+    # los segmentos parciales de cada proceso no sobreviven a la fusión
+    assert not list(ingestion_agent.INDEX_DIR.glob("*-part-*"))
+    assert ingestion_agent.run_ingestion()["added"] == 0
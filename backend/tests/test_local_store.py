@@ -0,0 +1,140 @@
+"""Pruebas de las migraciones del almacén SQLite compartido (src/local_store.py)."""
+import importlib
+import json
+import threading
+
+import pytest
+
+
+def _version(store, name):
+    row = store.connect().execute("SELECT version FROM schema_versions WHERE name = ?", (name,)).fetchone()
+    return row["version"] if row else 0
+
+
+def _columns(store, table):
+    return [row["name"] for row in store.connect().execute(f"PRAGMA table_info({table})")]
+
+
+def _restart(store):
+    """Simula un proceso nuevo: las migraciones se vuelven a revisar contra la base."""
+    store._migrated.clear()
+
+
+def test_migrations_apply_in_order_and_once(local_store):
+    calls = []
+    migrations = [
+        ["CREATE TABLE items (id TEXT PRIMARY KEY)"],
+        ["ALTER TABLE items ADD COLUMN n INTEGER", lambda conn: calls.append(2)],
+    ]
+    local_store.migrate("items", migrations)
+    assert _version(local_store, "items") == 2
+    assert _columns(local_store, "items") == ["id", "n"]
+    assert calls == [2]
+
+    _restart(local_store)
+    local_store.migrate("items", migrations)
+    assert calls == [2]
+
+    # una migración nueva sólo aplica su propio paso
+    _restart(local_store)
+    local_store.migrate("items", migrations + [["ALTER TABLE items ADD COLUMN m TEXT"]])
+    assert _version(local_store, "items") == 3
+    assert _columns(local_store, "items") == ["id", "n", "m"]
+    assert calls == [2]
+
+
+def test_failed_migration_rolls_back(local_store):
+    base = [["CREATE TABLE items (id TEXT PRIMARY KEY)"]]
+    local_store.migrate("items", base)
+
+    def broken(conn):
+        raise RuntimeError("falla a medio camino")
+
+    _restart(local_store)
+    with pytest.raises(RuntimeError):
+        local_store.migrate("items", base + [["ALTER TABLE items ADD COLUMN n INTEGER", broken]])
+    assert _version(local_store, "items") == 1
+    assert _columns(local_store, "items") == ["id"]
+
+    local_store.migrate("items", base + [["ALTER TABLE items ADD COLUMN n INTEGER"]])
+    assert _version(local_store, "items") == 2
+    assert _columns(local_store, "items") == ["id", "n"]
+
+
+def test_profiles_v1_upgrade_backfills_email_keys(local_store):
+    profile_store = importlib.import_module("src.profile_store")
+    local_store.migrate("profiles", profile_store._MIGRATIONS[:1])
+    with local_store.transaction() as conn:
+        for user_id, email in [("u1", "Ana@Example.com"), ("u2", "ana@example.COM"), ("u3", "Straße@example.com")]:
+            record = {"user_id": user_id, "email": email, "password": "x", "consent_notifications": True}
+            conn.execute("INSERT INTO profiles (user_id, email, data) VALUES (?, ?, ?)",
+                         (user_id, email, json.dumps(record)))
+
+    _restart(local_store)
+    assert profile_store.get_profile_by_email("ANA@example.com").user_id == "u1"
+    assert _version(local_store, "profiles") == len(profile_store._MIGRATIONS)
+    keys = dict(local_store.connect().execute("SELECT user_id, email_key FROM profiles").fetchall())
+    # el duplicado heredado se queda sin clave: el índice UNIQUE admite NULL
+    assert keys == {"u1": "ana@example.com", "u2": None, "u3": "strasse@example.com"}
+    # casefold: "STRASSE" encuentra "Straße", cosa que lower() de SQLite no haría
+    assert profile_store.get_profile_by_email("STRASSE@example.com").user_id == "u3"
+    with pytest.raises(ValueError, match=profile_store.DUPLICATE_EMAIL):
+        profile_store.create_profile("straße@EXAMPLE.com", "y", True)
+    assert len(profile_store.list_profiles()) == 3
+
+
+def test_forums_v1_upgrade_moves_embedded_comments(local_store):
+    forum_store = importlib.import_module("src.forum_store")
+    local_store.migrate("forums", forum_store._MIGRATIONS[:1])
+    foros = [
+        {"id": "f1", "titulo": "Agua", "estado": "aprobado",
+         "comentarios": [{"autor": "a", "texto": f"c{i}", "fecha": "d"} for i in range(3)]},
+        {"id": "f2", "titulo": "Baches", "estado": "pendiente"},
+    ]
+    with local_store.transaction() as conn:
+        for foro in foros:
+            conn.execute("INSERT INTO forums (id, estado, data) VALUES (?, ?, ?)",
+                         (foro["id"], foro["estado"], json.dumps(foro)))
+
+    _restart(local_store)
+    assert forum_store.get_forum("f1")["num_comentarios"] == 3
+    assert "comentarios" not in forum_store.get_forum("f1")
+    assert [c["texto"] for c in forum_store.list_comments("f1")["comentarios"]] == ["c0", "c1", "c2"]
+    assert forum_store.get_forum("f2")["num_comentarios"] == 0
+    assert _version(local_store, "forums") == len(forum_store._MIGRATIONS)
+    # los comentarios nuevos continúan la numeración migrada
+    forum_store.add_comment("f1", "b", "c3")
+    assert [c["posicion"] for c in forum_store.list_comments("f1")["comentarios"]] == [0, 1, 2, 3]
+
+
+def test_legacy_json_is_imported_once(local_store, tmp_path):
+    profile_store = importlib.import_module("src.profile_store")
+    legacy = [
+        {"user_id": "u1", "email": "uno@example.com", "password": "x", "consent_notifications": True},
+        {"user_id": "u2", "email": "Uno@Example.com", "password": "x", "consent_notifications": False},
+    ]
+    profile_store.DATA_PATH.write_text(json.dumps(legacy), encoding="utf-8")
+    assert [p.user_id for p in profile_store.list_profiles()] == ["u1", "u2"]
+    assert profile_store.get_profile_by_email("UNO@example.com").user_id == "u1"
+
+    profile_store.DATA_PATH.write_text(json.dumps(legacy + [dict(legacy[0], user_id="u3")]), encoding="utf-8")
+    _restart(local_store)
+    assert [p.user_id for p in profile_store.list_profiles()] == ["u1", "u2"]
+    assert _version(local_store, "legacy:profiles") == 1
+
+
+def test_each_thread_gets_its_own_connection(local_store):
+    seen = []
+
+    def worker():
+        conn = local_store.connect()
+        seen.append((conn, conn is local_store.connect()))
+        conn.close()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    [(thread_conn, reused)] = seen
+    assert reused
+    assert thread_conn is not local_store.connect()
+    assert local_store.connect().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
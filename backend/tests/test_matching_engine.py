@@ -0,0 +1,83 @@
+"""Pruebas del motor vectorizado de matching (matching_engine)."""
+import math
+import random
+
+import pytest
+
+from src.agents.geo_index import event_distance
+from src.agents.matching_engine import MatchingEngine
+
+TOPICS = ["incendio", "inundacion", "sismo", "marcha", "corte_agua"]
+
+
+def _naive(users, event):
+    """Regla de referencia sobre todos los usuarios, sin índice ni vectores."""
+    out = []
+    for user in users:
+        dist = event_distance(user, event)
+        if dist is not None:
+            out.append({**user, "_distance_km": round(dist, 2)})
+    return out
+
+
+def _users(rng, n):
+    users = []
+    for i in range(n):
+        user = {"id": f"u-{i}",
+                "lat": 19.0 + rng.uniform(-1.5, 1.5),
+                "lon": -99.0 + rng.uniform(-1.5, 1.5),
+                "intereses": rng.sample(TOPICS, rng.randint(0, 3))}
+        if rng.random() < 0.7:
+            user["radius_km"] = rng.choice([0, 1, 5, 10, 25, 80, 300])
+        users.append(user)
+    # casos que la rejilla no puede acotar o que caen en los bordes
+    users += [
+        {"id": "sin-coords", "intereses": []},
+        {"id": "nan", "lat": math.nan, "lon": -99.0},
+        {"id": "radio-inf", "lat": 19.0, "lon": -99.0, "radius_km": math.inf},
+        {"id": "radio-enorme", "lat": -33.0, "lon": 151.0, "radius_km": 30000},
+        {"id": "fuera-de-rango", "lat": 95.0, "lon": -99.0, "radius_km": 50},
+        {"id": "antimeridiano", "lat": 19.0, "lon": 179.99, "radius_km": 40},
+        {"id": "texto", "lat": "19.1", "lon": "-99.1", "intereses": ["sismo"]},
+    ]
+    return users
+
+
+def _events(rng, n):
+    events = [{"event_id": f"e-{i}", "type": rng.choice(TOPICS + ["otro", None]),
+               "lat": 19.0 + rng.uniform(-2, 2), "lon": -99.0 + rng.uniform(-2, 2)}
+              for i in range(n)]
+    events += [
+        {"event_id": "polo", "type": "sismo", "lat": 95.0, "lon": -99.0},
+        {"event_id": "nan", "type": None, "lat": "nan", "lon": -99.0},
+        {"event_id": "otro-lado", "type": "sismo", "lat": 19.0, "lon": -179.99},
+        {"event_id": "lejos", "type": "incendio", "lat": -33.0, "lon": 151.0},
+    ]
+    return events
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_engine_matches_naive_scan(seed):
+    rng = random.Random(seed)
+    users = _users(rng, 600)
+    events = _events(rng, 60)
+    results = MatchingEngine(users).match(events)
+    assert len(results) == len(events)
+    for event, matched in zip(events, results):
+        assert matched == _naive(users, event), event["event_id"]
+    assert any(results), "la muestra debe producir notificaciones"
+
+
+def test_engine_without_users_or_events():
+    assert MatchingEngine([]).match([{"type": "sismo", "lat": 19.0, "lon": -99.0}]) == [[]]
+    assert MatchingEngine(_users(random.Random(0), 10)).match([]) == []
+
+
+def test_engine_evaluates_only_nearby_rows():
+    """Los usuarios lejanos no llegan a la pasada vectorizada."""
+    near = [{"id": f"n-{i}", "lat": 19.0, "lon": -99.0, "radius_km": 5} for i in range(3)]
+    far = [{"id": f"f-{i}", "lat": -33.0, "lon": 151.0, "radius_km": 5} for i in range(200)]
+    engine = MatchingEngine(far + near)
+    event = {"type": "sismo", "lat": 19.0, "lon": -99.0}
+    assert len(engine._index.candidates(19.0, -99.0)) == len(near)
+    assert [u["id"] for u in engine.match([event])[0]] == ["n-0", "n-1", "n-2"]
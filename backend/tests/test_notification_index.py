@@ -0,0 +1,101 @@
+"""Pruebas de los índices de plantillas y eventos (notification_index)."""
+import random
+
+import pytest
+
+from src.agents.notification_index import ANY_FREQUENCY, EventTopicIndex, TemplateIndex
+from src.agents.notifications_agent import NotificationAgent
+
+MUNICIPIOS = ["Mérida", "Progreso", "Valladolid", "Tizimín"]
+TEMAS = ["agua", "seguridad", "salud", "movilidad", "cultura"]
+FRECUENCIAS = ["inmediata", "diaria", "semanal"]
+
+
+def _templates(rng, n, n_ids):
+    """Plantillas con ids repetidos (n_ids < n) y algunas sin id."""
+    out = []
+    for i in range(n):
+        registro = {
+            "municipios": [m.upper() if rng.random() < 0.2 else m
+                           for m in rng.sample(MUNICIPIOS, rng.randint(1, 2))],
+            "temas": rng.sample(TEMAS, rng.randint(1, 3)),
+            "frecuencia": rng.choice(FRECUENCIAS),
+            "texto": f"plantilla {i}",
+        }
+        if rng.random() < 0.9:
+            registro["id"] = f"t-{rng.randrange(n_ids)}"
+        out.append(registro)
+    return out
+
+
+def _queries():
+    rng = random.Random(5)
+    for municipio in MUNICIPIOS + ["Otro"]:
+        for _ in range(4):
+            yield municipio, rng.sample(TEMAS, rng.randint(1, 3)), rng.choice(FRECUENCIAS + [ANY_FREQUENCY])
+
+
+def _assert_same_as_scan(index, registros):
+    for municipio, intereses, frecuencia in _queries():
+        expected = NotificationAgent.filter_notifications(registros, municipio, intereses, frecuencia)
+        got = index.lookup(municipio, intereses, frecuencia)
+        assert got == expected, (municipio, intereses, frecuencia)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_repeated_ids_are_all_indexed(seed):
+    registros = _templates(random.Random(seed), 200, 40)
+    index = TemplateIndex(registros)
+    assert len(index) == len(registros)
+    _assert_same_as_scan(index, registros)
+
+
+def test_sync_with_repeated_ids_matches_rebuild():
+    rng = random.Random(9)
+    registros = _templates(rng, 120, 20)
+    index = TemplateIndex(registros)
+
+    edited = [dict(r) for r in registros]
+    # cambia una copia repetida, quita otra y agrega más del mismo id
+    dup_positions = [i for i, r in enumerate(edited) if r.get("id") == edited[0].get("id")]
+    edited[dup_positions[-1]]["frecuencia"] = "semanal"
+    del edited[dup_positions[0]]
+    edited += [dict(r, texto="nuevo") for r in _templates(rng, 30, 20)]
+    rng.shuffle(edited)
+
+    index.sync(edited)
+    assert len(index) == len(edited)
+    _assert_same_as_scan(index, edited)
+    fresh = TemplateIndex(edited)
+    for municipio, intereses, frecuencia in _queries():
+        assert index.lookup(municipio, intereses, frecuencia) == fresh.lookup(municipio, intereses, frecuencia)
+
+
+def test_sync_drops_removed_duplicates():
+    a = {"id": "t", "municipios": ["Mérida"], "temas": ["agua"], "frecuencia": "diaria", "n": 1}
+    b = dict(a, n=2)
+    index = TemplateIndex([a, b])
+    assert index.lookup("mérida", ["agua"], "diaria") == [a, b]
+    index.sync([b])
+    assert index.lookup("mérida", ["agua"], "diaria") == [b]
+    assert len(index) == 1
+
+
+def test_add_replaces_by_id():
+    index = TemplateIndex()
+    old = {"id": "t", "municipios": ["Mérida"], "temas": ["agua"], "frecuencia": "diaria"}
+    new = {"id": "t", "municipios": ["Progreso"], "temas": ["agua"], "frecuencia": "diaria"}
+    assert index.add(old) == "t"
+    assert index.add(new) == "t"
+    assert index.lookup("Mérida", ["agua"], ANY_FREQUENCY) == []
+    assert index.lookup("Progreso", ["agua"], ANY_FREQUENCY) == [new]
+    index.remove("t")
+    assert len(index) == 0
+
+
+def test_event_topic_index_keeps_file_order():
+    events = [{"event_id": i, "type": t} for i, t in enumerate(["agua", None, "salud", "agua", "", "cultura"])]
+    index = EventTopicIndex(events)
+    assert [e["event_id"] for e in index.relevant(["agua"])] == [0, 1, 3, 4]
+    assert [e["event_id"] for e in index.relevant(["agua", "salud"], limit=3)] == [0, 1, 2]
+    assert index.relevant([]) == events
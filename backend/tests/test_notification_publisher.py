@@ -0,0 +1,104 @@
+"""Publisher -> dispatch wiring (events/publisher.py and the notification agent)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("azure.ai.openai")
+
+from src.agents import notifications_agent  # noqa: E402
+from src.agents.dispatch import Channel, Delivery, DispatchPipeline  # noqa: E402
+from src.civicpulse_api.events.publisher import (  # noqa: E402
+    DEFAULT_EVENT_TYPE,
+    LocalEventGrid,
+    NotificationPublisher,
+)
+
+
+def _recording_channel(sent: list) -> Channel:
+    def send_batch(deliveries):
+        sent.extend(deliveries)
+        return [True] * len(deliveries)
+
+    return Channel("console", send_batch)
+
+
+def test_publish_without_subscriber_is_dead_lettered():
+    async def scenario():
+        publisher = NotificationPublisher(topic=LocalEventGrid(backoff_s=0))
+        await publisher.publish({"event_id": "e1"})
+        await publisher.stop()
+        return publisher.topic.dead_letters
+
+    dead = asyncio.run(scenario())
+    assert [d["data"] for d in dead] == [{"event_id": "e1"}]
+    assert dead[0]["deadLetterReason"] == "no subscriber"
+
+
+def test_published_deliveries_reach_the_pipeline():
+    sent: list[Delivery] = []
+    observed: list[dict] = []
+
+    async def observer(event):
+        observed.append(event)
+
+    async def scenario():
+        publisher = NotificationPublisher(topic=LocalEventGrid(backoff_s=0))
+        publisher.topic.subscribe(observer, DEFAULT_EVENT_TYPE)
+        async with DispatchPipeline([_recording_channel(sent)], backoff_s=0) as pipeline:
+            async with publisher.dispatch_into(pipeline) as submit:
+                for i in range(5):
+                    await submit(Delivery(f"e{i}", {"user_id": "u1"}, f"msg {i}", "console"))
+        await publisher.stop()
+        return publisher, pipeline
+
+    publisher, pipeline = asyncio.run(scenario())
+    assert sorted(d.event_id for d in sent) == [f"e{i}" for i in range(5)]
+    assert len(pipeline.result.delivered) == 5
+    assert len(observed) == 5
+    # the run-scoped subscription is removed once the run is over
+    assert len(publisher.topic._subscriptions) == 1
+    assert publisher.topic.dead_letters == []
+
+
+@pytest.fixture
+def agent(notifications_env, monkeypatch):
+    users = [
+        {"user_id": "u1", "lat": 19.43, "lon": -99.13, "radius_km": 10, "intereses": ["sismo"]},
+        {"user_id": "u2", "lat": 20.97, "lon": -89.62, "radius_km": 10, "intereses": []},
+    ]
+    events = [
+        {"event_id": "e1", "type": "sismo", "lat": 19.44, "lon": -99.14, "timestamp": "t"},
+        {"event_id": "e2", "type": "sismo", "lat": 20.96, "lon": -89.61, "timestamp": "t"},
+    ]
+    (notifications_env / "profiles.json").write_text(json.dumps(users), encoding="utf-8")
+    (notifications_env / "events.json").write_text(json.dumps(events), encoding="utf-8")
+    agent = notifications_agent.NotificationAgent()
+    agent.sent = []
+    monkeypatch.setattr(agent, "send_console", lambda message, user: agent.sent.append(user["user_id"]) or True)
+    return agent
+
+
+def test_detection_publishes_into_dispatch(agent):
+    observed: list[dict] = []
+
+    async def observer(event):
+        observed.append(event["data"])
+
+    async def scenario():
+        publisher = NotificationPublisher(topic=LocalEventGrid(backoff_s=0))
+        publisher.topic.subscribe(observer, DEFAULT_EVENT_TYPE)
+        first = await agent.run_detection_and_notify_async(publisher=publisher)
+        second = await agent.run_detection_and_notify_async(publisher=publisher)
+        await publisher.stop()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert sorted(n["event_id"] for n in first["notified"]) == ["e1", "e2"]
+    assert sorted(agent.sent) == ["u1", "u2"]
+    assert sorted((d["event_id"], d["user"]["user_id"]) for d in observed) == [("e1", "u1"), ("e2", "u2")]
+    assert ("e1", "u1") in agent.delivery
+    assert second["notified"] == []
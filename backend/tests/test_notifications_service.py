@@ -0,0 +1,91 @@
+"""Notification previews: bounded cache and read-only template snapshots."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+pytest.importorskip("azure.ai.openai")
+
+from pydantic import ValidationError  # noqa: E402
+
+from src.civicpulse_api.core.config import Settings  # noqa: E402
+from src.civicpulse_api.repositories.events_repository import CivicEventRepository  # noqa: E402
+from src.civicpulse_api.repositories.notifications_repository import (  # noqa: E402
+    NotificationPreferenceRepository,
+    NotificationTemplateRepository,
+)
+from src.civicpulse_api.repositories.profile_repository import ProfileRepository  # noqa: E402
+from src.civicpulse_api.services.notifications_service import NotificationsService  # noqa: E402
+from src.civicpulse_api.services.profile_service import ProfileService  # noqa: E402
+
+TEMPLATES = [
+    {"id": "not-1", "titulo": "Movilidad", "descripcion": "Ciclovías", "municipios": ["Mérida"],
+     "temas": ["movilidad"], "frecuencia": "inmediata"},
+    {"id": "not-2", "titulo": "Agua", "descripcion": "Cortes", "municipios": ["Mérida", "Progreso"],
+     "temas": ["agua"], "frecuencia": "diaria"},
+]
+
+
+@pytest.fixture
+def settings(tmp_path):
+    profiles = [
+        {"id": f"p{i}", "display_name": f"Perfil {i}", "municipality": "Mérida",
+         "interests": ["movilidad", "agua"]}
+        for i in range(5)
+    ]
+    (tmp_path / "profiles.json").write_text(json.dumps(profiles), encoding="utf-8")
+    (tmp_path / "notifications.json").write_text(json.dumps(TEMPLATES), encoding="utf-8")
+    (tmp_path / "events.json").write_text("[]", encoding="utf-8")
+    return Settings(data_root=tmp_path)
+
+
+def _service(settings, cache_size=2):
+    return NotificationsService(
+        ProfileService(ProfileRepository(settings)),
+        NotificationPreferenceRepository(settings),
+        NotificationTemplateRepository(settings),
+        CivicEventRepository(settings),
+        cache_size=cache_size,
+    )
+
+
+def test_preview_cache_is_a_bounded_lru(settings):
+    service = _service(settings, cache_size=2)
+    for profile_id in ("p0", "p1", "p2"):
+        assert [item.id for item in service.preview_notifications(profile_id)] == ["not-1", "not-2"]
+    assert list(service._cache) == ["p1", "p2"]
+
+    service.preview_notifications("p1")  # hit: p1 becomes the most recent
+    service.preview_notifications("p3")
+    assert list(service._cache) == ["p1", "p3"]
+
+
+def test_cached_previews_cannot_be_altered_by_callers(settings):
+    service = _service(settings)
+    first = service.preview_notifications("p0")
+    first.clear()
+    second = service.preview_notifications("p0")
+    assert [item.id for item in second] == ["not-1", "not-2"]
+    assert second is not service.preview_notifications("p0")
+    with pytest.raises(ValidationError):
+        second[0].title = "otro"
+    assert service.preview_notifications("p0")[0].title == "Movilidad"
+
+
+def test_disabled_cache_still_serves_previews(settings):
+    service = _service(settings, cache_size=0)
+    assert [item.id for item in service.preview_notifications("p0")] == ["not-1", "not-2"]
+    assert not service._cache
+
+
+def test_template_snapshot_is_read_only(settings):
+    repository = NotificationTemplateRepository(settings)
+    templates = repository.list()
+    with pytest.raises(TypeError):
+        templates[0]["titulo"] = "otro"
+    assert templates[0]["temas"] == ("movilidad",)
+    templates.clear()
+    assert [t["id"] for t in repository.list()] == ["not-1", "not-2"]
+    assert repository.list()[0] is repository.list()[0]
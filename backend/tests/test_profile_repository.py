@@ -0,0 +1,99 @@
+"""ProfileIndex lookups against linear scans over the same profiles."""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+
+import pytest
+
+pytest.importorskip("azure.ai.openai")
+
+from pydantic import ValidationError  # noqa: E402
+
+from src.civicpulse_api.core.config import Settings  # noqa: E402
+from src.civicpulse_api.repositories.profile_repository import ProfileRepository  # noqa: E402
+
+MUNICIPALITIES = ["Mérida", "MÉRIDA", "Progreso", "Ciudad de México"]
+TAGS = ["Agua", "agua", "movilidad", "Salud", "STRASSE", "straße"]
+
+
+def _profiles(seed: int, n: int = 150) -> list[dict]:
+    rng = random.Random(seed)
+    profiles = []
+    for i in range(n):
+        profile = {
+            # repeated ids and emails: the first occurrence must win
+            "id": f"p{rng.randrange(n // 2)}",
+            "display_name": f"Perfil {i}",
+            "municipality": rng.choice(MUNICIPALITIES),
+            "tags": rng.sample(TAGS, rng.randint(0, 3)),
+        }
+        if rng.random() < 0.8:
+            local = f"user{rng.randrange(n // 3)}"
+            profile["email"] = rng.choice([f"{local}@example.com", f"{local.upper()}@Example.COM"])
+        profiles.append(profile)
+    return profiles
+
+
+@pytest.fixture
+def write_profiles(tmp_path):
+    path = tmp_path / "profiles.json"
+    clock = [1_700_000_000]
+
+    def write(profiles: list[dict]) -> ProfileRepository:
+        path.write_text(json.dumps(profiles, ensure_ascii=False), encoding="utf-8")
+        clock[0] += 1
+        os.utime(path, (clock[0], clock[0]))
+        return ProfileRepository(Settings(data_root=tmp_path))
+
+    return write
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_lookups_match_linear_scans(write_profiles, seed):
+    repository = write_profiles(_profiles(seed))
+    profiles = repository.list()
+
+    for profile_id in {p.id for p in profiles} | {"missing"}:
+        expected = next((p for p in profiles if p.id == profile_id), None)
+        assert repository.get_by_id(profile_id) is expected
+
+    emails = {p.email for p in profiles if p.email} | {"nobody@example.com"}
+    for email in emails | {e.swapcase() for e in emails}:
+        expected = next((p for p in profiles if p.email and p.email.casefold() == email.casefold()), None)
+        assert repository.get_by_email(email) is expected
+
+    for query in (["agua"], ["SALUD", "movilidad"], ["strasse"], [], ["ninguna"]):
+        wanted = {t.casefold() for t in query}
+        expected = [p for p in profiles if wanted & {t.casefold() for t in p.tags}]
+        assert repository.search_by_tags(query) == expected
+
+    for municipality in ("mérida", "PROGRESO", "Ciudad de México", "Otro"):
+        expected = [p for p in profiles if p.municipality.casefold() == municipality.casefold()]
+        assert repository.list_by_municipality(municipality) == expected
+
+
+def test_index_is_rebuilt_when_the_file_changes(write_profiles):
+    repository = write_profiles([{"id": "p1", "display_name": "Uno", "municipality": "Mérida", "tags": ["agua"]}])
+    first = repository.get_by_id("p1")
+    assert repository.get_by_id("p1") is first  # same snapshot, same instance
+
+    write_profiles([
+        {"id": "p1", "display_name": "Uno bis", "municipality": "Progreso", "tags": []},
+        {"id": "p2", "display_name": "Dos", "municipality": "Mérida", "tags": ["agua"], "email": "dos@example.com"},
+    ])
+    assert repository.get_by_id("p1").display_name == "Uno bis"
+    assert [p.id for p in repository.search_by_tags(["agua"])] == ["p2"]
+    assert [p.id for p in repository.list_by_municipality("progreso")] == ["p1"]
+    assert repository.get_by_email("DOS@example.com").id == "p2"
+
+
+def test_shared_profiles_are_read_only(write_profiles):
+    repository = write_profiles([{"id": "p1", "display_name": "Uno", "municipality": "Mérida"}])
+    profiles = repository.list()
+    with pytest.raises(ValidationError):
+        profiles[0].display_name = "otro"
+    profiles.clear()
+    assert [p.id for p in repository.list()] == ["p1"]
@@ -0,0 +1,81 @@
+"""Pruebas de unicidad de correos e identificadores en src/profile_store.py."""
+import importlib
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def profile_store(local_store):
+    return importlib.import_module("src.profile_store")
+
+
+def _emails(profile_store):
+    return sorted(p.email for p in profile_store.list_profiles())
+
+
+def test_create_rejects_emails_that_differ_only_in_case(profile_store):
+    ana = profile_store.create_profile("Ana@Example.com", "x", True)
+    with pytest.raises(ValueError, match=profile_store.DUPLICATE_EMAIL):
+        profile_store.create_profile("ana@EXAMPLE.COM", "y", False)
+    assert profile_store.get_profile_by_email("ANA@example.com").user_id == ana.user_id
+    assert _emails(profile_store) == ["Ana@Example.com"]
+
+
+def test_update_email_keeps_email_key_unique(profile_store):
+    ana = profile_store.create_profile("ana@example.com", "x", True)
+    beto = profile_store.create_profile("beto@example.com", "x", True)
+    with pytest.raises(ValueError, match=profile_store.DUPLICATE_EMAIL):
+        profile_store.update_profile(beto.user_id, {"email": "ANA@example.com"})
+    assert profile_store.get_profile_by_email("beto@example.com").user_id == beto.user_id
+
+    # cambiar sólo mayúsculas del propio correo no choca consigo mismo
+    profile_store.update_profile(ana.user_id, {"email": "Ana@Example.com", "municipio": "Mérida"})
+    assert profile_store.get_profile_by_email("ana@example.com").municipio == "Mérida"
+
+    # el correo anterior queda libre para otra cuenta
+    profile_store.update_profile(beto.user_id, {"email": "roberto@example.com"})
+    assert profile_store.get_profile_by_email("beto@example.com") is None
+    carla = profile_store.create_profile("BETO@example.com", "x", True)
+    assert profile_store.get_profile_by_email("beto@example.com").user_id == carla.user_id
+
+
+def test_update_rejects_user_id_of_another_profile(profile_store):
+    ana = profile_store.create_profile("ana@example.com", "x", True)
+    beto = profile_store.create_profile("beto@example.com", "x", True)
+    with pytest.raises(ValueError, match=profile_store.DUPLICATE_USER_ID):
+        profile_store.update_profile(beto.user_id, {"user_id": ana.user_id, "municipio": "Progreso"})
+    # la transacción se revierte: beto sigue intacto
+    beto_now = profile_store.get_profile_by_email("beto@example.com")
+    assert beto_now.user_id == beto.user_id and beto_now.municipio == ""
+    assert profile_store.get_profile_by_email("ana@example.com").user_id == ana.user_id
+
+
+def test_update_can_rename_user_id(profile_store):
+    ana = profile_store.create_profile("ana@example.com", "x", True)
+    renamed = profile_store.update_profile(ana.user_id, {"user_id": "ana-1"})
+    assert renamed.user_id == "ana-1"
+    assert profile_store.get_profile_by_email("ana@example.com").user_id == "ana-1"
+    # pasar el propio user_id en los datos no es un cambio
+    assert profile_store.update_profile("ana-1", {"user_id": "ana-1"}).user_id == "ana-1"
+    with pytest.raises(ValueError, match="Perfil no encontrado"):
+        profile_store.update_profile(ana.user_id, {"municipio": "Mérida"})
+
+
+def test_concurrent_signups_with_same_email(profile_store):
+    results = []
+    emails = ["mismo@example.com", "MISMO@example.com", "Mismo@Example.COM"]
+
+    def signup(i):
+        try:
+            results.append(profile_store.create_profile(emails[i % len(emails)], "x", True))
+        except ValueError:
+            results.append(None)
+
+    threads = [threading.Thread(target=signup, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(r is not None for r in results) == 1
+    assert len(profile_store.list_profiles()) == 1
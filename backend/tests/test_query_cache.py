@@ -0,0 +1,80 @@
+"""Pruebas de la caché de respuestas ligada al snapshot del índice."""
+import shutil
+
+import pytest
+
+from src.agents import ingestion_agent, query_cache, rag_agent
+from src.agents.query_cache import QueryCache
+
+
+class _Snapshot:
+    def __init__(self, generation):
+        self.generation = generation
+
+
+def test_reset_to_new_snapshot_drops_entries():
+    cache = QueryCache(maxsize=8, ttl=0)
+    old, new = _Snapshot(1), _Snapshot(1)  # misma generación, distinto snapshot
+    cache.reset(old)
+    cache.put("q", old, "respuesta vieja")
+    assert cache.get("q", old) == "respuesta vieja"
+
+    cache.reset(new)
+    assert cache.get("q", new) is None
+    # una consulta que aún usa el snapshot viejo ni lee ni escribe
+    cache.put("q", old, "respuesta vieja")
+    assert cache.get("q", old) is None
+    assert cache.get("q", new) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    snapshot = _Snapshot(1)
+    cache = QueryCache(maxsize=2, ttl=10)
+    cache.reset(snapshot)
+    cache.put("a", snapshot, 1)
+    cache.put("b", snapshot, 2)
+    assert cache.get("a", snapshot) == 1  # "b" pasa a ser el menos usado
+    cache.put("c", snapshot, 3)
+    assert cache.get("b", snapshot) is None
+    assert cache.get("a", snapshot) == 1
+
+    now[0] += 10
+    assert cache.get("a", snapshot) is None
+    assert cache.get("c", snapshot) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["size"]) == (2, 0)
+
+
+@pytest.fixture
+def rag_env(ingestion_env, monkeypatch):
+    monkeypatch.setattr(rag_agent, "INDEX_DIR", ingestion_agent.INDEX_DIR)
+    return ingestion_env
+
+
+def test_rag_answers_follow_a_rebuilt_index(rag_env, write_source):
+    write_source("events.json", [{"id": "a", "titulo": "Jornada de vacunación", "lugar": "centro"}])
+    ingestion_agent.run_ingestion()
+    agent = rag_agent.RAGAgent(reload_interval=0)
+    try:
+        first = agent.answer("vacunación", {})
+        assert "Jornada de vacunación" in first
+        assert agent.answer("vacunación", {}) == first
+        assert agent.cache_stats()["hits"] == 1
+
+        # reconstrucción desde cero: la generación vuelve a coincidir
+        generation = agent.index.generation
+        shutil.rmtree(ingestion_agent.INDEX_DIR)
+        write_source("events.json", [{"id": "b", "titulo": "Campaña de vacunación canina", "lugar": "norte"}])
+        ingestion_agent.run_ingestion()
+        assert agent.refresh()
+        assert agent.index.generation == generation
+
+        second = agent.answer("vacunación", {})
+        assert "Campaña de vacunación canina" in second
+        assert "Jornada" not in second
+        assert not agent.refresh()
+    finally:
+        agent.close()
@@ -0,0 +1,87 @@
+"""Pruebas del top-k BM25 (MaxScore con block-max) contra BM25 por fuerza bruta."""
+import random
+from collections import defaultdict
+
+import pytest
+
+from src.agents.ranking import B, K1, bm25_top_k, idf
+from src.agents.segments import SegmentWriter, open_segments, save_manifest, segment_name
+
+_VOCABULARY = [f"t{r}" for r in range(300)]
+_WEIGHTS = [1.0 / (r + 1) for r in range(len(_VOCABULARY))]
+_QUERIES = [["t0"], ["t0", "t1"], ["t3", "t50", "t200"], ["t2", "t2", "t9"],
+            ["t10", "t11", "t12", "t13"], ["t100", "t7"], ["t299", "inexistente"]]
+
+
+def _build(index_dir, segment_sizes, deleted_ratio=0.0, seed=11):
+    """Índice segmentado con vocabulario tipo Zipf y documentos borrados al azar."""
+    rng = random.Random(seed)
+    segments = []
+    for number, size in enumerate(segment_sizes, start=1):
+        writer = SegmentWriter(index_dir, segment_name(number), ["events"])
+        for i in range(size):
+            tokens = rng.choices(_VOCABULARY, _WEIGHTS, k=rng.randint(5, 60))
+            writer.add("events", f"{number}-{i}", {"id": i}, tokens)
+        entry = writer.close()
+        entry["deleted"] = sorted(d for d in range(size) if rng.random() < deleted_ratio)
+        segments.append(entry)
+    save_manifest(index_dir, {"generation": 1, "next_segment": len(segments) + 1, "segments": segments})
+    return open_segments(index_dir)
+
+
+def _brute_force(index, query):
+    avgdl = index.avg_doc_len
+    scores = defaultdict(float)
+    for term, qtf in ((t, query.count(t)) for t in set(query)):
+        df = index.term_stats(term)[0]
+        if not df:
+            continue
+        weight = qtf * idf(index.n_docs, df) * (K1 + 1.0)
+        for doc, tf in index.postings(term):
+            dl = index.doc_lens[doc]
+            scores[doc] += weight * tf / (tf + K1 * (1.0 - B + B * dl / avgdl))
+    return scores
+
+
+def _check(index, query, top_k):
+    expected = _brute_force(index, query)
+    result = bm25_top_k(index, query, top_k)
+    ranked = sorted(expected.values(), reverse=True)[:top_k]
+    assert len(result) == len(ranked)
+    # los scores coinciden posición a posición; en empates puede variar el doc
+    assert [score for _, score in result] == pytest.approx(ranked)
+    for doc, score in result:
+        assert expected[doc] == pytest.approx(score)
+        assert doc not in index.deleted
+    assert [score for _, score in result] == sorted((s for _, s in result), reverse=True)
+
+
+@pytest.mark.parametrize("top_k", [1, 10, 50])
+def test_single_segment_matches_brute_force(tmp_path, top_k):
+    index = _build(tmp_path, [3000])
+    try:
+        for query in _QUERIES:
+            _check(index, query, top_k)
+    finally:
+        index.close()
+
+
+@pytest.mark.parametrize("top_k", [1, 10, 50])
+def test_segments_with_deletions_match_brute_force(tmp_path, top_k):
+    index = _build(tmp_path, [1200, 700, 900], deleted_ratio=0.2)
+    try:
+        assert index.deleted
+        for query in _QUERIES:
+            _check(index, query, top_k)
+    finally:
+        index.close()
+
+
+def test_edge_cases(tmp_path):
+    index = _build(tmp_path, [50])
+    try:
+        assert bm25_top_k(index, ["t0"], 0) == []
+        assert bm25_top_k(index, ["inexistente"], 5) == []
+        assert len(bm25_top_k(index, ["t0", "t1"], 1000)) == len(_brute_force(index, ["t0", "t1"]))
+    finally:
+        index.close()
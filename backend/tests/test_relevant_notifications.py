@@ -0,0 +1,93 @@
+"""Pruebas de las notificaciones por perfil (get_relevant_notifications)."""
+import json
+
+import pytest
+
+from src.agents.geo_index import EventSpatialIndex, record_coordinates
+from src.agents.notifications_agent import NotificationAgent
+
+# Zócalo (CDMX) y puntos a distancias conocidas
+ORIGIN = (19.4326, -99.1332)
+
+
+def _event(event_id, lat=None, lon=None, keys=("lat", "lon"), type_="movilidad"):
+    event = {"event_id": event_id, "title": f"Evento {event_id}", "type": type_, "timestamp": "t"}
+    if lat is not None:
+        event[keys[0]], event[keys[1]] = lat, lon
+    return event
+
+
+@pytest.fixture
+def make_agent(notifications_env):
+    def make(events, users=()):
+        (notifications_env / "events.json").write_text(json.dumps(events), encoding="utf-8")
+        (notifications_env / "profiles.json").write_text(json.dumps(list(users)), encoding="utf-8")
+        return NotificationAgent()
+    return make
+
+
+def _titles(message):
+    return [line[2:].split(" (")[0] for line in message.splitlines() if line.startswith("- ")]
+
+
+def test_record_coordinates_reads_both_key_styles():
+    assert record_coordinates({"lat": "19.4", "lon": -99.1}) == (19.4, -99.1)
+    assert record_coordinates({"latitude": 19.4, "longitude": -99.1}) == (19.4, -99.1)
+    # la primera pareja válida gana; una inválida no impide leer la otra
+    assert record_coordinates({"lat": "x", "lon": 1, "latitude": 2, "longitude": 3}) == (2.0, 3.0)
+    assert record_coordinates({"lat": 95, "lon": 0}) is None
+    assert record_coordinates({"latitude": None, "longitude": 1}) is None
+    assert record_coordinates({}) is None
+
+
+def test_event_index_keeps_unlocated_events_in_order():
+    events = [
+        _event("a", 19.44, -99.13, keys=("latitude", "longitude")),
+        _event("b"),
+        _event("c", 19.5, -99.1),
+        _event("d", "n/a", "n/a"),
+    ]
+    index = EventSpatialIndex(events)
+    assert [pos for _, pos in index.nearby(*ORIGIN, 20)] == [0, 2]
+    assert index.unlocated == [1, 3]
+
+
+def test_events_with_latitude_longitude_are_ranked_by_distance(make_agent):
+    events = [
+        _event("lejos", 19.55, -99.13, keys=("latitude", "longitude")),
+        _event("cerca", 19.4330, -99.1330, keys=("latitude", "longitude")),
+        _event("medio", 19.47, -99.13),
+        _event("fuera", 20.5, -99.13, keys=("latitude", "longitude")),
+    ]
+    agent = make_agent(events)
+    profile = {"latitude": ORIGIN[0], "longitude": ORIGIN[1], "radius_km": 30, "intereses": ["movilidad"]}
+    message = agent.get_relevant_notifications(profile)
+    assert _titles(message) == ["Evento cerca", "Evento medio", "Evento lejos"]
+    assert "a 0.0 km" in message
+
+
+def test_unlocated_events_follow_the_distance_sorted_ones(make_agent):
+    events = [
+        _event("sin-1"),
+        _event("otro-tema", type_="salud"),
+        _event("lejos", 19.50, -99.13),
+        _event("sin-2", "?", "?"),
+        _event("cerca", 19.44, -99.13, keys=("latitude", "longitude")),
+        _event("sin-3"),
+    ]
+    agent = make_agent(events)
+    profile = {"lat": ORIGIN[0], "lon": ORIGIN[1], "radius_km": 20, "intereses": ["movilidad"]}
+    assert _titles(agent.get_relevant_notifications(profile)) == ["Evento cerca", "Evento lejos", "Evento sin-1"]
+
+    near_only = {**profile, "radius_km": 2}
+    message = agent.get_relevant_notifications(near_only)
+    assert _titles(message) == ["Evento cerca", "Evento sin-1", "Evento sin-2"]
+    assert "- Evento sin-1 (t)" in message.splitlines()
+
+
+def test_stored_profile_coordinates_are_used(make_agent):
+    users = [{"user_id": "u1", "latitude": ORIGIN[0], "longitude": ORIGIN[1], "radius_km": 5}]
+    events = [_event("sin"), _event("cerca", 19.44, -99.13, keys=("latitude", "longitude"))]
+    agent = make_agent(events, users)
+    message = agent.get_relevant_notifications({"user_id": "u1", "intereses": []})
+    assert _titles(message) == ["Evento cerca", "Evento sin"]
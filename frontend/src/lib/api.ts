@@ -42,9 +42,16 @@ export async function fetchEvents(municipality?: string) {
   return getOfflineEvents(municipality);
 }
 
-export async function fetchForums() {
-  const { data } = await api.get('/forums');
-  return data as Array<{ id: string; title: string; posts: Array<{ id: string; author: string; content: string }> }>;
+export type Page<T> = { items: T[]; next_cursor: string | null };
+
+export async function fetchForums(cursor?: string) {
+  const { data } = await api.get('/forums', { params: { cursor } });
+  return data as Page<{ id: string; title: string; municipality: string; tags: string[]; post_count: number }>;
+}
+
+export async function fetchForumPosts(threadId: string, cursor?: string) {
+  const { data } = await api.get(`/forums/${threadId}/posts`, { params: { cursor } });
+  return data as Page<{ id: string; author: string; content: string; created_at: string }>;
 }
 
 export async function fetchNotifications(profileId: string) {
@@ -0,0 +1,90 @@
+"""
+Analizador de texto compartido por la ingesta y el RAG.
+
+Cada token pasa por:
+- minúsculas y plegado de acentos ("votación" -> "votacion"); la ñ se
+  conserva para no confundir "año" con "ano"
+- stopwords del español (también plegadas)
+- stemming ligero de plurales y género ("votaciones" -> "votacion",
+  "ciudadanas" -> "ciudadan"), en la línea del stemmer ligero de Savoy
+
+El resultado se cachea por token único: el vocabulario de un catálogo es
+pequeño comparado con el número de tokens, así que casi todo el trabajo se
+reduce a una búsqueda en diccionario.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Optional
+
+# Cambiar si cambia la salida del analizador: obliga a reconstruir el índice
+ANALYZER_VERSION = 1
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_STOPWORDS_RAW = """
+a al algo algunas algunos ante antes como con contra cual cuales cuando cuanto de del desde
+donde dos durante e el él ella ellas ello ellos en entre era erais eran eras eres es esa esas
+ese eso esos esta está estaba estaban estamos están estar estas este esto estos estoy fue fueron
+fui fuimos ha había habían han has hasta hay he la las le les lo los más me mi mí mis mucho
+muchos muy nada ni no nos nosotras nosotros nuestra nuestras nuestro nuestros o os otra otras
+otro otros para pero poco por porque que qué quien quién quienes se sea sean ser será si sí
+sido siempre sin sobre sois solo sólo somos son soy su sus suya suyas suyo suyos también tanto
+te tenemos tener tengo ti tiene tienen todo todos tu tú tus tuya tuyas tuyo tuyos un una unas
+uno unos usted ustedes vosotras vosotros vuestra vuestras vuestro vuestros y ya yo
+"""
+
+
+def fold_accents(text: str) -> str:
+    """Quita tildes y diéresis; conserva la ñ."""
+    if text.isascii():
+        return text
+    out = []
+    for ch in unicodedata.normalize("NFD", text):
+        if unicodedata.combining(ch):
+            if ch == "\u0303" and out and out[-1] in "nN":
+                out[-1] = "ñ" if out[-1] == "n" else "Ñ"
+            continue
+        out.append(ch)
+    return "".join(out)
+
+
+STOPWORDS = frozenset(fold_accents(w) for w in _STOPWORDS_RAW.split())
+
+
+def light_stem(token: str) -> str:
+    """Quita terminaciones de número y género de palabras de 5+ letras."""
+    if len(token) < 5 or token.isdigit():
+        return token
+    last = token[-1]
+    if last in "oae":
+        return token[:-1]
+    if last == "s":
+        if token.endswith("eses"):
+            return token[:-2]
+        if token.endswith("ces"):
+            return token[:-3] + "z"
+        if token[-2] in "oae":
+            return token[:-2]
+    return token
+
+
+@lru_cache(maxsize=65536)
+def analyze_token(token: str) -> Optional[str]:
+    """Término indexable de un token ya en minúsculas, o None si se descarta."""
+    term = fold_accents(token)
+    if len(term) <= 1 or term in STOPWORDS:
+        return None
+    return light_stem(term)
+
+
+def analyze(text: str) -> List[str]:
+    """Convierte texto libre en la lista de términos que usa el índice BM25."""
+    if not text:
+        return []
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        term = analyze_token(token)
+        if term is not None:
+            terms.append(term)
+    return terms
@@ -0,0 +1,508 @@
+"""
+Índice invertido compacto en disco para el pipeline de ingesta/RAG.
+
+Sustituye a index.json: en lugar de un dict token -> lista de dicts, el índice
+se guarda en un solo archivo binario que RAGAgent abre con mmap, sin parsear
+nada al arrancar.
+
+Formato (little-endian, secciones alineadas a 8 bytes):
+- cabecera fija con contadores y offsets de cada sección
+- colecciones: nombres utf-8 con prefijo de longitud
+- documentos: doc_id -> (índice de colección, posición, longitud en tokens)
+  en arreglos paralelos
+- diccionario de términos ordenado por bytes utf-8 (offsets al blob de
+  términos, df, tf máximo, longitud mínima de documento y offsets a
+  postings) para búsqueda binaria
+- postings: por término, bloques de hasta BLOCK_SIZE doc ids codificados en
+  delta, seguidos de sus frecuencias; ambos como arreglos del ancho mínimo
+  que les cabe (B/H/I). La cabecera de cada bloque guarda su primer y último
+  doc id para poder saltarlo sin decodificarlo, y su tf máximo y la razón
+  mínima longitud/tf de sus documentos para acotar su score BM25
+  (block-max).
+"""
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+MAGIC = b"CPIX"
+VERSION = 3
+BLOCK_SIZE = 128
+
+# magic, versión, reservado, n_docs, n_terms, n_colecciones, suma de
+# longitudes de documento, 11 offsets de sección
+_HEADER = struct.Struct("<4sHHIIIQ11Q")
+# tamaño del bloque, ancho de los deltas, ancho de los tf, primer doc id,
+# último doc id, tf máximo, razón mínima longitud de documento / tf (en
+# punto fijo, ver _RATIO_SCALE)
+_BLOCK = struct.Struct("<HBBIIII")
+# La razón se guarda como floor(longitud * _RATIO_SCALE / tf): redondear hacia
+# abajo mantiene la cota superior del bloque.
+_RATIO_SCALE = 256
+_MAX_U32 = (1 << 32) - 1
+_WIDTHS = {1: "B", 2: "H", 4: "I"}
+_WIDTH_OF = {"B": 1, "H": 2, "I": 4}
+# Valores por columna de documentos que se acumulan antes de volcarlos a disco
+_COLUMN_CHUNK = 1 << 16
+
+
+def _width_for(max_value: int) -> int:
+    if max_value < 1 << 8:
+        return 1
+    if max_value < 1 << 16:
+        return 2
+    return 4
+
+
+def _to_le(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(buf, offset: int, count: int, width: int) -> array:
+    values = array(_WIDTHS[width])
+    values.frombytes(buf[offset:offset + count * width])
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def encode_postings(doc_ids: Sequence[int], tfs: Sequence[int],
+                    doc_lens: Optional[Sequence[int]] = None) -> bytes:
+    """
+    Codifica una lista ordenada de doc ids (y sus tf) en bloques delta.
+    `doc_lens` (longitud por doc id) da la razón mínima longitud/tf de cada
+    bloque; sin ella se guarda 0, que sigue siendo una cota válida aunque más
+    holgada.
+    """
+    out = bytearray()
+    for start in range(0, len(doc_ids), BLOCK_SIZE):
+        block = doc_ids[start:start + BLOCK_SIZE]
+        block_tfs = tfs[start:start + BLOCK_SIZE]
+        deltas = [b - a for a, b in zip(block, block[1:])]
+        width = _width_for(max(deltas, default=0))
+        max_tf = max(block_tfs)
+        tf_width = _width_for(max_tf)
+        min_ratio = 0
+        if doc_lens is not None:
+            min_ratio = min(min(doc_lens[d] * _RATIO_SCALE // tf for d, tf in zip(block, block_tfs)),
+                            _MAX_U32)
+        out += _BLOCK.pack(len(block), width, tf_width, block[0], block[-1], max_tf, min_ratio)
+        out += _to_le(array(_WIDTHS[width], deltas))
+        out += _to_le(array(_WIDTHS[tf_width], block_tfs))
+    return bytes(out)
+
+
+def _decode_block(buf, offset: int) -> Tuple[List[int], array, int, float, int]:
+    """
+    Decodifica el bloque en offset; devuelve (doc ids, tfs, tf máximo, razón
+    mínima longitud/tf, offset siguiente).
+    """
+    count, width, tf_width, first, _last, max_tf, min_ratio = _BLOCK.unpack_from(buf, offset)
+    offset += _BLOCK.size
+    deltas = _from_le(buf, offset, count - 1, width)
+    offset += (count - 1) * width
+    tfs = _from_le(buf, offset, count, tf_width)
+    offset += count * tf_width
+    return list(accumulate(deltas, initial=first)), tfs, max_tf, min_ratio / _RATIO_SCALE, offset
+
+
+def decode_postings(buf, offset: int, end: int) -> List[Tuple[int, int]]:
+    """Decodifica los bloques de un término entre offset y end como (doc_id, tf)."""
+    postings: List[Tuple[int, int]] = []
+    while offset < end:
+        doc_ids, tfs, _max_tf, _min_ratio, offset = _decode_block(buf, offset)
+        postings.extend(zip(doc_ids, tfs))
+    return postings
+
+
+class PostingCursor:
+    """
+    Cursor sobre la lista de postings de un término. Decodifica un bloque a la
+    vez y usa el último doc id de cada cabecera para saltar bloques completos
+    en next_geq(). block_last, block_max_tf y block_min_ratio describen el
+    bloque actual, para acotar el score de todos sus documentos sin
+    recorrerlos.
+    """
+
+    __slots__ = ("_buf", "_offset", "_end", "_docs", "_tfs", "_i", "doc",
+                 "block_max_tf", "block_min_ratio")
+
+    def __init__(self, buf, offset: int, end: int):
+        self._buf = buf
+        self._offset = offset
+        self._end = end
+        self._docs: List[int] = []
+        self._tfs: Sequence[int] = ()
+        self._i = 0
+        self.doc: Optional[int] = None
+        self.block_max_tf = 0
+        self.block_min_ratio = 0.0
+        self._load_next_block()
+
+    def _load_next_block(self) -> None:
+        if self._offset >= self._end:
+            self._docs, self._tfs, self._i = [], (), 0
+            self.doc = None
+            return
+        (self._docs, self._tfs, self.block_max_tf, self.block_min_ratio,
+         self._offset) = _decode_block(self._buf, self._offset)
+        self._i = 0
+        self.doc = self._docs[0]
+
+    @property
+    def tf(self) -> int:
+        return self._tfs[self._i]
+
+    @property
+    def block_last(self) -> int:
+        """Último doc id del bloque actual."""
+        return self._docs[-1]
+
+    def next(self) -> Optional[int]:
+        self._i += 1
+        if self._i < len(self._docs):
+            self.doc = self._docs[self._i]
+        else:
+            self._load_next_block()
+        return self.doc
+
+    def next_geq(self, target: int) -> Optional[int]:
+        """Avanza hasta el primer doc id >= target."""
+        if self.doc is None or self.doc >= target:
+            return self.doc
+        if self._docs[-1] < target:
+            # saltar bloques completos leyendo sólo sus cabeceras
+            while self._offset < self._end:
+                count, width, tf_width, _first, last, *_bounds = _BLOCK.unpack_from(self._buf, self._offset)
+                if last >= target:
+                    break
+                self._offset += _BLOCK.size + (count - 1) * width + count * tf_width
+            self._load_next_block()
+            if self.doc is None:
+                return None
+        self._i = bisect_left(self._docs, target, self._i)
+        self.doc = self._docs[self._i]
+        return self.doc
+
+
+def _pad(fh) -> int:
+    pos = fh.tell()
+    rem = pos % 8
+    if rem:
+        fh.write(b"\0" * (8 - rem))
+        pos += 8 - rem
+    return pos
+
+
+class _SpilledColumn:
+    """
+    Columna (de la tabla de documentos o del diccionario de términos) que se
+    vuelca a un archivo temporal cada _COLUMN_CHUNK valores, para que el
+    escritor no crezca con el corpus ni con el vocabulario.
+    """
+
+    def __init__(self, typecode: str, directory: Path):
+        self.typecode = typecode
+        self._buffer = array(typecode)
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._mm: Optional[mmap.mmap] = None
+        self._view = None
+
+    def append(self, value: int) -> None:
+        self._buffer.append(value)
+        if len(self._buffer) >= _COLUMN_CHUNK:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._file.write(_to_le(self._buffer))
+            self._buffer = array(self.typecode)
+
+    def values(self):
+        """Vista de sólo lectura (mapeada) de la columna completa."""
+        if self._view is None:
+            self.flush()
+            self._file.flush()
+            size = self._file.seek(0, os.SEEK_END)
+            if not size:
+                self._view = array(self.typecode)
+            elif sys.byteorder != "little":
+                self._file.seek(0)
+                self._view = _from_le(self._file.read(), 0, size // _WIDTH_OF[self.typecode],
+                                      _WIDTH_OF[self.typecode])
+            else:
+                self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._view = memoryview(self._mm).cast(self.typecode)
+        return self._view
+
+    def copy_to(self, fh) -> None:
+        self.flush()
+        self._file.seek(0)
+        shutil.copyfileobj(self._file, fh, 1 << 20)
+
+    def close(self) -> None:
+        if isinstance(self._view, memoryview):
+            self._view.release()
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+
+class IndexWriter:
+    """
+    Escritor del índice compacto.
+    Los términos deben llegar en orden (por bytes utf-8) y después de todos
+    los documentos. La tabla de documentos, el diccionario de términos y los
+    postings se vuelcan a archivos temporales conforme llegan; en memoria
+    sólo queda la lista de postings del término que se está agregando. El
+    archivo final se arma en close() con un reemplazo atómico.
+    """
+
+    def __init__(self, path: Path, collections: Sequence[str]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.collections = list(collections)
+        self._coll_ids = {c: i for i, c in enumerate(self.collections)}
+        self._doc_colls = _SpilledColumn("H", self.path.parent)
+        self._doc_pos = _SpilledColumn("I", self.path.parent)
+        self._doc_lens = _SpilledColumn("I", self.path.parent)
+        self._n_docs = 0
+        self._total_len = 0
+        self._n_terms = 0
+        self._terms = tempfile.TemporaryFile(dir=self.path.parent)
+        self._terms_len = 0
+        self._term_offsets = _SpilledColumn("I", self.path.parent)
+        self._term_offsets.append(0)
+        self._dfs = _SpilledColumn("I", self.path.parent)
+        self._max_tfs = _SpilledColumn("I", self.path.parent)
+        self._min_dls = _SpilledColumn("I", self.path.parent)
+        self._post_offsets = _SpilledColumn("Q", self.path.parent)
+        self._post_offsets.append(0)
+        self._postings = tempfile.TemporaryFile(dir=self.path.parent)
+        self._last_term: Optional[bytes] = None
+
+    def add_document(self, collection: str, pos: int, length: int) -> int:
+        """Registra un documento (con su longitud en tokens) y devuelve su doc id."""
+        if self._last_term is not None:
+            raise ValueError("Los documentos deben registrarse antes que los términos")
+        self._doc_colls.append(self._coll_ids[collection])
+        self._doc_pos.append(pos)
+        self._doc_lens.append(length)
+        self._n_docs += 1
+        self._total_len += length
+        return self._n_docs - 1
+
+    def add_term(self, term: str, doc_ids: Sequence[int], tfs: Sequence[int]) -> None:
+        raw = term.encode("utf-8")
+        if self._last_term is not None and raw <= self._last_term:
+            raise ValueError(f"Términos fuera de orden: {term!r}")
+        self._last_term = raw
+        self._n_terms += 1
+        self._terms.write(raw)
+        self._terms_len += len(raw)
+        self._term_offsets.append(self._terms_len)
+        self._dfs.append(len(doc_ids))
+        # Estadísticas para la cota superior de BM25 (MaxScore)
+        doc_lens = self._doc_lens.values()
+        self._max_tfs.append(max(tfs))
+        self._min_dls.append(min(doc_lens[d] for d in doc_ids))
+        self._postings.write(encode_postings(doc_ids, tfs, doc_lens))
+        self._post_offsets.append(self._postings.tell())
+
+    def _columns(self) -> List[_SpilledColumn]:
+        return [self._doc_colls, self._doc_pos, self._doc_lens, self._term_offsets,
+                self._dfs, self._max_tfs, self._min_dls, self._post_offsets]
+
+    def close(self) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        offsets = []
+        try:
+            with tmp_path.open("wb") as fh:
+                fh.write(b"\0" * _HEADER.size)
+
+                offsets.append(_pad(fh))
+                for name in self.collections:
+                    raw = name.encode("utf-8")
+                    fh.write(struct.pack("<H", len(raw)) + raw)
+
+                for column in (self._doc_colls, self._doc_pos, self._doc_lens):
+                    offsets.append(_pad(fh))
+                    column.copy_to(fh)
+
+                offsets.append(_pad(fh))
+                self._term_offsets.copy_to(fh)
+
+                offsets.append(_pad(fh))
+                self._terms.seek(0)
+                shutil.copyfileobj(self._terms, fh, 1 << 20)
+
+                for column in (self._dfs, self._max_tfs, self._min_dls, self._post_offsets):
+                    offsets.append(_pad(fh))
+                    column.copy_to(fh)
+
+                offsets.append(_pad(fh))
+                self._postings.seek(0)
+                shutil.copyfileobj(self._postings, fh, 1 << 20)
+
+                fh.seek(0)
+                fh.write(_HEADER.pack(
+                    MAGIC, VERSION, 0,
+                    self._n_docs, self._n_terms, len(self.collections),
+                    self._total_len, *offsets,
+                ))
+                fh.flush()
+                os.fsync(fh.fileno())
+        finally:
+            self._postings.close()
+            self._terms.close()
+            for column in self._columns():
+                column.close()
+        os.replace(tmp_path, self.path)
+
+
+class CompactIndex:
+    """
+    Lector del índice compacto. Mapea el archivo en memoria y sólo decodifica
+    los postings de los términos consultados.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fh = self.path.open("rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _reserved, self.n_docs, self.n_terms, n_colls,
+         self.total_len, *sections) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Índice incompatible: {self.path}")
+
+        (colls_off, doc_colls_off, doc_pos_off, doc_lens_off, term_offsets_off,
+         terms_off, dfs_off, max_tfs_off, min_dls_off, post_offsets_off,
+         postings_off) = sections
+        self._terms_off = terms_off
+        self._postings_off = postings_off
+
+        self.collections: List[str] = []
+        pos = colls_off
+        for _ in range(n_colls):
+            (length,) = struct.unpack_from("<H", self._mm, pos)
+            pos += 2
+            self.collections.append(self._mm[pos:pos + length].decode("utf-8"))
+            pos += length
+
+        self._views: List[memoryview] = []
+        self._doc_colls = self._view(doc_colls_off, self.n_docs, "H")
+        self._doc_pos = self._view(doc_pos_off, self.n_docs, "I")
+        self.doc_lens = self._view(doc_lens_off, self.n_docs, "I")
+        self._term_offsets = self._view(term_offsets_off, self.n_terms + 1, "I")
+        self._dfs = self._view(dfs_off, self.n_terms, "I")
+        self._max_tfs = self._view(max_tfs_off, self.n_terms, "I")
+        self._min_dls = self._view(min_dls_off, self.n_terms, "I")
+        self._post_offsets = self._view(post_offsets_off, self.n_terms + 1, "Q")
+
+    def _view(self, offset: int, count: int, typecode: str):
+        size = count * array(typecode).itemsize
+        if sys.byteorder != "little":
+            values = array(typecode)
+            values.frombytes(self._mm[offset:offset + size])
+            values.byteswap()
+            return values
+        view = memoryview(self._mm)[offset:offset + size].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def _term_at(self, i: int) -> bytes:
+        start = self._terms_off + self._term_offsets[i]
+        return self._mm[start:self._terms_off + self._term_offsets[i + 1]]
+
+    def _find(self, term: str) -> int:
+        raw = term.encode("utf-8")
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term_at(mid) < raw:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_terms and self._term_at(lo) == raw:
+            return lo
+        return -1
+
+    def __contains__(self, term: str) -> bool:
+        return self._find(term) >= 0
+
+    @property
+    def avg_doc_len(self) -> float:
+        return self.total_len / self.n_docs if self.n_docs else 0.0
+
+    def df(self, term: str) -> int:
+        i = self._find(term)
+        return self._dfs[i] if i >= 0 else 0
+
+    def term_stats(self, term: str) -> Tuple[int, int, int]:
+        """(df, tf máximo, longitud mínima de documento) del término."""
+        i = self._find(term)
+        if i < 0:
+            return 0, 0, 0
+        return self._dfs[i], self._max_tfs[i], self._min_dls[i]
+
+    def _postings_range(self, i: int) -> Tuple[int, int]:
+        return (self._postings_off + self._post_offsets[i],
+                self._postings_off + self._post_offsets[i + 1])
+
+    def postings(self, term: str) -> List[Tuple[int, int]]:
+        """Pares (doc_id, tf), ordenados por doc id, del término."""
+        i = self._find(term)
+        if i < 0:
+            return []
+        return self.postings_at(i)
+
+    def postings_at(self, i: int) -> List[Tuple[int, int]]:
+        return decode_postings(self._mm, *self._postings_range(i))
+
+    def iter_terms(self) -> Iterator[Tuple[bytes, int]]:
+        """Términos (en bytes utf-8) en orden del diccionario, con su posición."""
+        for i in range(self.n_terms):
+            yield self._term_at(i), i
+
+    def cursor(self, term: str) -> Optional[PostingCursor]:
+        i = self._find(term)
+        if i < 0:
+            return None
+        return PostingCursor(self._mm, *self._postings_range(i))
+
+    def doc_ref(self, doc_id: int) -> Tuple[str, int]:
+        """(colección, posición) del documento en el .docs de su segmento, donde
+        se guarda el registro con su colección y clave."""
+        return self.collections[self._doc_colls[doc_id]], self._doc_pos[doc_id]
+
+    def close(self) -> None:
+        for view in getattr(self, "_views", []):
+            view.release()
+        self._views = []
+        if not self._mm.closed:
+            self._mm.close()
+        self._fh.close()
+
+    def __enter__(self) -> "CompactIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_index(path: Path) -> Optional[CompactIndex]:
+    """Abre el índice si existe; None si aún no se ha ejecutado la ingesta."""
+    if not path.exists():
+        return None
+    return CompactIndex(path)
@@ -0,0 +1,159 @@
+"""
+Resúmenes (digests) de notificaciones según frecuencia_notificaciones.
+
+- "inmediata": no pasa por aquí, se envía al detectar el evento
+- "diaria" / "semanal": cada notificación se acumula en la cubeta del
+  usuario y la cubeta completa se envía como un solo mensaje cuando vence
+
+Una cubeta vence en la siguiente hora de envío (DIGEST_HOUR_UTC) después
+de abrirse; las semanales, además, el siguiente lunes. A cada usuario se le
+suma un desfase fijo de minutos (derivado de su user_id) para repartir los
+envíos en la hora en lugar de mandarlos todos al mismo segundo.
+
+Almacén compacto (digests.json): por usuario sólo la frecuencia, el
+vencimiento (epoch) y tuplas [event_id, título, distancia, hora] de los
+eventos; el mensaje se arma al vaciar la cubeta. La cubeta se borra sólo
+cuando el envío se confirma (ack), así que un envío fallido se reintenta en
+la siguiente corrida.
+"""
+import json
+import os
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+VERSION = 1
+IMMEDIATE = "inmediata"
+DIGEST_FREQUENCIES = ("diaria", "semanal")
+FREQUENCIES = (IMMEDIATE,) + DIGEST_FREQUENCIES
+# Hora (UTC) de envío de los resúmenes; 14 UTC = 8:00 en el centro de México
+DIGEST_HOUR_UTC = int(os.getenv("DIGEST_HOUR_UTC", "14"))
+# Minutos sobre los que se reparten los envíos de una misma hora
+DIGEST_SPREAD_MINUTES = 60
+# Eventos listados en un mensaje; el resto se resume como "y N más"
+DIGEST_MAX_ITEMS = 20
+
+# event_id, título, distancia (km), hora del evento
+DigestItem = List[Any]
+
+
+def frequency_of(user: Dict[str, Any]) -> str:
+    """Frecuencia del usuario; sin dato o con uno desconocido se envía de inmediato."""
+    frequency = str(user.get("frecuencia_notificaciones") or IMMEDIATE).lower()
+    return frequency if frequency in FREQUENCIES else IMMEDIATE
+
+
+def next_flush(frequency: str, opened_at: datetime, user_id: Any) -> datetime:
+    """Momento (UTC) en que vence una cubeta abierta en `opened_at`."""
+    offset = timedelta(minutes=zlib.crc32(str(user_id).encode("utf-8")) % DIGEST_SPREAD_MINUTES)
+    due = opened_at.replace(hour=DIGEST_HOUR_UTC, minute=0, second=0, microsecond=0) + offset
+    if due <= opened_at:
+        due += timedelta(days=1)
+    if frequency == "semanal":
+        due += timedelta(days=(7 - due.weekday()) % 7)  # lunes
+    return due
+
+
+class DigestStore:
+    """Cubetas por usuario pendientes de enviar."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._buckets: Dict[str, Dict[str, Any]] = {}
+        # event_ids de cada cubeta, para que add() detecte repetidos sin recorrerla
+        self._event_ids: Dict[str, Set[Any]] = {}
+        self._dirty = False
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8")) or {}
+            if data.get("version") == VERSION:
+                self._buckets = data.get("buckets", {})
+        for user_id, bucket in self._buckets.items():
+            self._event_ids[user_id] = {item[0] for item in bucket["items"]}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def pending_items(self) -> int:
+        return sum(len(b["items"]) for b in self._buckets.values())
+
+    def add(self, user: Dict[str, Any], event: Dict[str, Any], now: datetime) -> bool:
+        """Acumula el evento en la cubeta del usuario. False si ya estaba."""
+        user_id = str(user.get("user_id"))
+        frequency = frequency_of(user)
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = {
+                "frequency": frequency,
+                "due_at": next_flush(frequency, now, user_id).timestamp(),
+                "items": [],
+            }
+        event_ids = self._event_ids.setdefault(user_id, set())
+        event_id = event.get("event_id")
+        if event_id in event_ids:
+            return False
+        event_ids.add(event_id)
+        bucket["items"].append([
+            event_id,
+            event.get("title") or event_id,
+            user.get("_distance_km"),
+            event.get("timestamp"),
+        ])
+        self._dirty = True
+        return True
+
+    def due(self, now: datetime) -> List[Tuple[str, str, List[DigestItem]]]:
+        """(user_id, frecuencia, items) de las cubetas vencidas."""
+        ts = now.timestamp()
+        return [
+            (user_id, b["frequency"], list(b["items"]))
+            for user_id, b in self._buckets.items()
+            if b["items"] and b["due_at"] <= ts
+        ]
+
+    def ack(self, user_id: Any, event_ids: Iterable[Any]) -> None:
+        """Quita de la cubeta los eventos ya enviados; si queda vacía, se cierra."""
+        user_id = str(user_id)
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            return
+        sent = set(event_ids)
+        bucket["items"] = [item for item in bucket["items"] if item[0] not in sent]
+        self._event_ids[user_id] -= sent
+        if not bucket["items"]:
+            del self._buckets[user_id]
+            del self._event_ids[user_id]
+        self._dirty = True
+
+    def drop(self, user_id: Any) -> None:
+        self._event_ids.pop(str(user_id), None)
+        if self._buckets.pop(str(user_id), None) is not None:
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as fh:
+            fh.write(json.dumps({"version": VERSION, "buckets": self._buckets},
+                                ensure_ascii=False, separators=(",", ":")))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+def build_digest_message(frequency: str, items: List[DigestItem]) -> str:
+    label = "diario" if frequency == "diaria" else "semanal"
+    lines = [f"Tu resumen {label} de Civic Pulse: {len(items)} evento(s) cerca de ti.", ""]
+    for event_id, title, dist, timestamp in items[:DIGEST_MAX_ITEMS]:
+        lines.append(f"- {title} ({dist} km) {timestamp or ''}".rstrip())
+    if len(items) > DIGEST_MAX_ITEMS:
+        lines.append(f"... y {len(items) - DIGEST_MAX_ITEMS} más.")
+    lines += ["", "Recomendación: consulta fuentes oficiales locales y mantente atento a indicaciones."]
+    return "\n".join(lines)
+
+
+def utcnow(now: Optional[datetime] = None) -> datetime:
+    return now.astimezone(timezone.utc) if now is not None else datetime.now(timezone.utc)
@@ -0,0 +1,259 @@
+"""
+Cursor de detección de eventos para el fan-out de notificaciones.
+
+Guarda en disco una huella (blake2b de 8 bytes) por evento ya procesado,
+indexada por event_id. En cada corrida sólo se devuelven los eventos nuevos
+o cuya huella cambió (p. ej. se movió o cambió de tipo); el resto del
+historial no vuelve a pasar por el matching ni por el envío.
+
+Para no recalcular la huella de todo el historial en cada corrida, el cursor
+guarda además una marca de la fuente (events.json): firma (mtime/tamaño),
+offset en bytes donde termina el último registro procesado, hash de los
+bytes anteriores y número de registros.
+
+- firma igual a la de la marca: no hay nada pendiente y no se calcula
+  ninguna huella
+- el archivo sólo creció (los bytes hasta el offset no cambiaron): sólo se
+  calculan las huellas de los registros posteriores a la marca
+- cualquier otro cambio: comparación completa de huellas, como siempre
+
+Las huellas se persisten como el estado de entregas: snapshot JSON más un
+journal append-only (un registro por cambio) que se compacta cuando crece.
+
+El cursor avanza (advance) después de confirmar las entregas: si la corrida
+se interrumpe o un evento tuvo envíos fallidos, ese evento se vuelve a
+entregar como pendiente en la siguiente corrida, y el estado de entregas
+evita duplicar lo que sí llegó.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+VERSION = 2
+# Registros en el journal a partir de los cuales advance() compacta (o más,
+# si el snapshot tiene más huellas)
+COMPACT_MIN_RECORDS = 10_000
+
+
+def event_key(event: Dict[str, Any], digest: str) -> str:
+    event_id = event.get("event_id")
+    # sin id, la propia huella identifica al evento
+    return f"id:{event_id}" if event_id is not None else f"sum:{digest}"
+
+
+def event_digest(event: Dict[str, Any]) -> str:
+    payload = json.dumps(event, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _file_signature(path: Path) -> Optional[List[int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _records_end(data: bytes) -> int:
+    """Offset donde termina el último registro de un arreglo JSON, o -1 si no es un arreglo."""
+    end = len(data.rstrip())
+    if not end or data[end - 1:end] != b"]":
+        return -1
+    return len(data[:end - 1].rstrip())
+
+
+def _prefix_digest(data: bytes, offset: int) -> str:
+    return hashlib.blake2b(memoryview(data)[:offset], digest_size=16).hexdigest()
+
+
+class EventCursor:
+    """Conjunto persistente de huellas de eventos ya procesados."""
+
+    def __init__(self, path: Path, compact_min_records: int = COMPACT_MIN_RECORDS):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix(".journal")
+        self.compact_min_records = compact_min_records
+        self._checksums: Dict[str, str] = {}
+        # marca de la fuente hasta donde ya se procesó (ver docstring del módulo)
+        self._mark: Optional[Dict[str, Any]] = None
+        self._journal_records = 0
+        # resultado de la última llamada a pending(), a confirmar con advance()
+        self._pending: Dict[str, str] = {}
+        self._pending_mark: Optional[Dict[str, Any]] = None
+        self._seen_keys: Optional[set] = None
+        self._load()
+
+    def _load(self) -> None:
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8")) or {}
+            # la versión 1 sólo tenía huellas: se conservan, sin marca
+            if data.get("version") in (1, VERSION):
+                self._checksums = dict(data.get("checksums", {}))
+                self._mark = data.get("mark")
+        if self.journal_path.exists():
+            with self.journal_path.open("r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # última línea truncada por una caída: ese advance no se confirmó
+                        continue
+                    self._journal_records += 1
+                    self._apply(record)
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        if "mark" in record:
+            self._mark = record["mark"]
+        elif record.get("d") is None:
+            self._checksums.pop(record["k"], None)
+        else:
+            self._checksums[record["k"]] = record["d"]
+
+    def __len__(self) -> int:
+        return len(self._checksums)
+
+    # ------------------------------------------------------------- consulta
+    def pending(
+        self,
+        events: Sequence[Dict[str, Any]],
+        source: Optional[Path] = None,
+        signature: Optional[Tuple[int, int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Eventos nuevos o modificados desde el último advance(), en su orden
+        original. `source` es el archivo del que se leyó `events` y
+        `signature` su (mtime_ns, tamaño) al leerlo; con ellos se usa la marca.
+        """
+        self._pending_mark = None
+        data = None
+        if source is not None and signature is not None:
+            current = _file_signature(Path(source))
+            if current == list(signature):
+                if self._mark is not None and self._mark["signature"] == current \
+                        and self._mark["count"] == len(events):
+                    # la fuente no cambió desde la marca: nada que revisar
+                    self._pending, self._seen_keys = {}, None
+                    self._pending_mark = self._mark
+                    return []
+                data = self._read_source(Path(source), current)
+        if data is not None:
+            self._pending_mark = self._mark_for(data, len(events), current)
+            appended = self._pending_past_mark(events, data)
+            if appended is not None:
+                return appended
+
+        digests: Dict[str, Any] = {}
+        keyed = []
+        for event in events:
+            digest = event_digest(event)
+            key = event_key(event, digest)
+            # varios eventos con el mismo id: la huella combina todos
+            prev = digests.get(key)
+            digests[key] = digest if prev is None else hashlib.blake2b(
+                (prev + digest).encode("ascii"), digest_size=8).hexdigest()
+            keyed.append((key, event))
+        self._pending = {k: d for k, d in digests.items() if self._checksums.get(k) != d}
+        self._seen_keys = set(digests)
+        return [event for key, event in keyed if key in self._pending]
+
+    @staticmethod
+    def _read_source(source: Path, signature: List[int]) -> Optional[bytes]:
+        """Bytes de la fuente, o None si cambió mientras se leía."""
+        try:
+            data = source.read_bytes()
+        except FileNotFoundError:
+            return None
+        return data if _file_signature(source) == signature else None
+
+    @staticmethod
+    def _mark_for(data: bytes, count: int, signature: List[int]) -> Optional[Dict[str, Any]]:
+        offset = _records_end(data)
+        if offset < 0:
+            return None
+        return {"signature": signature, "offset": offset,
+                "prefix": _prefix_digest(data, offset), "count": count}
+
+    def _pending_past_mark(self, events: Sequence[Dict[str, Any]], data: bytes) -> Optional[List[Dict[str, Any]]]:
+        """Registros posteriores a la marca si la fuente sólo creció; None si hace falta la comparación completa."""
+        mark = self._mark
+        if mark is None or mark["count"] > len(events) or mark["offset"] > len(data):
+            return None
+        if _prefix_digest(data, mark["offset"]) != mark["prefix"]:
+            return None
+        if mark["count"] and data[mark["offset"]:].lstrip()[:1] not in (b",", b"]"):
+            # el último registro de la marca continúa (p. ej. un número más largo)
+            return None
+        digests: Dict[str, str] = {}
+        appended = events[mark["count"]:]
+        for event in appended:
+            digest = event_digest(event)
+            key = event_key(event, digest)
+            if key in digests or key in self._checksums:
+                # un id repetido combina huellas de todo el historial
+                return None
+            digests[key] = digest
+        self._pending = digests
+        # no se sabe qué eventos del historial siguen: no se borran huellas
+        self._seen_keys = None
+        return list(appended)
+
+    # ------------------------------------------------------------ escritura
+    def advance(self, retry: Iterable[Dict[str, Any]] = ()) -> None:
+        """
+        Marca como procesados los eventos de la última llamada a pending(),
+        salvo los de `retry`, y agrega los cambios al journal.
+        """
+        skip = {event_key(e, event_digest(e)) for e in retry}
+        changes: List[Dict[str, Any]] = []
+        for key, digest in self._pending.items():
+            if key not in skip and self._checksums.get(key) != digest:
+                self._checksums[key] = digest
+                changes.append({"k": key, "d": digest})
+        if self._seen_keys is not None:
+            # eventos que ya no están en el archivo: su huella no hace falta
+            for key in [k for k in self._checksums if k not in self._seen_keys]:
+                del self._checksums[key]
+                changes.append({"k": key, "d": None})
+        # con reintentos la marca no avanza: la siguiente corrida los vuelve
+        # a encontrar con la comparación completa
+        mark = self._pending_mark if not skip else None
+        if mark != self._mark:
+            self._mark = mark
+            changes.append({"mark": mark})
+        self._pending = {}
+        self._pending_mark = None
+        self._seen_keys = None
+        self._append(changes)
+        if self._journal_records >= max(self.compact_min_records, len(self._checksums)):
+            self.compact()
+
+    def _append(self, changes: List[Dict[str, Any]]) -> None:
+        """Agrega los cambios al journal con un solo write + fsync."""
+        if not changes:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = "".join(json.dumps(c, ensure_ascii=False) + "\n" for c in changes)
+        with self.journal_path.open("a", encoding="utf-8") as fh:
+            fh.write(payload)
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._journal_records += len(changes)
+
+    def compact(self) -> None:
+        """Reescribe el snapshot con todas las huellas y la marca, y vacía el journal."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as fh:
+            fh.write(json.dumps({"version": VERSION, "checksums": self._checksums, "mark": self._mark},
+                                ensure_ascii=False))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.path)
+        # el snapshot ya contiene todo: si hay una caída antes de vaciar el
+        # journal, al cargar sus registros se vuelven a aplicar sin cambiar nada
+        with self.journal_path.open("w", encoding="utf-8") as fh:
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._journal_records = 0
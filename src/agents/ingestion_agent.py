@@ -1,27 +1,58 @@
+import hashlib
 import json
-import re
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from src.agents.analyzer import ANALYZER_VERSION, analyze
+from src.agents.json_stream import iter_json_range, iter_json_records, iter_json_spans
+from src.agents.segments import (
+    SEGMENT_FORMAT,
+    SegmentWriter,
+    iter_document_refs,
+    load_manifest,
+    merge_segments,
+    needs_merge,
+    remove_orphan_segments,
+    save_manifest,
+    segment_name,
+    write_json_atomic,
+)
 
 # Configuración de rutas
 BASE_DIR = Path(__file__).resolve().parents[2]
 DATA_DIR = BASE_DIR / "data"
-INGESTED_PATH = DATA_DIR / "ingested_data.json"
-INDEX_PATH = DATA_DIR / "index.json"
+INDEX_DIR = DATA_DIR / "index"
+STATE_PATH = INDEX_DIR / "ingest_state.json"
+
+# Presupuesto de memoria (MB) para los postings en la ingesta en streaming
+STREAMING_MEMORY_BUDGET_MB = int(os.getenv("INGESTION_MEMORY_BUDGET_MB", "64"))
 
-# Tokens mínimos a ignorar (Stopwords)
-_STOPWORDS = {
-    "de", "la", "el", "y", "a", "en", "los", "las", 
-    "del", "que", "con", "para", "por", "se", "un", "una"
+# Registros por bloque en la construcción paralela
+PARALLEL_SHARD_SIZE = 2000
+
+# Colección -> archivo fuente (se acepta también la variante .jsonl)
+SOURCES = {
+    "events": "events.json",
+    "services": "services.json",
+    "ballots": "ballot_questions.json",
+    "notifications": "notifications.json",
 }
 
-def _load_json_file(filename: str) -> List[Dict[str, Any]]:
-    """Carga un archivo JSON de la carpeta de datos."""
+def _source_path(filename: str) -> Path:
+    """Ruta del archivo fuente: el .json indicado o, si no existe, su variante .jsonl."""
     file_path = DATA_DIR / filename
+    if not file_path.exists() and file_path.with_suffix(".jsonl").exists():
+        return file_path.with_suffix(".jsonl")
+    return file_path
+
+def _load_json_file(filename: str) -> List[Dict[str, Any]]:
+    """Carga un archivo JSON (arreglo o JSON Lines) de la carpeta de datos."""
+    file_path = _source_path(filename)
     if not file_path.exists():
         return []
-    with file_path.open("r", encoding="utf-8") as fh:
-        return json.load(fh)
+    return list(iter_json_records(file_path))
 
 def load_events() -> List[Dict[str, Any]]:
     return _load_json_file("events.json")
@@ -36,19 +67,8 @@ def load_notifications() -> List[Dict[str, Any]]:
     return _load_json_file("notifications.json")
 
 def _tokenize(text: str) -> List[str]:
-    """
-    Tokenizador simple: elimina puntuación, separa por espacios, 
-    convierte a minúsculas y filtra stopwords.
-    """
-    if not text:
-        return []
-    # Eliminar puntuación manteniendo caracteres unicode
-    text = re.sub(r"[^\w\s]", " ", text, flags=re.UNICODE)
-    # Limpiar espacios y minúsculas
-    tokens = [t.strip().lower() for t in text.split() if t.strip()]
-    # Filtrar stopwords y tokens muy cortos
-    tokens = [t for t in tokens if t not in _STOPWORDS and len(t) > 1]
-    return tokens
+    """Términos del documento según el analizador compartido con el RAG."""
+    return analyze(text)
 
 def _normalize_item(item: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -65,62 +85,321 @@ def _normalize_item(item: Dict[str, Any]) -> Dict[str, Any]:
             out[k] = str(v)
     return out
 
-def run_ingestion() -> Dict[str, Any]:
+def _record_hash(item: Dict[str, Any]) -> str:
+    raw = json.dumps(item, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def _record_key(item: Dict[str, Any], pos: int) -> str:
+    return str(item.get("id") or f"#{pos}")
+
+def _keyed_records(items: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Clave estable por registro: su "id" si lo tiene (con sufijo si se repite),
+    o la posición en el archivo como último recurso.
+
+    Para detectar repetidos se guardan todas las claves de la colección, así
+    que la memoria es O(registros de la colección) incluso en streaming.
+    """
+    seen = set()
+    for pos, item in enumerate(items):
+        key = _record_key(item, pos)
+        if key in seen:
+            key = f"{key}#{pos}"
+        seen.add(key)
+        yield key, item
+
+def _load_state() -> Dict[str, Any]:
+    if not STATE_PATH.exists():
+        return {"generation": 0, "analyzer": ANALYZER_VERSION, "sources": {}, "records": {}}
+    return json.loads(STATE_PATH.read_text(encoding="utf-8"))
+
+def _document_text(item: Dict[str, Any]) -> str:
+    # Combinar campos importantes para tokenización
+    return " ".join(str(v) for v in item.values())
+
+def run_ingestion(full: bool = False) -> Dict[str, Any]:
+    """
+    Ejecuta ingesta local incremental:
+    - detecta qué archivos fuente cambiaron (tamaño/mtime y luego sha256)
+    - en esos archivos, compara el hash de cada registro normalizado contra
+      la ingesta anterior
+    - tokeniza sólo los registros nuevos o modificados y los escribe en un
+      segmento nuevo del índice; las versiones viejas y los registros
+      eliminados se marcan como borrados en su segmento
+    - publica el cambio con un manifest nuevo (generación + 1)
+
+    Con full=True, o si el estado no coincide con el manifest, reconstruye
+    el índice completo en un solo segmento.
+    """
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_manifest(INDEX_DIR)
+    state = _load_state()
+    # segmentos descartados por un reinicio: hay que publicar su retirada
+    dropped = False
+    if (full or state.get("generation") != manifest["generation"] or not manifest["segments"]
+            or state.get("analyzer") != ANALYZER_VERSION or manifest.get("format") != SEGMENT_FORMAT):
+        dropped = bool(manifest["segments"])
+        manifest = {**manifest, "segments": []}
+        state = {"generation": manifest["generation"], "analyzer": ANALYZER_VERSION, "sources": {}, "records": {}}
+
+    summary = {"added": 0, "changed": 0, "deleted": 0}
+    segment: Optional[SegmentWriter] = None
+    deletions: Dict[str, List[int]] = {}
+    sources_changed = False
+
+    for collection, filename in SOURCES.items():
+        path = _source_path(filename)
+        prev = state["sources"].get(collection)
+        if path.exists():
+            st = path.stat()
+            signature = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        else:
+            signature = None
+
+        # 1) Detección de cambios por archivo: primero stat, luego contenido
+        if prev and signature and all(prev.get(k) == v for k, v in signature.items()):
+            continue
+        raw = path.read_bytes() if signature else b"[]"
+        digest = hashlib.sha256(raw).hexdigest()
+        sources_changed = True
+        if signature:
+            state["sources"][collection] = {**signature, "sha256": digest}
+        else:
+            state["sources"].pop(collection, None)
+        if prev and prev.get("sha256") == digest:
+            continue
+
+        # 2) Detección de cambios por registro
+        items = iter_json_records(path) if signature else []
+        old_records = state["records"].get(collection, {})
+        new_records: Dict[str, List[Any]] = {}
+        for key, item in _keyed_records(items):
+            record_hash = _record_hash(item)
+            prior = old_records.get(key)
+            if prior and prior[0] == record_hash:
+                new_records[key] = prior
+                continue
+            if prior:
+                deletions.setdefault(prior[1], []).append(prior[2])
+                summary["changed"] += 1
+            else:
+                summary["added"] += 1
+
+            # 3) Sólo se normalizan y tokenizan los registros nuevos o modificados
+            norm = _normalize_item(item)
+            if segment is None:
+                segment = SegmentWriter(INDEX_DIR, segment_name(manifest["next_segment"]), list(SOURCES))
+            doc_id = segment.add(collection, key, norm, _tokenize(_document_text(norm)))
+            new_records[key] = [record_hash, segment.name, doc_id]
+
+        for key, prior in old_records.items():
+            if key not in new_records:
+                deletions.setdefault(prior[1], []).append(prior[2])
+                summary["deleted"] += 1
+        state["records"][collection] = new_records
+
+    # si un reinicio descartó segmentos se publica el manifest aunque quede
+    # vacío: si no, seguirían vivos con un estado que ya los olvidó
+    if segment is None and not deletions and not dropped:
+        if sources_changed:
+            write_json_atomic(STATE_PATH, state)
+        return {"status": "ok", "index_path": str(INDEX_DIR), "generation": manifest["generation"], **summary}
+
+    # 4) Aplicar el cambio como actualización de segmentos
+    if segment is not None:
+        manifest["segments"].append(segment.close())
+        manifest["next_segment"] += 1
+    for seg in manifest["segments"]:
+        if seg["name"] in deletions:
+            seg["deleted"] = sorted(set(seg["deleted"]).union(deletions[seg["name"]]))
+
+    if needs_merge(manifest):
+        manifest = merge_segments(INDEX_DIR, manifest, list(SOURCES))
+        merged = manifest["segments"][0]["name"]
+        for doc_id, (collection, key) in enumerate(iter_document_refs(INDEX_DIR, merged)):
+            record = state["records"][collection][key]
+            record[1], record[2] = merged, doc_id
+
+    # 5) Commit: primero el manifest (lo que leen los agentes), luego el estado
+    manifest["generation"] += 1
+    state["generation"] = manifest["generation"]
+    save_manifest(INDEX_DIR, manifest)
+    write_json_atomic(STATE_PATH, state)
+    remove_orphan_segments(INDEX_DIR, manifest)
+
+    return {"status": "ok", "index_path": str(INDEX_DIR), "generation": manifest["generation"], **summary}
+
+def run_streaming_ingestion(memory_budget_mb: Optional[int] = None) -> Dict[str, Any]:
     """
-    Ejecuta ingesta local:
-    - carga catálogos directamente
-    - normaliza registros
-    - guarda ingested_data.json
-    - construye índice invertido simple y lo guarda en index.json
+    Reconstrucción completa en streaming para catálogos grandes:
+    - lee los registros uno a uno (arreglo JSON o JSON Lines)
+    - normaliza, tokeniza y escribe cada registro al segmento en el momento
+    - los postings se vuelcan a runs ordenados en disco al superar el
+      presupuesto de memoria y se fusionan en el índice final
+    - el estado por registro también se escribe en streaming, así que la
+      siguiente ejecución de run_ingestion() puede ser incremental
+
+    El presupuesto acota los postings, no todo el proceso: además quedan en
+    memoria las claves de la colección en curso (ver _keyed_records) y, al
+    fusionar los runs, la lista de postings del término más frecuente.
     """
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-
-    # 1) Cargar datos
-    events = load_events()
-    services = load_services()
-    ballots = load_ballot_questions()
-    notifications = load_notifications()
-
-    payload = {
-        "events": [_normalize_item(i) for i in events],
-        "services": [_normalize_item(i) for i in services],
-        "ballots": [_normalize_item(i) for i in ballots],
-        "notifications": [_normalize_item(i) for i in notifications],
+    budget_mb = STREAMING_MEMORY_BUDGET_MB if memory_budget_mb is None else memory_budget_mb
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_manifest(INDEX_DIR)
+    name = segment_name(manifest["next_segment"])
+    segment = SegmentWriter(INDEX_DIR, name, list(SOURCES), memory_budget=budget_mb * 1024 * 1024)
+
+    sources: Dict[str, Dict[str, Any]] = {}
+    state_tmp = STATE_PATH.with_name(STATE_PATH.name + ".tmp")
+    with state_tmp.open("w", encoding="utf-8") as state_fh:
+        state_fh.write('{"records":{')
+        for n, (collection, filename) in enumerate(SOURCES.items()):
+            path = _source_path(filename)
+            state_fh.write(("," if n else "") + json.dumps(collection) + ":{")
+            if path.exists():
+                st = path.stat()
+                hasher = hashlib.sha256()
+                first = True
+                for key, item in _keyed_records(iter_json_records(path, hasher)):
+                    norm = _normalize_item(item)
+                    doc_id = segment.add(collection, key, norm, _tokenize(_document_text(norm)))
+                    record = [_record_hash(item), name, doc_id]
+                    state_fh.write(("" if first else ",") + json.dumps(key, ensure_ascii=False)
+                                   + ":" + json.dumps(record))
+                    first = False
+                sources[collection] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                       "sha256": hasher.hexdigest()}
+            state_fh.write("}")
+
+        new_manifest = {
+            "generation": manifest["generation"] + 1,
+            "next_segment": manifest["next_segment"] + 1,
+            "segments": [segment.close()],
+        }
+        state_fh.write('},"sources":' + json.dumps(sources)
+                       + ',"generation":' + str(new_manifest["generation"])
+                       + ',"analyzer":' + str(ANALYZER_VERSION) + "}")
+        state_fh.flush()
+        os.fsync(state_fh.fileno())
+
+    # Commit: manifest primero, luego el estado (igual que run_ingestion)
+    save_manifest(INDEX_DIR, new_manifest)
+    os.replace(state_tmp, STATE_PATH)
+    remove_orphan_segments(INDEX_DIR, new_manifest)
+
+    return {
+        "status": "ok",
+        "index_path": str(INDEX_DIR),
+        "generation": new_manifest["generation"],
+        "documents": len(segment),
     }
 
-    # 2) Persistir ingested_data.json
-    INGESTED_PATH.write_text(
-        json.dumps(payload, ensure_ascii=False, indent=2), 
-        encoding="utf-8"
-    )
-
-    # 3) Construir índice invertido: token -> list of (collection, pos)
-    index: Dict[str, List[Dict[str, Any]]] = {}
-    
-    for collection, items in payload.items():
-        for pos, item in enumerate(items):
-            # Combinar campos importantes para tokenización
-            text_blob = " ".join(str(v) for v in item.values())
-            tokens = _tokenize(text_blob)
-            
-            doc_ref = {"collection": collection, "pos": pos}
-            
-            # Deduplicar tokens por documento para no repetir referencias
+def _index_part(task: Tuple[Path, str, str, Path, int, int, int, Dict[int, str]]
+                ) -> Tuple[Dict[str, Any], List[Tuple[str, str]]]:
+    """
+    Trabajo de un proceso del pool: lee su tramo del archivo fuente, normaliza,
+    tokeniza e indexa esos registros en un segmento parcial propio.
+    Devuelve la entrada del segmento parcial y [(clave, hash)] de sus registros.
+    """
+    index_dir, part_name, collection, path, start, end, base_pos, renamed = task
+    segment = SegmentWriter(index_dir, part_name, list(SOURCES))
+    records: List[Tuple[str, str]] = []
+    for pos, item in enumerate(iter_json_range(path, start, end), start=base_pos):
+        key = renamed.get(pos) or _record_key(item, pos)
+        norm = _normalize_item(item)
+        segment.add(collection, key, norm, _tokenize(_document_text(norm)))
+        records.append((key, _record_hash(item)))
+    return segment.close(), records
+
+def _submit_part(pool: ProcessPoolExecutor, name: str, number: int, collection: str, path: Path,
+                 span: Tuple[int, int, int], renamed: Dict[int, str], base_doc_id: int) -> Tuple[str, int, Any]:
+    """Encola el tramo (inicio, fin, primera posición) como segmento parcial `number`."""
+    start, end, base_pos = span
+    task = (INDEX_DIR, f"{name}-part-{number:04d}", collection, path, start, end, base_pos, renamed)
+    return collection, base_doc_id, pool.submit(_index_part, task)
+
+def run_parallel_ingestion(workers: Optional[int] = None,
+                           shard_size: int = PARALLEL_SHARD_SIZE) -> Dict[str, Any]:
+    """
+    Reconstrucción completa repartida en un pool de procesos:
+    - el proceso principal recorre cada fuente una vez sólo para partirla en
+      tramos de `shard_size` registros (offsets en bytes) y resolver las
+      claves repetidas; no guarda ni envía los registros
+    - cada proceso lee su tramo del archivo, lo normaliza, tokeniza y escribe
+      su propio segmento parcial en disco
+    - el proceso principal sólo fusiona los segmentos parciales en orden de
+      tramo (merge_segments), así que el resultado es byte a byte igual al de
+      run_ingestion(full=True)
+    """
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_manifest(INDEX_DIR)
+    name = segment_name(manifest["next_segment"])
+
+    sources: Dict[str, Dict[str, Any]] = {}
+    parts: List[Tuple[str, int, Any]] = []  # (colección, primer doc id, future)
+    next_doc_id = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 1) Partir las fuentes en tramos; cada tramo se encola en cuanto se cierra
+        for collection, filename in SOURCES.items():
+            path = _source_path(filename)
+            if not path.exists():
+                continue
+            st = path.stat()
+            hasher = hashlib.sha256()
+            # mismas claves que _keyed_records; el tramo sólo recibe las que
+            # llevan sufijo por repetirse, las demás las deriva de la posición
             seen = set()
-            for t in tokens:
-                if t in seen:
-                    continue
-                seen.add(t)
-                index.setdefault(t, []).append(doc_ref)
-
-    # 4) Persistir index.json (Nota: para producción usar base de datos vectorial)
-    INDEX_PATH.write_text(
-        json.dumps(index, ensure_ascii=False, indent=2), 
-        encoding="utf-8"
-    )
+            renamed: Dict[int, str] = {}
+            first_pos = part_start = part_end = None
+            for pos, (start, end, item) in enumerate(iter_json_spans(path, hasher)):
+                key = _record_key(item, pos)
+                if key in seen:
+                    key = renamed[pos] = f"{key}#{pos}"
+                seen.add(key)
+                if first_pos is None:
+                    first_pos, part_start = pos, start
+                part_end = end
+                if pos + 1 - first_pos == shard_size:
+                    parts.append(_submit_part(pool, name, len(parts), collection, path,
+                                              (part_start, part_end, first_pos), renamed, next_doc_id))
+                    next_doc_id += shard_size
+                    first_pos, renamed = None, {}
+            if first_pos is not None:
+                parts.append(_submit_part(pool, name, len(parts), collection, path,
+                                          (part_start, part_end, first_pos), renamed, next_doc_id))
+                next_doc_id += pos + 1 - first_pos
+            sources[collection] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                   "sha256": hasher.hexdigest()}
+
+        # 2) Recoger los segmentos parciales en orden de tramo
+        partials: List[Dict[str, Any]] = []
+        records: Dict[str, Dict[str, List[Any]]] = {c: {} for c in SOURCES}
+        for collection, base_doc_id, future in parts:
+            partial, part_records = future.result()
+            partials.append(partial)
+            collection_records = records[collection]
+            for doc_id, (key, record_hash) in enumerate(part_records, start=base_doc_id):
+                collection_records[key] = [record_hash, name, doc_id]
+
+    # 3) Fusión final: concatena los segmentos parciales (sin borrados)
+    new_manifest = merge_segments(INDEX_DIR, {**manifest, "segments": partials}, list(SOURCES))
+    new_manifest["generation"] = manifest["generation"] + 1
+    state = {"generation": new_manifest["generation"], "analyzer": ANALYZER_VERSION,
+             "sources": sources, "records": records}
+
+    # 4) Commit: manifest primero, luego el estado (igual que run_ingestion);
+    # los segmentos parciales quedan huérfanos y se borran
+    save_manifest(INDEX_DIR, new_manifest)
+    write_json_atomic(STATE_PATH, state)
+    remove_orphan_segments(INDEX_DIR, new_manifest)
 
     return {
-        "status": "ok", 
-        "ingested_path": str(INGESTED_PATH), 
-        "index_path": str(INDEX_PATH)
-    }
\ No newline at end of file
+        "status": "ok",
+        "index_path": str(INDEX_DIR),
+        "generation": new_manifest["generation"],
+        "documents": next_doc_id,
+        "shards": len(parts),
+    }
@@ -0,0 +1,150 @@
+"""
+Lectura en streaming de catálogos JSON.
+
+Acepta tanto un arreglo JSON (`[{...}, {...}]`) como JSON Lines (un objeto
+por línea) y entrega los registros uno a uno, leyendo el archivo por
+bloques; nunca se carga el archivo completo en memoria.
+
+iter_json_spans además da el tramo de bytes de cada registro, para que otro
+proceso pueda leer sólo una parte del archivo con iter_json_range.
+"""
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n\ufeff"
+
+
+class _ChunkReader:
+    """Buffer de texto sobre un archivo binario que se rellena por bloques."""
+
+    def __init__(self, fh, hasher: Optional[Any], chunk_size: int):
+        self._fh = fh
+        self._hasher = hasher
+        self._chunk_size = chunk_size
+        self._pending = b""
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        # posición de buf ya medida en bytes del archivo, y su offset
+        self._mark = 0
+        self._mark_bytes = 0
+
+    def fill(self) -> bool:
+        """Agrega el siguiente bloque al buffer; False al llegar al final."""
+        raw = self._fh.read(self._chunk_size)
+        if not raw:
+            self.eof = True
+            if self._pending:
+                raise ValueError("utf-8 truncado al final del archivo")
+            return False
+        if self._hasher is not None:
+            self._hasher.update(raw)
+        data = self._pending + raw
+        try:
+            text = data.decode("utf-8")
+            self._pending = b""
+        except UnicodeDecodeError as exc:
+            # el bloque cortó un carácter multibyte: se completa en la siguiente lectura
+            if exc.start < len(data) - 3:
+                raise
+            text = data[:exc.start].decode("utf-8")
+            self._pending = data[exc.start:]
+        # descartar lo ya consumido para que el buffer no crezca
+        self._mark_bytes = self.byte_offset(self.pos)
+        self._mark = 0
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        return True
+
+    def byte_offset(self, pos: int) -> int:
+        """
+        Offset en el archivo del carácter buf[pos]. Las posiciones consultadas
+        no retroceden, así que cada carácter se re-codifica una sola vez.
+        """
+        self._mark_bytes += len(self.buf[self._mark:pos].encode("utf-8"))
+        self._mark = pos
+        return self._mark_bytes
+
+    def skip(self, chars: str) -> bool:
+        """Salta caracteres de `chars`; False si se acabó el archivo."""
+        while True:
+            buf, pos = self.buf, self.pos
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                return True
+            if self.eof or not self.fill():
+                return False
+
+
+def iter_json_records(path: Path, hasher: Optional[Any] = None,
+                      chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Itera los registros de un arreglo JSON o de un archivo JSON Lines.
+    Si se pasa `hasher` (p. ej. hashlib.sha256()), se actualiza con los bytes
+    leídos para obtener la huella del archivo sin una segunda pasada.
+    """
+    for _start, _end, record in iter_json_spans(path, hasher, chunk_size):
+        yield record
+
+
+def iter_json_spans(path: Path, hasher: Optional[Any] = None,
+                    chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """Como iter_json_records, con el tramo [inicio, fin) en bytes de cada registro."""
+    with Path(path).open("rb") as fh:
+        reader = _ChunkReader(fh, hasher, chunk_size)
+        if not reader.skip(_WHITESPACE):
+            return
+        # Formato según el primer carácter significativo
+        in_array = reader.buf[reader.pos] == "["
+        separators = _WHITESPACE
+        if in_array:
+            reader.pos += 1
+            separators += ","
+
+        while True:
+            if not reader.skip(separators):
+                if in_array:
+                    raise ValueError(f"{path}: arreglo JSON sin cerrar")
+                return
+            if in_array and reader.buf[reader.pos] == "]":
+                return
+            try:
+                record, end = _decoder.raw_decode(reader.buf, reader.pos)
+            except json.JSONDecodeError:
+                # registro incompleto en el buffer: leer más
+                if reader.eof or not reader.fill():
+                    raise
+                continue
+            if not isinstance(record, dict):
+                raise ValueError(f"{path}: se esperaba un objeto JSON por registro")
+            start = reader.byte_offset(reader.pos)
+            reader.pos = end
+            yield start, reader.byte_offset(end), record
+
+
+def iter_json_range(path: Path, start: int, end: int) -> Iterator[Dict[str, Any]]:
+    """
+    Registros del tramo [start, end) en bytes, que debe empezar al inicio de un
+    registro y terminar al final de otro (ver iter_json_spans); las comas y
+    espacios entre registros se ignoran. Lee el tramo completo de una vez.
+    """
+    with Path(path).open("rb") as fh:
+        fh.seek(start)
+        text = fh.read(end - start).decode("utf-8")
+    separators = _WHITESPACE + ","
+    pos = 0
+    while True:
+        while pos < len(text) and text[pos] in separators:
+            pos += 1
+        if pos >= len(text):
+            return
+        record, pos = _decoder.raw_decode(text, pos)
+        if not isinstance(record, dict):
+            raise ValueError(f"{path}: se esperaba un objeto JSON por registro")
+        yield record
@@ -0,0 +1,152 @@
+"""
+Índices invertidos para las consultas de notificaciones por perfil.
+
+- TemplateIndex: plantillas (notifications.json) por municipio, tema y
+  frecuencia. filter_notifications pasa de recorrer todas las plantillas a
+  intersecar listas de ids pequeñas. Se construye una vez y se actualiza
+  por plantilla (add / remove / sync).
+- EventTopicIndex: eventos por tipo, para get_relevant_notifications.
+
+Ambos devuelven los resultados en el orden de la lista original, igual que
+el recorrido lineal al que sustituyen.
+"""
+import heapq
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# frecuencia_deseada que acepta cualquier plantilla
+ANY_FREQUENCY = "todas"
+
+
+class TemplateIndex:
+    """(municipio, tema, frecuencia) -> ids de plantilla."""
+
+    def __init__(self, registros: Iterable[Dict[str, Any]] = ()):
+        self._records: Dict[Any, Dict[str, Any]] = {}
+        # orden de inserción: las consultas devuelven en este orden
+        self._seq: Dict[Any, int] = {}
+        self._next_seq = 0
+        self._by_municipio: Dict[str, Set[Any]] = {}
+        self._by_tema: Dict[str, Set[Any]] = {}
+        self._by_frecuencia: Dict[Any, Set[Any]] = {}
+        for _pos, template_id, registro in self._keyed(registros):
+            self._insert(template_id, registro)
+
+    @staticmethod
+    def _key(registro: Dict[str, Any], fallback: int) -> Any:
+        template_id = registro.get("id")
+        return template_id if template_id is not None else ("#", fallback)
+
+    @classmethod
+    def _keyed(cls, registros: Iterable[Dict[str, Any]]):
+        """
+        (posición, clave, plantilla) de una lista completa. Un id repetido se
+        distingue por su número de aparición, así se indexan todas las
+        plantillas, como en el recorrido lineal.
+        """
+        seen: Dict[Any, int] = {}
+        for pos, registro in enumerate(registros):
+            template_id = cls._key(registro, pos)
+            n = seen.get(template_id, 0)
+            seen[template_id] = n + 1
+            yield pos, (template_id if n == 0 else ("#dup", template_id, n)), registro
+
+    @staticmethod
+    def _postings(registro: Dict[str, Any]):
+        return (
+            {m.lower() for m in registro.get("municipios", [])},
+            {t.lower() for t in registro.get("temas", [])},
+            registro.get("frecuencia"),
+        )
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, registro: Dict[str, Any], position: Optional[int] = None) -> Any:
+        """
+        Agrega (o reemplaza, si el id ya existe) una plantilla; devuelve su id.
+        Las plantillas sin id se identifican por su posición en la lista.
+        """
+        template_id = self._key(registro, self._next_seq if position is None else position)
+        if template_id in self._records:
+            self.remove(template_id)
+        self._insert(template_id, registro)
+        return template_id
+
+    def _insert(self, template_id: Any, registro: Dict[str, Any]) -> None:
+        self._records[template_id] = registro
+        self._seq[template_id] = self._next_seq
+        self._next_seq += 1
+        municipios, temas, frecuencia = self._postings(registro)
+        for m in municipios:
+            self._by_municipio.setdefault(m, set()).add(template_id)
+        for t in temas:
+            self._by_tema.setdefault(t, set()).add(template_id)
+        self._by_frecuencia.setdefault(frecuencia, set()).add(template_id)
+
+    def remove(self, template_id: Any) -> None:
+        registro = self._records.pop(template_id, None)
+        if registro is None:
+            return
+        del self._seq[template_id]
+        municipios, temas, frecuencia = self._postings(registro)
+        for index, keys in ((self._by_municipio, municipios), (self._by_tema, temas),
+                            (self._by_frecuencia, (frecuencia,))):
+            for key in keys:
+                ids = index.get(key)
+                if ids is not None:
+                    ids.discard(template_id)
+                    if not ids:
+                        del index[key]
+
+    def sync(self, registros: List[Dict[str, Any]]) -> None:
+        """Actualiza sólo las plantillas nuevas, cambiadas o eliminadas."""
+        seen = set()
+        for pos, template_id, registro in self._keyed(registros):
+            seen.add(template_id)
+            if self._records.get(template_id) != registro:
+                self.remove(template_id)
+                self._insert(template_id, registro)
+            self._seq[template_id] = pos
+        for template_id in [t for t in self._records if t not in seen]:
+            self.remove(template_id)
+        self._next_seq = len(registros)
+
+    def lookup(self, municipio: str, intereses: Iterable[str], frecuencia_deseada: str) -> List[Dict[str, Any]]:
+        """Plantillas del municipio con algún tema de `intereses` y la frecuencia pedida."""
+        candidates = self._by_municipio.get(municipio.lower())
+        if not candidates:
+            return []
+        by_tema: Set[Any] = set()
+        for interes in {i.lower() for i in intereses}:
+            by_tema |= self._by_tema.get(interes, set())
+        ids = candidates & by_tema
+        if frecuencia_deseada != ANY_FREQUENCY:
+            ids &= self._by_frecuencia.get(frecuencia_deseada, set())
+        return [self._records[t] for t in sorted(ids, key=self._seq.__getitem__)]
+
+
+class EventTopicIndex:
+    """Posiciones de eventos por tipo; los eventos sin tipo aplican a cualquiera."""
+
+    def __init__(self, events: List[Dict[str, Any]]):
+        self.events = events
+        self._by_type: Dict[Any, List[int]] = {}
+        self._untyped: List[int] = []
+        for pos, event in enumerate(events):
+            if event.get("type"):
+                self._by_type.setdefault(event["type"], []).append(pos)
+            else:
+                self._untyped.append(pos)
+
+    def positions(self, interests: Iterable[Any]) -> Iterable[int]:
+        """Posiciones, en orden, de los eventos compatibles con los intereses."""
+        interests = set(interests)
+        if not interests:
+            # sin intereses definidos aplica todo
+            return range(len(self.events))
+        lists = [self._by_type[i] for i in interests if i in self._by_type]
+        return heapq.merge(self._untyped, *lists)
+
+    def relevant(self, interests: Iterable[Any], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return [self.events[pos] for pos in islice(self.positions(interests), limit)]
@@ -1,79 +1,205 @@
 # src/agents/notification_agent.py
+import asyncio
+import contextlib
+import itertools
 import json
 import os
-from pathlib import Path
-from typing import Dict, Any, List, Optional
-from math import radians, sin, cos, asin, sqrt
+import time
 from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Union
+
+from src.agents.delivery_state import DeliveryStateStore
+from src.agents.digest_scheduler import IMMEDIATE, DigestStore, build_digest_message, frequency_of, utcnow
+from src.agents.event_cursor import EventCursor
+from src.agents.dispatch import Channel, Delivery, DispatchPipeline, single_sender
+# haversine_km vive en geo_index; se reexporta aquí por compatibilidad
+from src.agents.geo_index import (
+    DEFAULT_RADIUS_KM,
+    EventSpatialIndex,
+    UserSpatialIndex,
+    event_distance,
+    haversine_km,
+    record_coordinates,
+)
+from src.agents.matching_engine import MatchingEngine
+from src.agents.notification_index import EventTopicIndex, TemplateIndex
 
 ROOT = Path(__file__).resolve().parents[2]
 DATA_DIR = ROOT / "data"
 USERS_PATH = DATA_DIR / "profiles.json"
 EVENTS_PATH = DATA_DIR / "events.json"
+TEMPLATES_PATH = DATA_DIR / "notifications.json"
 STATE_PATH = DATA_DIR / "notifications_state.json"
+CURSOR_PATH = DATA_DIR / "notifications_cursor.json"
+DIGESTS_PATH = DATA_DIR / "notifications_digests.json"
 
 # Optional: Azure Communication Services (ACS) placeholders
 ACS_CONNECTION_STRING = os.getenv("AZURE_COMMUNICATION_CONNECTION_STRING")
 ACS_ENABLED = bool(ACS_CONNECTION_STRING)
+# Envíos simultáneos y tamaño de lote por canal ACS (correo / SMS)
+ACS_CONCURRENCY = int(os.getenv("ACS_CONCURRENCY", "4"))
+ACS_BATCH_SIZE = int(os.getenv("ACS_BATCH_SIZE", "50"))
+# Entregas en cola por canal antes de frenar la detección (backpressure)
+DISPATCH_QUEUE_SIZE = int(os.getenv("DISPATCH_QUEUE_SIZE", "1000"))
+DISPATCH_MAX_ATTEMPTS = int(os.getenv("DISPATCH_MAX_ATTEMPTS", "3"))
+CONSOLE_BATCH_SIZE = 100
+# Intervalo mínimo entre revisiones de los JSON en las consultas por usuario
+QUERY_REFRESH_INTERVAL_S = float(os.getenv("NOTIFY_REFRESH_INTERVAL_S", "5"))
 
 def _load_json(p: Path) -> Any:
     if not p.exists():
         return None
     return json.loads(p.read_text(encoding="utf-8"))
 
-def _save_json(p: Path, data: Any) -> None:
-    p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-
-def haversine_km(lat1, lon1, lat2, lon2) -> float:
-    # radius earth km
-    R = 6371.0
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    return R * c
+def _file_signature(p: Path):
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
 
 class NotificationAgent:
     def __init__(self):
-        self.users = _load_json(USERS_PATH) or []
-        self.events = _load_json(EVENTS_PATH) or []
-        self.state = _load_json(STATE_PATH) or {"notified": []}
+        self._signatures: Dict[Path, Any] = {}
+        self.users = self._reload(USERS_PATH, [])
+        self.events = self._reload(EVENTS_PATH, [])
+        # plantillas de notificación indexadas por municipio/tema/frecuencia
+        self.templates = self._reload(TEMPLATES_PATH, [])
+        self.template_index = TemplateIndex(self.templates)
+        self._event_index: Optional[EventTopicIndex] = None
+        self._event_geo_index: Optional[EventSpatialIndex] = None
+        self._users_by_key: Optional[Dict[str, Dict[str, Any]]] = None
+        self._users_by_key_source: Optional[List[Dict[str, Any]]] = None
+        self._last_refresh = time.monotonic()
+        # entregas ya hechas: conjunto en memoria + journal en disco
+        self.delivery = DeliveryStateStore(STATE_PATH)
+        # huellas de los eventos ya procesados por run_detection_and_notify
+        self.cursor = EventCursor(CURSOR_PATH)
+        # cubetas de resumen diario/semanal pendientes de enviar
+        self.digests = DigestStore(DIGESTS_PATH)
+        self._user_index: Optional[UserSpatialIndex] = None
+        self._indexed_users: Optional[List[Dict[str, Any]]] = None
+        self._engine: Optional[MatchingEngine] = None
+
+    def _reload(self, path: Path, current: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Relee el archivo sólo si cambió (mtime/tamaño); si no, conserva la lista actual."""
+        signature = _file_signature(path)
+        if signature is not None and signature == self._signatures.get(path):
+            return current
+        self._signatures[path] = signature
+        return _load_json(path) or []
 
     def refresh(self):
-        self.users = _load_json(USERS_PATH) or []
-        self.events = _load_json(EVENTS_PATH) or []
-        self.state = _load_json(STATE_PATH) or {"notified": []}
+        self.users = self._reload(USERS_PATH, self.users)
+        self.events = self._reload(EVENTS_PATH, self.events)
+        templates = self._reload(TEMPLATES_PATH, self.templates)
+        if templates is not self.templates:
+            # sólo se reindexan las plantillas que cambiaron
+            self.template_index.sync(templates)
+            self.templates = templates
+        self.delivery.refresh()
+        self._last_refresh = time.monotonic()
+
+    def _maybe_refresh(self) -> None:
+        if time.monotonic() - self._last_refresh >= QUERY_REFRESH_INTERVAL_S:
+            self.refresh()
+
+    @property
+    def state(self) -> Dict[str, Any]:
+        return {"notified": self.delivery.records}
 
     def _already_notified(self, event_id: str, user_id: str) -> bool:
-        for rec in self.state.get("notified", []):
-            if rec.get("event_id") == event_id and rec.get("user_id") == user_id:
-                return True
-        return False
+        return (event_id, user_id) in self.delivery
 
     def _mark_notified(self, event_id: str, user_id: str) -> None:
-        self.state.setdefault("notified", []).append({
-            "event_id": event_id,
-            "user_id": user_id,
-            "notified_at": datetime.utcnow().isoformat() + "Z"
-        })
-        _save_json(STATE_PATH, self.state)
+        # se persiste en bloque con delivery.commit() al final de la corrida
+        self.delivery.mark(event_id, user_id)
+
+    def _on_delivered(self, delivery: Delivery) -> None:
+        if delivery.event_ids:
+            # un resumen cubre varios eventos: se marcan todos y se vacía la cubeta
+            for event_id in delivery.event_ids:
+                self._mark_notified(event_id, delivery.user_id)
+            self.digests.ack(delivery.user_id, delivery.event_ids)
+        else:
+            self._mark_notified(delivery.event_id, delivery.user_id)
+
+    def _events_by_topic(self) -> EventTopicIndex:
+        """Índice por tipo de self.events; se reconstruye si la lista cambió."""
+        if self._event_index is None or self._event_index.events is not self.events:
+            self._event_index = EventTopicIndex(self.events)
+        return self._event_index
+
+    def _events_by_location(self) -> EventSpatialIndex:
+        """Índice espacial de self.events; se reconstruye si la lista cambió."""
+        if self._event_geo_index is None or self._event_geo_index.events is not self.events:
+            self._event_geo_index = EventSpatialIndex(self.events)
+        return self._event_geo_index
+
+    def _find_user(self, user_profile: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Registro de profiles.json del perfil, por user_id o correo."""
+        if self._users_by_key is None or self._users_by_key_source is not self.users:
+            by_key: Dict[str, Dict[str, Any]] = {}
+            for user in self.users:
+                if user.get("user_id") is not None:
+                    by_key.setdefault(f"id:{user['user_id']}", user)
+                for field in ("correo", "email"):
+                    if user.get(field):
+                        by_key.setdefault(f"mail:{str(user[field]).lower()}", user)
+            self._users_by_key, self._users_by_key_source = by_key, self.users
+        keys = []
+        if user_profile.get("user_id") is not None:
+            keys.append(f"id:{user_profile['user_id']}")
+        for field in ("correo", "email"):
+            if user_profile.get(field):
+                keys.append(f"mail:{str(user_profile[field]).lower()}")
+        return next((self._users_by_key[k] for k in keys if k in self._users_by_key), None)
+
+    def _profile_location(self, user_profile: Dict[str, Any]):
+        """
+        (lat, lon, radio) del perfil o de su registro guardado (lat/lon o
+        latitude/longitude); None si no hay coordenadas.
+        """
+        for source in (user_profile, self._find_user(user_profile)):
+            coords = record_coordinates(source) if source else None
+            if coords is not None:
+                try:
+                    return (*coords, float(source.get("radius_km", DEFAULT_RADIUS_KM)))
+                except (TypeError, ValueError):
+                    continue
+        return None
+
+    def _spatial_index(self) -> UserSpatialIndex:
+        """Índice espacial de self.users; se reconstruye si la lista cambió."""
+        if self._user_index is None or self._indexed_users is not self.users:
+            self._user_index = UserSpatialIndex(self.users)
+            self._indexed_users = self.users
+        return self._user_index
+
+    def _matching_engine(self) -> MatchingEngine:
+        """Motor vectorizado sobre self.users; se reconstruye si la lista cambió."""
+        if self._engine is None or self._engine.users is not self.users:
+            self._engine = MatchingEngine(self.users)
+        return self._engine
 
     def filter_relevant_users(self, event: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Devuelve lista de usuarios a notificar según ubicación e intereses."""
+        """
+        Devuelve lista de usuarios a notificar según ubicación e intereses.
+        El índice espacial sólo acota los candidatos a los de celdas cercanas;
+        el radio se sigue evaluando con haversine_km para cada candidato.
+        """
         out = []
-        for user in self.users:
-            # match interest
-            interests = set(user.get("intereses", []))
-            if event.get("type") and event["type"] not in interests:
-                # permite si intereses vacíos o match explícito
-                if interests:
-                    continue
-            # distance check
-            lat_u = float(user.get("lat") or 0)
-            lon_u = float(user.get("lon") or 0)
-            dist = haversine_km(lat_u, lon_u, float(event.get("lat")), float(event.get("lon")))
-            radius = float(user.get("radius_km", 20))
-            if dist <= radius:
+        try:
+            lat_e, lon_e = float(event.get("lat")), float(event.get("lon"))
+            candidates = self._spatial_index().candidates(lat_e, lon_e)
+        except (TypeError, ValueError):
+            # evento sin coordenadas válidas: recorrido completo, como antes
+            candidates = range(len(self.users))
+        for idx in candidates:
+            user = self.users[idx]
+            dist = event_distance(user, event)
+            if dist is not None:
                 out.append({**user, "_distance_km": round(dist, 2)})
         return out
 
@@ -108,59 +234,97 @@ class NotificationAgent:
         print(f"[ACS STUB] enviando a {user.get('correo')}: {message}")
         return True
 
-    def send_notification(self, message: str, user: Dict[str, Any]) -> bool:
+    def send_acs_batch(self, deliveries: List[Delivery]) -> List[bool]:
+        """
+        Envío de un lote de entregas del mismo canal por ACS. Devuelve un bool
+        por entrega; cada una pasa por send_acs, el único punto de integración
+        con el SDK.
+        """
+        return [self.send_acs(d.message, d.user) for d in deliveries]
+
+    @staticmethod
+    def channel_for(user: Dict[str, Any]) -> str:
+        """Canal de envío según la preferencia del usuario (consola si ACS no está configurado)."""
         channel = user.get("preferred_channel", "console")
-        if channel == "console":
+        if ACS_ENABLED:
+            if channel in ("acs", "email"):
+                return "email"
+            if channel == "sms":
+                return "sms"
+        return "console"
+
+    def send_notification(self, message: str, user: Dict[str, Any]) -> bool:
+        if self.channel_for(user) == "console":
             return self.send_console(message, user)
-        if channel == "acs" and ACS_ENABLED:
-            return self.send_acs(message, user)
-        # fallback
-        return self.send_console(message, user)
+        return self.send_acs(message, user)
+
+    def dispatch_channels(self) -> List[Channel]:
+        """Canales del pipeline: consola en serie, ACS con concurrencia y lotes."""
+        return [
+            # consola: en serie, pero varios envíos por salto a hilo
+            Channel("console", single_sender(self.send_console), batch_size=CONSOLE_BATCH_SIZE),
+            Channel("email", self.send_acs_batch, concurrency=ACS_CONCURRENCY, batch_size=ACS_BATCH_SIZE),
+            Channel("sms", self.send_acs_batch, concurrency=ACS_CONCURRENCY, batch_size=ACS_BATCH_SIZE),
+        ]
 
     def get_relevant_notifications(self, user_profile: Dict[str, Any]) -> str:
         """
         Devuelve un resumen de notificaciones relevantes para el usuario basado en su perfil.
+        Con coordenadas (del perfil o de su registro en profiles.json) se
+        listan los eventos dentro de su radio, del más cercano al más lejano,
+        y después los eventos sin coordenadas, en el orden del archivo; sin
+        coordenadas del perfil, los primeros que coinciden en intereses.
         """
-        self.refresh()
-        relevant_events = []
-        
-        # Usamos lógica similar a filter_relevant_users pero centrada en el usuario actual
+        # estructuras en memoria; los archivos se revisan como mucho cada
+        # QUERY_REFRESH_INTERVAL_S, no en cada turno del chat
+        self._maybe_refresh()
         user_interests = set(user_profile.get("intereses", []))
-        user_lat = 0.0 # En un caso real, vendría del perfil o geolocalización actual
-        user_lon = 0.0
-        
-        # Intentar buscar coordenadas del usuario en la base de usuarios si existe match por correo/id
-        # Por simplicidad del MVP, asumimos que el perfil pasado ya tiene lo necesario o usamos defaults
-        
-        for event in self.events:
-            # Filtro por interés
-            if event.get("type") and event["type"] not in user_interests:
-                if user_interests: # Si el usuario tiene intereses definidos y no coinciden
+
+        relevant_events = []
+        location = self._profile_location(user_profile)
+        if location is not None:
+            lat, lon, radius = location
+            index = self._events_by_location()
+            unlocated = ((None, pos) for pos in index.unlocated)
+            for dist, pos in itertools.chain(index.nearby(lat, lon, radius), unlocated):
+                event = index.events[pos]
+                # mismo filtro por interés que filter_relevant_users
+                if event.get("type") and event["type"] not in user_interests and user_interests:
                     continue
-            
-            # Filtro por distancia (opcional, si tuviéramos coords en el perfil de sesión)
-            # Por ahora devolvemos todo lo que coincida en intereses
-            relevant_events.append(event)
-            
+                relevant_events.append((event, dist))
+                if len(relevant_events) == 3:  # Top 3
+                    break
+        else:
+            relevant_events = [(ev, None) for ev in self._events_by_topic().relevant(user_interests, limit=3)]
+
         if not relevant_events:
             return "No tienes notificaciones nuevas en este momento."
             
         # Construir respuesta
         lines = ["Aquí tienes tus notificaciones recientes:"]
-        for ev in relevant_events[:3]: # Top 3
+        for ev, dist in relevant_events:
             title = ev.get("title") or ev.get("event_id")
-            lines.append(f"- {title} ({ev.get('timestamp', '')})")
+            if dist is None:
+                lines.append(f"- {title} ({ev.get('timestamp', '')})")
+            else:
+                lines.append(f"- {title} (a {dist:.1f} km, {ev.get('timestamp', '')})")
             
         return "\n".join(lines)
 
     @staticmethod
     def filter_notifications(
-        registros: List[Dict[str, Any]],
+        registros: Union[List[Dict[str, Any]], TemplateIndex],
         municipio: str,
         intereses: List[str],
         frecuencia_deseada: str,
     ) -> List[Dict[str, Any]]:
-        """Filtra plantillas por municipio/intereses y frecuencia preferida."""
+        """
+        Filtra plantillas por municipio/intereses y frecuencia preferida.
+        Con un TemplateIndex la consulta es una intersección de listas de ids;
+        con una lista se recorre completa.
+        """
+        if isinstance(registros, TemplateIndex):
+            return registros.lookup(municipio, intereses, frecuencia_deseada)
         municipio = municipio.lower()
         intereses = [i.lower() for i in intereses]
         resultados = []
@@ -174,24 +338,107 @@ class NotificationAgent:
                 resultados.append(registro)
         return resultados
 
-    def run_detection_and_notify(self) -> Dict[str, Any]:
+    def notifications_for_profile(
+        self, municipio: str, intereses: List[str], frecuencia_deseada: str
+    ) -> List[Dict[str, Any]]:
+        """Plantillas de notifications.json aplicables a un perfil (vía el índice)."""
+        return self.filter_notifications(self.template_index, municipio, intereses, frecuencia_deseada)
+
+    async def _flush_digests(self, submit: Callable[[Delivery], Awaitable[None]], now: datetime) -> None:
+        """Encola un mensaje por cada cubeta de resumen vencida."""
+        due = self.digests.due(now)
+        if not due:
+            return
+        users_by_id = {str(u.get("user_id")): u for u in self.users}
+        for user_id, frequency, items in due:
+            user = users_by_id.get(user_id)
+            if user is None:
+                # el usuario ya no existe: su resumen no tiene a quién llegar
+                self.digests.drop(user_id)
+                continue
+            message = build_digest_message(frequency, items)
+            await submit(Delivery(
+                None, user, message, self.channel_for(user),
+                event_ids=tuple(item[0] for item in items),
+            ))
+
+    async def run_detection_and_notify_async(
+        self, now: Optional[datetime] = None, publisher: Any = None
+    ) -> Dict[str, Any]:
         """
         Detecta eventos nuevos y notifica a usuarios relevantes.
         - recarga datos
-        - por cada evento, encuentra usuarios, filtra ya notificados y envía
-        - marca en state para no duplicar
+        - toma sólo los eventos nuevos o modificados desde la última corrida
+          (cursor de huellas), no todo el historial
+        - por cada evento, encuentra usuarios, filtra ya notificados y encola
+          el envío en el pipeline (cada canal con su concurrencia y lotes)
+        - marca en state lo entregado para no duplicar (un solo commit al
+          journal por corrida); lo que agota los reintentos queda en "failed"
+          y su evento se reintenta en la siguiente corrida
+        - usuarios con frecuencia diaria/semanal: el evento se acumula en su
+          cubeta y las cubetas vencidas se envían como un solo mensaje
+        - con `publisher` (NotificationPublisher de la API), cada entrega se
+          publica como evento y llega al pipeline por su suscripción, así
+          otros suscriptores del tema también la ven
         """
+        now = utcnow(now)
         self.refresh()
-        results = {"notified": []}
-        for event in self.events:
-            event_id = event.get("event_id")
-            relevant_users = self.filter_relevant_users(event)
-            for user in relevant_users:
-                if self._already_notified(event_id, user.get("user_id")):
-                    continue
-                message = self.build_message(event, user)
-                ok = self.send_notification(message, user)
-                if ok:
-                    self._mark_notified(event_id, user.get("user_id"))
-                    results["notified"].append({"event_id": event_id, "user_id": user.get("user_id")})
-        return results
+        events = self.cursor.pending(self.events, EVENTS_PATH, self._signatures.get(EVENTS_PATH))
+        # los eventos pendientes contra todos los usuarios en pasadas vectorizadas
+        matches = self._matching_engine().match(events)
+        pipeline = DispatchPipeline(
+            self.dispatch_channels(),
+            queue_size=DISPATCH_QUEUE_SIZE,
+            max_attempts=DISPATCH_MAX_ATTEMPTS,
+            on_delivered=self._on_delivered,
+        )
+        queued = set()
+        digested = 0
+        try:
+            async with pipeline, self._submitter(pipeline, publisher) as submit:
+                for event, relevant_users in zip(events, matches):
+                    event_id = event.get("event_id")
+                    for user in relevant_users:
+                        key = (event_id, user.get("user_id"))
+                        if key in queued or self._already_notified(*key):
+                            continue
+                        queued.add(key)
+                        if frequency_of(user) != IMMEDIATE:
+                            digested += self.digests.add(user, event, now)
+                            continue
+                        message = self.build_message(event, user)
+                        await submit(Delivery(event_id, user, message, self.channel_for(user)))
+                await self._flush_digests(submit, now)
+        finally:
+            # también si la corrida se interrumpe: lo ya entregado no se repite
+            self.delivery.commit()
+            self.digests.save()
+        # mismo orden en que se detectaron, aunque los canales terminen en otro
+        delivered = sorted(pipeline.result.delivered, key=lambda d: d.seq)
+        failed = sorted(pipeline.result.failed, key=lambda d: d.seq)
+        # un resumen fallido sigue en su cubeta; un envío inmediato, en el cursor
+        failed_events = {d.event_id for d in failed if not d.event_ids}
+        self.cursor.advance(retry=[e for e in events if e.get("event_id") in failed_events])
+        return {
+            "notified": [{"event_id": d.event_id, "user_id": d.user_id} for d in delivered if not d.event_ids],
+            "digests": [
+                {"user_id": d.user_id, "event_ids": list(d.event_ids)} for d in delivered if d.event_ids
+            ],
+            "queued_for_digest": digested,
+            "failed": [
+                {"event_id": d.event_id, "user_id": d.user_id, "error": d.error,
+                 **({"event_ids": list(d.event_ids)} if d.event_ids else {})}
+                for d in failed
+            ],
+        }
+
+    @staticmethod
+    def _submitter(pipeline: DispatchPipeline, publisher: Any):
+        """Contexto que da la función de encolado: directa o a través del publicador."""
+        if publisher is None:
+            return contextlib.nullcontext(pipeline.submit)
+        return publisher.dispatch_into(pipeline)
+
+    def run_detection_and_notify(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Versión síncrona; desde código async usar run_detection_and_notify_async."""
+        return asyncio.run(self.run_detection_and_notify_async(now))
@@ -0,0 +1,72 @@
+"""
+Caché LRU con TTL para respuestas del RAG.
+
+Las entradas pertenecen a un snapshot del índice: al publicar uno nuevo el
+dueño llama a reset() y se descarta todo el contenido, porque los scores y
+documentos pueden haber cambiado. Se compara el objeto snapshot y no su
+número de generación, que vuelve a empezar si el índice se reconstruye
+desde cero.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class QueryCache:
+    """LRU acotada por número de entradas y con expiración por antigüedad."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._snapshot: Any = None
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reset(self, snapshot: Any) -> None:
+        """Vacía la caché y la liga a `snapshot` (el índice recién publicado)."""
+        with self._lock:
+            self._entries.clear()
+            self._snapshot = snapshot
+
+    def get(self, key: Hashable, snapshot: Any) -> Optional[Any]:
+        """Valor guardado para `key` en este snapshot, o None.
+        Una consulta con otro snapshot (swap en curso) no usa la caché."""
+        with self._lock:
+            entry = self._entries.get(key) if snapshot is self._snapshot else None
+            if entry is not None and (self.ttl <= 0 or time.monotonic() - entry[0] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, snapshot: Any, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if snapshot is not self._snapshot:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+                "generation": getattr(self._snapshot, "generation", None),
+            }
@@ -1,57 +1,97 @@
-import json
+import logging
+import os
+import threading
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
+from src.agents.analyzer import analyze
+from src.agents.query_cache import QueryCache
+from src.agents.ranking import bm25_top_k
+from src.agents.segments import manifest_signature, open_segments
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 DATA_DIR = BASE_DIR / "data"
-INGESTED_PATH = DATA_DIR / "ingested_data.json"
-INDEX_PATH = DATA_DIR / "index.json"
+INDEX_DIR = DATA_DIR / "index"
 
-def _load_json(path: Path) -> Optional[Dict]:
-    if not path.exists():
-        return None
-    return json.loads(path.read_text(encoding="utf-8"))
+# Segundos entre revisiones del manifest (0 desactiva la recarga automática)
+RELOAD_INTERVAL_S = float(os.getenv("RAG_RELOAD_INTERVAL_S", "5"))
 
-def _rank_candidates(query_tokens: List[str], index: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
-    """
-    Scoring por frecuencia de tokens en índice: doc_ref -> score
-    """
-    scores: Dict[str, int] = {}
-    for t in query_tokens:
-        refs = index.get(t, [])
-        for r in refs:
-            key = f"{r['collection']}@@{r['pos']}"
-            scores[key] = scores.get(key, 0) + 1
-    return scores
-
-def _extract_doc_from_key(key: str, ingested: Dict[str, Any]) -> Dict[str, Any]:
-    coll, pos = key.split("@@")
-    pos_int = int(pos)
-    return {"collection": coll, "pos": pos_int, "item": ingested.get(coll, [])[pos_int]}
+# Caché de respuestas: entradas máximas y segundos de vida (0 = sin expiración)
+CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", "1024"))
+CACHE_TTL_S = float(os.getenv("RAG_CACHE_TTL_S", "300"))
+
+logger = logging.getLogger(__name__)
 
 def _tokenize(q: str) -> List[str]:
-    import re
-    q = re.sub(r"[^\w\s]", " ", q, flags=re.UNICODE)
-    tokens = [t.strip().lower() for t in q.split() if t.strip()]
-    # basic stopwords (mirrored from ingestion)
-    stop = {"de","la","el","y","a","en","los","las","del","que","con","para","por","se","un","una"}
-    tokens = [t for t in tokens if t not in stop and len(t) > 1]
-    return tokens
+    # mismo analizador que la ingesta: los términos de la consulta coinciden con los del índice
+    return analyze(q)
 
 class RAGAgent:
     """
-    Agente RAG local: usa ingested_data.json + index.json para recuperar pasajes.
+    Agente RAG local: usa el índice segmentado de data/index para recuperar
+    pasajes. Los segmentos se abren con mmap, así que sólo se leen los
+    postings consultados.
+
+    Un hilo en segundo plano vigila el manifest; cuando la ingesta publica
+    una generación nueva, abre ese snapshot completo y lo publica en
+    `self.index` con una sola asignación. Cada consulta toma la referencia
+    una vez, así que nunca espera la carga ni mezcla dos generaciones. El
+    snapshot anterior se libera (y cierra sus mmaps) cuando terminan las
+    consultas que aún lo usan.
+
+    Las respuestas se guardan en una caché LRU/TTL por (tokens normalizados,
+    top_k) ligada al snapshot del índice, así que una consulta repetida
+    no vuelve a rankear ni a formatear.
     En producción reemplazar por Azure Cognitive Search / embeddings.
     """
 
-    def __init__(self):
-        self.ingested = _load_json(INGESTED_PATH) or {}
-        self.index = _load_json(INDEX_PATH) or {}
+    def __init__(self, reload_interval: float = RELOAD_INTERVAL_S):
+        self.cache = QueryCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL_S)
+        self._reload_lock = threading.Lock()
+        self._signature = manifest_signature(INDEX_DIR)
+        self.index = open_segments(INDEX_DIR)
+        self.cache.reset(self.index)
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        if reload_interval > 0:
+            self._watcher = threading.Thread(
+                target=self._watch, args=(reload_interval,), name="rag-index-watcher", daemon=True
+            )
+            self._watcher.start()
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except (OSError, ValueError):
+                # Ingesta a medio commit (segmento ya borrado, manifest nuevo): se reintenta
+                logger.warning("No se pudo recargar el índice RAG; se reintenta", exc_info=True)
 
-    def refresh(self):
-        """Recargar archivos si se actualizó la ingesta."""
-        self.ingested = _load_json(INGESTED_PATH) or {}
-        self.index = _load_json(INDEX_PATH) or {}
+    def refresh(self) -> bool:
+        """
+        Recargar archivos si se actualizó la ingesta. Devuelve True si se
+        publicó un snapshot nuevo.
+        """
+        with self._reload_lock:
+            # La firma se toma antes de abrir: si el manifest cambia durante la
+            # carga, la siguiente revisión vuelve a recargar
+            signature = manifest_signature(INDEX_DIR)
+            if signature == self._signature:
+                return False
+            # el manifest cambió: se publica aunque la generación coincida,
+            # porque vuelve a empezar si el índice se reconstruye desde cero
+            new_index = open_segments(INDEX_DIR)
+            self._signature = signature
+            self.index = new_index  # swap atómico de la referencia
+            self.cache.reset(new_index)
+        logger.info("Índice RAG recargado (generación %s)", getattr(new_index, "generation", None))
+        return True
+
+    def close(self) -> None:
+        """Detiene la vigilancia del índice."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
 
     def answer(self, query: str, user_profile: Dict[str, Any], top_k: int = 4) -> str:
         """
@@ -61,22 +101,34 @@ class RAGAgent:
         if not tokens:
             return "No pude procesar tu consulta. Intenta usar palabras clave relevantes."
 
-        scores = _rank_candidates(tokens, self.index)
-        if not scores:
-            return "No encontré documentos relevantes en la base local."
+        # Un solo snapshot por consulta, aunque el vigilante publique otro a la mitad
+        index = self.index
 
-        # ordenar por score descendente y tomar top_k
-        ranked_keys = sorted(scores.keys(), key=lambda k: scores[k], reverse=True)[:top_k]
-        docs = [_extract_doc_from_key(k, self.ingested) for k in ranked_keys]
+        # BM25 no depende del orden de los términos: la clave usa los tokens ordenados
+        cache_key = (tuple(sorted(tokens)), top_k)
+        cached = self.cache.get(cache_key, index)
+        if cached is not None:
+            return cached
+        response = self._answer_from_index(index, tokens, top_k)
+        self.cache.put(cache_key, index, response)
+        return response
 
-        # construir respuesta: resumen automatizado (simple)
+    def _answer_from_index(self, index, tokens: List[str], top_k: int) -> str:
+        # BM25 con top-k por heap (MaxScore), sin ordenar todos los candidatos
+        ranked = bm25_top_k(index, tokens, top_k) if index is not None else []
+        if not ranked:
+            return "No encontré documentos relevantes en la base local."
+
+        # construir respuesta: resumen automatizado (simple). Título y snippet
+        # vienen precalculados del almacén de documentos; sólo se leen los top-k
         lines = ["He encontrado la siguiente información relevante:"]
-        for d in docs:
-            coll = d["collection"]
-            item = d["item"] or {}
-            title = item.get("titulo") or item.get("name") or item.get("titulo_evento") or f"{coll} registro"
-            snippet = " ".join(str(v) for v in list(item.values())[:4])
-            lines.append(f"- {title} (fuente: {coll}) — {snippet[:300]}")
+        for doc_id, _score in ranked:
+            coll, title, snippet = index.summary(doc_id)
+            lines.append(f"- {title} (fuente: {coll}) — {snippet}")
 
         # adicional: incluir evidencia como objeto JSON opcional en la respuesta o return dict
-        return "\n".join(lines)
\ No newline at end of file
+        return "\n".join(lines)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Contadores de aciertos/fallos de la caché de respuestas."""
+        return self.cache.stats()
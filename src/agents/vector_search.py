@@ -0,0 +1,219 @@
+"""
+Recuperación densa local sobre el índice segmentado.
+
+- HashedEmbedder: embeddings deterministas sin modelo ni red. Cada término
+  del analizador y sus n-gramas de caracteres se proyectan con un hash
+  (crc32) a una dimensión fija, con signo, y el vector se normaliza (L2).
+  Los n-gramas acercan variantes que el stemmer no une ("ciclovía",
+  "ciclovías", "ciclista").
+- IVFIndex: índice aproximado de vecinos más cercanos. Agrupa los vectores
+  con k-means esférico y en la consulta sólo compara contra las `n_probe`
+  listas cuyos centroides son más parecidos.
+- VectorSearchEngine: une BM25 (ranking.bm25_top_k) y la búsqueda vectorial;
+  el modo híbrido fusiona ambos rankings con Reciprocal Rank Fusion.
+"""
+import math
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.agents.analyzer import analyze
+from src.agents.ranking import bm25_top_k
+
+DEFAULT_DIM = 512
+CHAR_NGRAMS = (3, 4)
+# Peso de cada n-grama de caracteres relativo al término completo
+CHAR_NGRAM_WEIGHT = 0.5
+
+# Por debajo de este número de documentos la búsqueda exacta es más rápida que IVF
+IVF_MIN_DOCS = 2000
+DEFAULT_N_PROBE = 16
+KMEANS_ITERATIONS = 10
+# Filas por bloque al asignar vectores a centroides (acota la memoria temporal)
+_ASSIGN_CHUNK = 8192
+
+# Constante de Reciprocal Rank Fusion y candidatos por ranking en modo híbrido
+RRF_K = 60
+HYBRID_CANDIDATES = 50
+
+SEARCH_MODES = ("bm25", "vector", "hybrid")
+
+
+@lru_cache(maxsize=65536)
+def _term_features(term: str, dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Posiciones y pesos con signo de un término y sus n-gramas de caracteres."""
+    features = ["w:" + term]
+    padded = f"<{term}>"
+    for n in CHAR_NGRAMS:
+        features.extend("c:" + padded[i:i + n] for i in range(len(padded) - n + 1))
+    hashes = np.array([zlib.crc32(f.encode("utf-8")) for f in features], dtype=np.uint32)
+    positions = (hashes % dim).astype(np.intp)
+    weights = np.full(len(features), CHAR_NGRAM_WEIGHT, dtype=np.float32)
+    weights[0] = 1.0
+    # el bit alto del hash decide el signo: las colisiones tienden a cancelarse
+    weights[(hashes & 0x80000000) != 0] *= -1.0
+    return positions, weights
+
+
+class HashedEmbedder:
+    """Embeddings deterministas por hashing de términos y n-gramas."""
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+
+    def _accumulate(self, out: np.ndarray, text: str) -> None:
+        counts = Counter(analyze(text))
+        if not counts:
+            return
+        positions, weights = [], []
+        for term, tf in counts.items():
+            term_positions, term_weights = _term_features(term, self.dim)
+            positions.append(term_positions)
+            weights.append(term_weights * (1.0 + math.log(tf)))
+        out += np.bincount(np.concatenate(positions), np.concatenate(weights), minlength=self.dim)
+        norm = float(np.linalg.norm(out))
+        if norm:
+            out /= norm
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        self._accumulate(vector, text)
+        return vector
+
+    def embed_many(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in zip(matrix, texts):
+            self._accumulate(row, text)
+        return matrix
+
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """Top-k por score descendente; empates por fila ascendente."""
+    if k < len(scores):
+        keep = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[keep], scores[keep]
+    order = np.lexsort((rows, -scores))
+    return [(int(rows[i]), float(scores[i])) for i in order]
+
+
+def exact_search(vectors: np.ndarray, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """Similitud coseno contra todos los vectores (ya normalizados)."""
+    if k <= 0 or not len(vectors):
+        return []
+    return _top_k(np.arange(len(vectors)), vectors @ query, k)
+
+
+class IVFIndex:
+    """
+    Índice de archivo invertido (IVF) sobre vectores normalizados: cada
+    vector pertenece a la lista de su centroide más cercano.
+    """
+
+    def __init__(self, vectors: np.ndarray, n_lists: Optional[int] = None,
+                 n_iter: int = KMEANS_ITERATIONS, seed: int = 0):
+        self.vectors = vectors
+        n = len(vectors)
+        if n_lists is None:
+            n_lists = int(math.sqrt(n)) or 1
+        n_lists = max(1, min(n_lists, n))
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(n, size=n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            sums = self._cluster_sums(self._assign(centroids), n_lists)
+            norms = np.linalg.norm(sums, axis=1)
+            # una lista vacía conserva su centroide anterior
+            filled = norms > 0
+            centroids[filled] = sums[filled] / norms[filled, None]
+        assign = self._assign(centroids)
+        self.centroids = centroids
+        self._members = np.argsort(assign, kind="stable")
+        self._offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=n_lists))))
+
+    def _cluster_sums(self, assign: np.ndarray, n_lists: int) -> np.ndarray:
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=n_lists)
+        sums = np.zeros((n_lists, self.vectors.shape[1]), dtype=self.vectors.dtype)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        sums[filled] = np.add.reduceat(self.vectors[order], starts, axis=0)
+        return sums
+
+    def _assign(self, centroids: np.ndarray) -> np.ndarray:
+        out = np.empty(len(self.vectors), dtype=np.intp)
+        for start in range(0, len(self.vectors), _ASSIGN_CHUNK):
+            block = self.vectors[start:start + _ASSIGN_CHUNK]
+            out[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return out
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def search(self, query: np.ndarray, k: int, n_probe: int = DEFAULT_N_PROBE) -> List[Tuple[int, float]]:
+        if k <= 0:
+            return []
+        n_probe = min(n_probe, self.n_lists)
+        probe = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        candidates = np.concatenate([self._members[self._offsets[c]:self._offsets[c + 1]] for c in probe])
+        if not len(candidates):
+            return []
+        return _top_k(candidates, self.vectors[candidates] @ query, k)
+
+
+class VectorSearchEngine:
+    """
+    Búsqueda local sobre un SegmentedIndex: BM25, vectorial o híbrida. Los
+    resultados son [(doc_id, score)] con los doc ids globales del índice.
+    """
+
+    def __init__(self, index, embedder: Optional[HashedEmbedder] = None,
+                 n_probe: int = DEFAULT_N_PROBE, ivf_min_docs: int = IVF_MIN_DOCS):
+        self.index = index
+        self.embedder = embedder or HashedEmbedder()
+        self.n_probe = n_probe
+        deleted = index.deleted
+        self.doc_ids = np.array([d for d in range(index.n_docs) if d not in deleted], dtype=np.intp)
+        texts = [" ".join(str(v) for v in (index.document(int(d))["item"] or {}).values()) for d in self.doc_ids]
+        self.vectors = self.embedder.embed_many(texts)
+        self.ivf = IVFIndex(self.vectors) if len(self.doc_ids) >= ivf_min_docs else None
+
+    @property
+    def generation(self) -> int:
+        return self.index.generation
+
+    def bm25_search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        return bm25_top_k(self.index, analyze(query), k)
+
+    def vector_search(self, query: str, k: int, exact: bool = False) -> List[Tuple[int, float]]:
+        q = self.embedder.embed(query)
+        if not q.any():
+            return []
+        if self.ivf is not None and not exact:
+            hits = self.ivf.search(q, k, self.n_probe)
+        else:
+            hits = exact_search(self.vectors, q, k)
+        return [(int(self.doc_ids[row]), score) for row, score in hits]
+
+    def hybrid_search(self, query: str, k: int, candidates: int = HYBRID_CANDIDATES) -> List[Tuple[int, float]]:
+        """Reciprocal Rank Fusion de los rankings BM25 y vectorial."""
+        depth = max(k, candidates)
+        fused: Dict[int, float] = {}
+        for ranking in (self.bm25_search(query, depth), self.vector_search(query, depth)):
+            for rank, (doc_id, _score) in enumerate(ranking, start=1):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (RRF_K + rank)
+        return sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    def search(self, query: str, k: int, mode: str = "hybrid") -> List[Tuple[int, float]]:
+        if mode == "bm25":
+            return self.bm25_search(query, k)
+        if mode == "vector":
+            return self.vector_search(query, k)
+        if mode == "hybrid":
+            return self.hybrid_search(query, k)
+        raise ValueError(f"Modo de búsqueda desconocido: {mode}")
+
+    def document(self, doc_id: int) -> Dict[str, Any]:
+        return self.index.document(doc_id)
@@ -1,34 +1,138 @@
 """Almacén simple para foros creados por usuarios.
+Los foros viven en la base SQLite compartida (local_store), uno por fila;
+user_forums.json sólo se importa la primera vez. Los comentarios no van
+dentro del foro: forman un registro de sólo-anexar (forum_comments) con
+posiciones consecutivas por foro, así comentar no reescribe el hilo y los
+listados paginan resúmenes sin cargar comentarios.
+
+Las funciones de antes conservan su forma de respuesta (create_forum,
+add_comment y list_active_forums devuelven foros con "comentarios"); las
+variantes ligeras son append_comment, get_forum, list_forums_page y
+list_comments. En las páginas, el cursor ("siguiente") es la clave del
+primer elemento de la página siguiente (rowid del foro o posición del
+comentario), igual que next_cursor en la API (posición en el catálogo).
 Reemplazar por Azure Cosmos DB + Azure AI Content Safety en entornos productivos.
 """
 from __future__ import annotations
 
 import json
+import sqlite3
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from src import local_store
 
 BASE_DIR = Path(__file__).resolve().parents[1]
+# JSON anterior a SQLite: se importa una vez
 FORUM_PATH = BASE_DIR / "data" / "user_forums.json"
 
+# Tamaños de página por defecto
+PAGE_SIZE = 20
+COMMENTS_PAGE_SIZE = 50
+
+
+def _migrate_comments(conn: sqlite3.Connection) -> None:
+    # saca los comentarios incrustados en cada foro al registro de comentarios
+    for row in conn.execute("SELECT id, data FROM forums").fetchall():
+        foro = json.loads(row["data"])
+        comentarios = foro.pop("comentarios", None) or []
+        _append_comments(conn, row["id"], comentarios, start=0)
+        conn.execute(
+            "UPDATE forums SET data = ?, comment_count = ? WHERE id = ?",
+            (local_store.dumps(foro), len(comentarios), row["id"]),
+        )
+
+
+_MIGRATIONS = [
+    [
+        "CREATE TABLE forums ("
+        " id TEXT PRIMARY KEY,"
+        " estado TEXT,"
+        " data TEXT NOT NULL)",
+        "CREATE INDEX forums_estado ON forums (estado)",
+    ],
+    [
+        # comment_count es también la posición del siguiente comentario del foro
+        "ALTER TABLE forums ADD COLUMN comment_count INTEGER NOT NULL DEFAULT 0",
+        "CREATE TABLE forum_comments ("
+        " forum_id TEXT NOT NULL REFERENCES forums (id) ON DELETE CASCADE,"
+        " seq INTEGER NOT NULL,"
+        " data TEXT NOT NULL,"
+        " PRIMARY KEY (forum_id, seq)) WITHOUT ROWID",
+        _migrate_comments,
+    ],
+]
+
+
+def _append_comments(conn: sqlite3.Connection, forum_id: str, comentarios: List[Dict[str, Any]], start: int) -> None:
+    conn.executemany(
+        "INSERT INTO forum_comments (forum_id, seq, data) VALUES (?, ?, ?)",
+        [(forum_id, seq, local_store.dumps(c)) for seq, c in enumerate(comentarios, start=start)],
+    )
+
+
+def _insert(conn: sqlite3.Connection, registros: List[Dict[str, Any]]) -> None:
+    for r in registros:
+        foro = dict(r)
+        comentarios = foro.pop("comentarios", None) or []
+        # ON CONFLICT conserva el rowid (orden del listado) al reemplazar un foro
+        conn.execute(
+            "INSERT INTO forums (id, estado, data, comment_count) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET estado = excluded.estado, data = excluded.data, "
+            "comment_count = excluded.comment_count",
+            (foro["id"], foro.get("estado"), local_store.dumps(foro), len(comentarios)),
+        )
+        conn.execute("DELETE FROM forum_comments WHERE forum_id = ?", (foro["id"],))
+        _append_comments(conn, foro["id"], comentarios, start=0)
+
+
+def _summary(row: sqlite3.Row) -> Dict[str, Any]:
+    foro = json.loads(row["data"])
+    foro["num_comentarios"] = row["comment_count"]
+    return foro
+
+
+def _with_comments(conn: sqlite3.Connection, foros: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Agrega a cada foro la lista "comentarios" (la forma de los JSON de antes)."""
+    if not foros:
+        return foros
+    if len(foros) == 1:
+        rows = conn.execute(
+            "SELECT forum_id, data FROM forum_comments WHERE forum_id = ? ORDER BY seq", (foros[0]["id"],)
+        )
+    else:
+        rows = conn.execute("SELECT forum_id, data FROM forum_comments ORDER BY forum_id, seq")
+    comentarios: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        comentarios.setdefault(row["forum_id"], []).append(json.loads(row["data"]))
+    for foro in foros:
+        foro["comentarios"] = comentarios.get(foro["id"], [])
+    return foros
 
-def _ensure_file() -> None:
-    if not FORUM_PATH.exists():
-        FORUM_PATH.write_text("[]", encoding="utf-8")
+
+def _db() -> sqlite3.Connection:
+    local_store.migrate("forums", _MIGRATIONS)
+    local_store.import_legacy_json("forums", FORUM_PATH, _insert)
+    return local_store.connect()
 
 
 def load_forums() -> List[Dict[str, Any]]:
-    _ensure_file()
-    return json.loads(FORUM_PATH.read_text(encoding="utf-8"))
+    """Foros completos, con sus comentarios (exportación y cargas masivas)."""
+    conn = _db()
+    return _with_comments(conn, local_store.loads_rows(conn.execute("SELECT data FROM forums ORDER BY rowid")))
 
 
 def save_forums(registros: List[Dict[str, Any]]) -> None:
-    FORUM_PATH.write_text(json.dumps(registros, ensure_ascii=False, indent=2), encoding="utf-8")
+    """Reemplaza todos los foros (carga masiva); los cambios puntuales usan create_forum/add_comment."""
+    _db()
+    with local_store.transaction() as conn:
+        conn.execute("DELETE FROM forums")
+        _insert(conn, registros)
 
 
 def create_forum(titulo: str, descripcion: str, categoria: str, autor: str) -> Dict[str, Any]:
-    registros = load_forums()
     foro = {
         "id": f"user-{uuid.uuid4().hex[:8]}",
         "titulo": titulo,
@@ -36,30 +140,90 @@ def create_forum(titulo: str, descripcion: str, categoria: str, autor: str) -> D
         "categoria": categoria,
         "autor": autor,
         "creado_en": datetime.utcnow().isoformat(),
-        "comentarios": [],
         "estado": "pendiente",  # después de pasar Azure Content Safety cambia a aprobado
     }
-    registros.append(foro)
-    save_forums(registros)
-    return foro
+    _db()
+    with local_store.transaction() as conn:
+        conn.execute(
+            "INSERT INTO forums (id, estado, data) VALUES (?, ?, ?)",
+            (foro["id"], foro["estado"], local_store.dumps(foro)),
+        )
+    return {**foro, "comentarios": []}
 
 
 def add_comment(forum_id: str, autor: str, texto: str) -> Dict[str, Any]:
-    registros = load_forums()
-    for foro in registros:
-        if foro["id"] == forum_id:
-            foro.setdefault("comentarios", []).append({
-                "autor": autor,
-                "texto": texto,
-                "fecha": datetime.utcnow().isoformat(),
-            })
-            save_forums(registros)
-            return foro
-    raise ValueError("Foro no encontrado")
+    """Anexa un comentario y devuelve el foro con todos sus comentarios.
+    Si sólo hace falta el comentario, append_comment no relee el foro."""
+    _db()
+    with local_store.transaction() as conn:
+        append_comment(forum_id, autor, texto)
+        row = conn.execute("SELECT data FROM forums WHERE id = ?", (forum_id,)).fetchone()
+        return _with_comments(conn, [json.loads(row["data"])])[0]
+
+
+def append_comment(forum_id: str, autor: str, texto: str) -> Dict[str, Any]:
+    """Anexa un comentario al registro del foro; devuelve el comentario con su posición."""
+    comentario = {
+        "autor": autor,
+        "texto": texto,
+        "fecha": datetime.utcnow().isoformat(),
+    }
+    _db()
+    with local_store.transaction() as conn:
+        row = conn.execute(
+            "UPDATE forums SET comment_count = comment_count + 1 WHERE id = ? RETURNING comment_count",
+            (forum_id,),
+        ).fetchone()
+        if row is None:
+            raise ValueError("Foro no encontrado")
+        seq = row["comment_count"] - 1
+        _append_comments(conn, forum_id, [comentario], start=seq)
+    return {**comentario, "posicion": seq}
+
+
+def get_forum(forum_id: str) -> Optional[Dict[str, Any]]:
+    """Resumen del foro (sin comentarios) o None."""
+    row = _db().execute("SELECT data, comment_count FROM forums WHERE id = ?", (forum_id,)).fetchone()
+    return _summary(row) if row else None
+
+
+def list_forums_page(cursor: Optional[str] = None, limit: int = PAGE_SIZE) -> Dict[str, Any]:
+    """Página de resúmenes de foros activos en orden de creación.
+    cursor es el valor "siguiente" de la página anterior (rowid del primer
+    foro de la página), estable aunque se creen foros; None al final."""
+    start = int(cursor) if cursor else 0
+    limit = max(1, limit)
+    rows = _db().execute(
+        "SELECT rowid, data, comment_count FROM forums "
+        "WHERE rowid >= ? AND (estado IS NULL OR estado != 'bloqueado') ORDER BY rowid LIMIT ?",
+        (start, limit + 1),
+    ).fetchall()
+    siguiente = str(rows[limit]["rowid"]) if len(rows) > limit else None
+    return {"foros": [_summary(row) for row in rows[:limit]], "siguiente": siguiente}
+
+
+def list_comments(forum_id: str, cursor: Optional[str] = None, limit: int = COMMENTS_PAGE_SIZE) -> Dict[str, Any]:
+    """Página de comentarios de un foro, del más antiguo al más reciente.
+    El cursor es la posición del siguiente comentario, estable porque el
+    registro sólo crece."""
+    start = int(cursor) if cursor else 0
+    limit = max(1, limit)
+    rows = _db().execute(
+        "SELECT seq, data FROM forum_comments WHERE forum_id = ? AND seq >= ? ORDER BY seq LIMIT ?",
+        (forum_id, start, limit + 1),
+    ).fetchall()
+    comentarios = [{**json.loads(row["data"]), "posicion": row["seq"]} for row in rows[:limit]]
+    siguiente = str(rows[limit]["seq"]) if len(rows) > limit else None
+    return {"comentarios": comentarios, "siguiente": siguiente}
 
 
 def list_active_forums() -> List[Dict[str, Any]]:
-    return [foro for foro in load_forums() if foro.get("estado") != "bloqueado"]
+    """Foros activos con sus comentarios; para listados grandes usar list_forums_page."""
+    conn = _db()
+    rows = conn.execute(
+        "SELECT data FROM forums WHERE estado IS NULL OR estado != 'bloqueado' ORDER BY rowid"
+    )
+    return _with_comments(conn, local_store.loads_rows(rows))
 
 
 # Azure Content Safety: invoca la API antes de crear/aprobar foros para sancionar contenidos.
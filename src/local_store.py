@@ -0,0 +1,123 @@
+"""Almacenamiento local compartido sobre SQLite en modo WAL.
+Sustituye a los JSON que profile_store, forum_store y tag_service leían y
+reescribían completos en cada cambio: cada escritura toca sólo su registro,
+las consultas usan índices y las escrituras concurrentes se serializan con
+transacciones en lugar de pisarse.
+Para producción sustituir por Azure SQL o Azure Cosmos DB.
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Union
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DB_PATH = BASE_DIR / "data" / "civicpulse.db"
+# Espera máxima (ms) por el candado de escritura de otro proceso
+BUSY_TIMEOUT_MS = 5000
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_migrated: set = set()
+
+# Paso de migración: sentencia SQL o función que recibe la conexión (para
+# rellenar columnas con lógica que SQL no expresa)
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+
+
+def connect() -> sqlite3.Connection:
+    """Conexión del hilo actual (una por hilo y por archivo de base de datos)."""
+    conns: Dict[Path, sqlite3.Connection] = getattr(_local, "conns", None) or {}
+    _local.conns = conns
+    conn = conns.get(DB_PATH)
+    if conn is None:
+        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: las transacciones se abren explícitamente en transaction()
+        conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS schema_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+        conns[DB_PATH] = conn
+    return conn
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """Transacción de escritura: BEGIN IMMEDIATE toma el candado al inicio, así
+    que leer-modificar-escribir dentro del bloque no pierde actualizaciones."""
+    conn = connect()
+    if conn.in_transaction:
+        # transacción anidada: forma parte de la exterior
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def migrate(name: str, migrations: Sequence[Sequence[Step]]) -> None:
+    """Aplica, en orden y una sola vez, las migraciones pendientes de una tabla.
+    Cada migración es una lista de pasos (SQL o funciones); la versión queda
+    registrada en schema_versions."""
+    key = (DB_PATH, name)
+    if key in _migrated:
+        return
+    with _init_lock:
+        if key in _migrated:
+            return
+        with transaction() as conn:
+            row = conn.execute("SELECT version FROM schema_versions WHERE name = ?", (name,)).fetchone()
+            current = row["version"] if row else 0
+            for version, statements in enumerate(migrations, start=1):
+                if version <= current:
+                    continue
+                for statement in statements:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(statement)
+            if len(migrations) > current:
+                conn.execute(
+                    "INSERT INTO schema_versions (name, version) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET version = excluded.version",
+                    (name, len(migrations)),
+                )
+        _migrated.add(key)
+
+
+def import_legacy_json(name: str, path: Path, insert: Callable[[sqlite3.Connection, List[Dict[str, Any]]], None]) -> None:
+    """Importa una sola vez los registros del JSON que usaba el módulo antes de SQLite."""
+    key = (DB_PATH, f"legacy:{name}")
+    if key in _migrated:
+        return
+    with _init_lock:
+        if key in _migrated:
+            return
+        with transaction() as conn:
+            done = conn.execute("SELECT 1 FROM schema_versions WHERE name = ?", (f"legacy:{name}",)).fetchone()
+            if not done:
+                if path.exists():
+                    registros = json.loads(path.read_text(encoding="utf-8")) or []
+                    insert(conn, registros)
+                conn.execute("INSERT INTO schema_versions (name, version) VALUES (?, 1)", (f"legacy:{name}",))
+        _migrated.add(key)
+
+
+def dumps(record: Dict[str, Any]) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads_rows(rows: Iterable[sqlite3.Row], column: str = "data") -> List[Dict[str, Any]]:
+    return [json.loads(row[column]) for row in rows]
@@ -1,31 +1,76 @@
 """Persistencia ligera para perfiles ciudadanos.
-Para producción sustituir JSON por Azure Cosmos DB o Azure SQL con autenticación administrada.
+Los perfiles viven en la base SQLite compartida (local_store): una fila por
+perfil con el registro completo en JSON; profiles.json sólo se importa la
+primera vez. La columna email_key (correo en casefold, índice UNIQUE) atiende
+el login y garantiza que no haya dos cuentas con el mismo correo.
+Para producción sustituir por Azure Cosmos DB o Azure SQL con autenticación administrada.
 """
 from __future__ import annotations
 
 import json
+import sqlite3
 import uuid
 from dataclasses import dataclass, asdict
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
+from src import local_store
+
 BASE_DIR = Path(__file__).resolve().parents[1]
+# JSON anterior a SQLite: se importa una vez
 DATA_PATH = BASE_DIR / "data" / "profiles.json"
 
-
-def _ensure_file() -> None:
-    DATA_PATH.parent.mkdir(parents=True, exist_ok=True)
-    if not DATA_PATH.exists():
-        DATA_PATH.write_text("[]", encoding="utf-8")
-
-
-def _load_profiles() -> List[Dict[str, Any]]:
-    _ensure_file()
-    return json.loads(DATA_PATH.read_text(encoding="utf-8"))
+DUPLICATE_EMAIL = "El correo ya está registrado"
+DUPLICATE_USER_ID = "El identificador ya está registrado"
+
+
+def _email_key(email: str) -> str:
+    """Clave de búsqueda del correo: sin distinguir mayúsculas (casefold)."""
+    return email.casefold()
+
+
+def _backfill_email_keys(conn: sqlite3.Connection) -> None:
+    # casefold en Python: lower() de SQLite sólo cubre ASCII. Si ya había
+    # correos repetidos, sólo el primero (el que encontraba el login) recibe
+    # clave; el índice UNIQUE admite varios NULL.
+    vistos = set()
+    for row in conn.execute("SELECT rowid, email FROM profiles ORDER BY rowid").fetchall():
+        key = _email_key(row["email"])
+        if key not in vistos:
+            vistos.add(key)
+            conn.execute("UPDATE profiles SET email_key = ? WHERE rowid = ?", (key, row["rowid"]))
+
+
+_MIGRATIONS = [
+    [
+        "CREATE TABLE profiles ("
+        " user_id TEXT PRIMARY KEY,"
+        " email TEXT NOT NULL,"
+        " data TEXT NOT NULL)",
+        "CREATE INDEX profiles_email ON profiles (email)",
+    ],
+    [
+        # índice persistente de correos para el login y la validación de altas
+        "ALTER TABLE profiles ADD COLUMN email_key TEXT",
+        _backfill_email_keys,
+        "DROP INDEX profiles_email",
+        "CREATE UNIQUE INDEX profiles_email_key ON profiles (email_key)",
+    ],
+]
+
+
+def _insert_legacy(conn: sqlite3.Connection, registros: List[Dict[str, Any]]) -> None:
+    conn.executemany(
+        "INSERT OR IGNORE INTO profiles (user_id, email, data) VALUES (?, ?, ?)",
+        [(r["user_id"], r["email"], local_store.dumps(r)) for r in registros],
+    )
+    _backfill_email_keys(conn)
 
 
-def _save_profiles(records: List[Dict[str, Any]]) -> None:
-    DATA_PATH.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+def _db() -> sqlite3.Connection:
+    local_store.migrate("profiles", _MIGRATIONS)
+    local_store.import_legacy_json("profiles", DATA_PATH, _insert_legacy)
+    return local_store.connect()
 
 
 @dataclass
@@ -51,45 +96,65 @@ class Profile:
 
 
 def create_profile(email: str, password: str, consent_notifications: bool) -> Profile:
-    registros = _load_profiles()
-    if any(r["email"].lower() == email.lower() for r in registros):
-        raise ValueError("El correo ya está registrado")
-    profile = Profile(
-        user_id=str(uuid.uuid4()),
-        email=email,
-        password=password,
-        consent_notifications=consent_notifications,
-        intereses=["movilidad"],
-        accesibilidad={"tamano_fuente": 16, "lectura_en_voz_alta": False, "traduccion_automatica": False},
-    )
-    registros.append(profile.to_dict())
-    _save_profiles(registros)
+    _db()
+    with local_store.transaction() as conn:
+        if conn.execute("SELECT 1 FROM profiles WHERE email_key = ?", (_email_key(email),)).fetchone():
+            raise ValueError(DUPLICATE_EMAIL)
+        profile = Profile(
+            user_id=str(uuid.uuid4()),
+            email=email,
+            password=password,
+            consent_notifications=consent_notifications,
+            intereses=["movilidad"],
+            accesibilidad={"tamano_fuente": 16, "lectura_en_voz_alta": False, "traduccion_automatica": False},
+        )
+        conn.execute(
+            "INSERT INTO profiles (user_id, email, email_key, data) VALUES (?, ?, ?, ?)",
+            (profile.user_id, profile.email, _email_key(email), local_store.dumps(profile.to_dict())),
+        )
     return profile
 
 
 def get_profile_by_email(email: str) -> Optional[Profile]:
-    for registro in _load_profiles():
-        if registro["email"].lower() == email.lower():
-            return Profile(**registro)
-    return None
+    row = _db().execute("SELECT data FROM profiles WHERE email_key = ?", (_email_key(email),)).fetchone()
+    return Profile(**json.loads(row["data"])) if row else None
 
 
 def update_profile(user_id: str, data: Dict[str, Any]) -> Profile:
-    registros = _load_profiles()
-    for idx, registro in enumerate(registros):
-        if registro["user_id"] == user_id:
-            registro.update(data)
-            registros[idx] = registro
-            _save_profiles(registros)
-            return Profile(**registro)
-    raise ValueError("Perfil no encontrado")
+    _db()
+    with local_store.transaction() as conn:
+        row = conn.execute(
+            "SELECT email, email_key, data FROM profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None:
+            raise ValueError("Perfil no encontrado")
+        registro = json.loads(row["data"])
+        registro.update(data)
+        # cambiar el user_id se permite, pero no a uno que ya use otro perfil
+        if registro["user_id"] != user_id and conn.execute(
+            "SELECT 1 FROM profiles WHERE user_id = ?", (registro["user_id"],)
+        ).fetchone():
+            raise ValueError(DUPLICATE_USER_ID)
+        # la clave sólo se recalcula si cambia el correo
+        email_key = row["email_key"]
+        if registro["email"] != row["email"]:
+            email_key = _email_key(registro["email"])
+            otro = conn.execute("SELECT user_id FROM profiles WHERE email_key = ?", (email_key,)).fetchone()
+            if otro and otro["user_id"] != user_id:
+                raise ValueError(DUPLICATE_EMAIL)
+        conn.execute(
+            "UPDATE profiles SET user_id = ?, email = ?, email_key = ?, data = ? WHERE user_id = ?",
+            (registro["user_id"], registro["email"], email_key, local_store.dumps(registro), user_id),
+        )
+    return Profile(**registro)
 
 
 def list_profiles() -> List[Profile]:
-    return [Profile(**registro) for registro in _load_profiles()]
+    rows = _db().execute("SELECT data FROM profiles ORDER BY rowid")
+    return [Profile(**registro) for registro in local_store.loads_rows(rows)]
 
 
 # Próximos pasos Azure:
-# - Reemplazar este módulo por un repositorio en Azure Cosmos DB o Azure SQL.
+# - Reemplazar local_store por un repositorio en Azure Cosmos DB o Azure SQL.
 # - Utilizar Azure AD B2C u otro IdP para gestionar contraseñas de forma segura.
 # - Emplear Identidad Administrada/DefaultAzureCredential para acceder a la base.
@@ -1,69 +1,144 @@
-"""Gestión de etiquetas oficiales y creadas por la ciudadanía."""
+"""Gestión de etiquetas oficiales y creadas por la ciudadanía.
+Las etiquetas y sus seguidores viven en la base SQLite compartida
+(local_store); tags.json sólo se importa la primera vez. La popularidad es
+una columna indexada y seguir una etiqueta inserta una sola fila.
+"""
 from __future__ import annotations
 
 import json
+import sqlite3
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+
+from src import local_store
 
 BASE_DIR = Path(__file__).resolve().parents[1]
+# JSON anterior a SQLite: se importa una vez
 TAG_PATH = BASE_DIR / "data" / "tags.json"
 
-
-def _load_tags() -> List[Dict[str, Any]]:
-    if not TAG_PATH.exists():
-        TAG_PATH.write_text("[]", encoding="utf-8")
-    return json.loads(TAG_PATH.read_text(encoding="utf-8"))
-
-
-def _save_tags(records: List[Dict[str, Any]]) -> None:
-    TAG_PATH.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+_MIGRATIONS = [
+    [
+        "CREATE TABLE tags ("
+        " value TEXT PRIMARY KEY,"
+        " estado TEXT,"
+        " popularidad INTEGER NOT NULL DEFAULT 0,"
+        " data TEXT NOT NULL)",
+        "CREATE INDEX tags_popularidad ON tags (popularidad DESC)",
+        "CREATE INDEX tags_estado ON tags (estado)",
+        "CREATE TABLE tag_followers ("
+        " tag_value TEXT NOT NULL REFERENCES tags (value) ON DELETE CASCADE,"
+        " user_id TEXT NOT NULL,"
+        " PRIMARY KEY (tag_value, user_id)) WITHOUT ROWID",
+    ],
+]
+
+
+def _insert_tag(conn: sqlite3.Connection, record: Dict[str, Any]) -> None:
+    data = {k: v for k, v in record.items() if k != "seguidores"}
+    conn.execute(
+        "INSERT OR IGNORE INTO tags (value, estado, popularidad, data) VALUES (?, ?, ?, ?)",
+        (record["value"], record.get("estado"), record.get("popularidad", 0), local_store.dumps(data)),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO tag_followers (tag_value, user_id) VALUES (?, ?)",
+        [(record["value"], user_id) for user_id in record.get("seguidores", [])],
+    )
+
+
+def _insert_legacy(conn: sqlite3.Connection, registros: List[Dict[str, Any]]) -> None:
+    for record in registros:
+        _insert_tag(conn, record)
+
+
+def _db() -> sqlite3.Connection:
+    local_store.migrate("tags", _MIGRATIONS)
+    local_store.import_legacy_json("tags", TAG_PATH, _insert_legacy)
+    return local_store.connect()
+
+
+def _to_record(row: sqlite3.Row, seguidores: Optional[List[str]]) -> Dict[str, Any]:
+    record = json.loads(row["data"])
+    record["estado"] = row["estado"]
+    record["popularidad"] = row["popularidad"]
+    if seguidores is not None:
+        record["seguidores"] = seguidores
+    return record
+
+
+def _followers(conn: sqlite3.Connection, tag_value: Optional[str] = None) -> Dict[str, List[str]]:
+    if tag_value is None:
+        rows = conn.execute("SELECT tag_value, user_id FROM tag_followers")
+    else:
+        rows = conn.execute("SELECT tag_value, user_id FROM tag_followers WHERE tag_value = ?", (tag_value,))
+    out: Dict[str, List[str]] = {}
+    for row in rows:
+        out.setdefault(row["tag_value"], []).append(row["user_id"])
+    return out
+
+
+def _get_tag(conn: sqlite3.Connection, value: str) -> Optional[Dict[str, Any]]:
+    row = conn.execute("SELECT estado, popularidad, data FROM tags WHERE value = ?", (value,)).fetchone()
+    if row is None:
+        return None
+    return _to_record(row, _followers(conn, value).get(value, []))
 
 
 def list_tags(include_pending: bool = True) -> List[Dict[str, Any]]:
-    registros = _load_tags()
+    conn = _db()
     if include_pending:
-        return registros
-    return [r for r in registros if r.get("estado") != "pendiente"]
+        rows = conn.execute("SELECT estado, popularidad, data FROM tags ORDER BY rowid").fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT estado, popularidad, data FROM tags"
+            " WHERE estado IS NULL OR estado != 'pendiente' ORDER BY rowid"
+        ).fetchall()
+    followers = _followers(conn)
+    return [_to_record(row, followers.get(json.loads(row["data"])["value"])) for row in rows]
 
 
 def get_popular_tags(limit: int = 5) -> List[Dict[str, Any]]:
-    registros = sorted(_load_tags(), key=lambda r: r.get("popularidad", 0), reverse=True)
-    return registros[:limit]
+    conn = _db()
+    rows = conn.execute(
+        "SELECT value, estado, popularidad, data FROM tags ORDER BY popularidad DESC, rowid LIMIT ?",
+        (limit,),
+    ).fetchall()
+    records = []
+    for row in rows:
+        seguidores = _followers(conn, row["value"]).get(row["value"])
+        records.append(_to_record(row, seguidores))
+    return records
 
 
 def add_user_tag(value: str, label: str, autor: str) -> Dict[str, Any]:
-    registros = _load_tags()
-    existe = next((tag for tag in registros if tag["value"] == value), None)
-    if existe:
-        existe.setdefault("seguidores", set())
-        existe.setdefault("popularidad", 0)
-        existe["popularidad"] += 1
-        _save_tags(registros)
-        return existe
-    nuevo = {
-        "value": value,
-        "label": label,
-        "tipo": "ciudadana",
-        "estado": "pendiente",
-        "popularidad": 1,
-        "creado_por": autor,
-    }
-    registros.append(nuevo)
-    _save_tags(registros)
-    return nuevo
+    _db()
+    with local_store.transaction() as conn:
+        updated = conn.execute(
+            "UPDATE tags SET popularidad = popularidad + 1 WHERE value = ?", (value,)
+        ).rowcount
+        if not updated:
+            _insert_tag(conn, {
+                "value": value,
+                "label": label,
+                "tipo": "ciudadana",
+                "estado": "pendiente",
+                "popularidad": 1,
+                "creado_por": autor,
+            })
+        return _get_tag(conn, value)
 
 
 def ensure_user_interest(tag_value: str, user_id: str) -> Dict[str, Any]:
-    registros = _load_tags()
-    for tag in registros:
-        if tag["value"] == tag_value:
-            seguidores = set(tag.get("seguidores", []))
-            seguidores.add(user_id)
-            tag["seguidores"] = list(seguidores)
-            tag["popularidad"] = tag.get("popularidad", 0) + 1
-            _save_tags(registros)
-            return tag
-    return add_user_tag(tag_value, tag_value.replace("-", " ").title(), autor=user_id)
+    _db()
+    with local_store.transaction() as conn:
+        updated = conn.execute(
+            "UPDATE tags SET popularidad = popularidad + 1 WHERE value = ?", (tag_value,)
+        ).rowcount
+        if not updated:
+            return add_user_tag(tag_value, tag_value.replace("-", " ").title(), autor=user_id)
+        conn.execute(
+            "INSERT OR IGNORE INTO tag_followers (tag_value, user_id) VALUES (?, ?)", (tag_value, user_id)
+        )
+        return _get_tag(conn, tag_value)
 
 
 # Para Azure Cosmos DB: guarda tags en contenedores con partición por tipo/estado para escalar.